@@ -0,0 +1,335 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+
+from slots import MASK_COLUMNS
+
+COUNT_COLUMNS = ['load_without_recon', 'load_with_recon', 'midnight_without_recon', 'midnight_with_recon']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sla_counts (
+    meter_number TEXT NOT NULL,
+    date TEXT NOT NULL,
+    load_without_recon INTEGER NOT NULL,
+    load_with_recon INTEGER NOT NULL,
+    midnight_without_recon INTEGER NOT NULL,
+    midnight_with_recon INTEGER NOT NULL,
+    PRIMARY KEY (meter_number, date)
+);
+CREATE TABLE IF NOT EXISTS slot_masks (
+    meter_number TEXT NOT NULL,
+    date TEXT NOT NULL,
+    mask_without_recon_low INTEGER NOT NULL,
+    mask_without_recon_high INTEGER NOT NULL,
+    mask_with_recon_low INTEGER NOT NULL,
+    mask_with_recon_high INTEGER NOT NULL,
+    PRIMARY KEY (meter_number, date)
+);
+CREATE TABLE IF NOT EXISTS alarms (
+    date TEXT NOT NULL,
+    meter_number TEXT NOT NULL,
+    alarm_type TEXT,
+    alarm_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alarms_date ON alarms (date);
+CREATE INDEX IF NOT EXISTS alarms_date_meter ON alarms (date, meter_number);
+CREATE TABLE IF NOT EXISTS alarm_counts (
+    date TEXT NOT NULL,
+    meter_number TEXT NOT NULL,
+    alarm_type TEXT,
+    alarm_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alarm_counts_date ON alarm_counts (date);
+CREATE INDEX IF NOT EXISTS alarm_counts_date_meter ON alarm_counts (date, meter_number);
+CREATE TABLE IF NOT EXISTS latency_histograms (
+    date TEXT NOT NULL,
+    meter_number TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    row_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS latency_histograms_date ON latency_histograms (date);
+CREATE INDEX IF NOT EXISTS latency_histograms_date_meter ON latency_histograms (date, meter_number);
+CREATE TABLE IF NOT EXISTS stored_days (
+    kind TEXT NOT NULL,
+    date TEXT NOT NULL,
+    stored_at TEXT NOT NULL,
+    meters TEXT,
+    PRIMARY KEY (kind, date)
+);
+"""
+
+class AggregateStore:
+    """
+    On-disk store of per-day SLA counts, load slot masks and alarms for closed days
+    A day is only served from here once it has been marked stored for its kind
+    ('sla', 'slot_masks', 'alarms', 'alarm_counts' or 'latency'), so a day with
+    no rows is still recognised as complete, and only for the meters fetched for
+    it: each stored day records its meter set, and the put_* methods add meters
+    to a day without touching the others' rows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # Stores written before meter sets were recorded: their days cover no meters
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(stored_days)")}
+            if 'meters' not in columns:
+                conn.execute("ALTER TABLE stored_days ADD COLUMN meters TEXT")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _stored_meters(self, conn, kind, dates):
+        placeholders = ', '.join(['?'] * len(dates))
+        rows = conn.execute(
+            f"SELECT date, meters FROM stored_days WHERE kind = ? AND date IN ({placeholders})",
+            [kind] + list(dates)
+        ).fetchall()
+        return {date_str: frozenset(meters.split('\n')) if meters else frozenset() for date_str, meters in rows}
+
+    def _mark_stored(self, conn, kind, dates, meter_numbers):
+        """Mark dates stored for kind, adding meter_numbers to the meters each already covers"""
+        stored_at = datetime.now().isoformat(timespec='seconds')
+        covered = self._stored_meters(conn, kind, dates)
+        conn.executemany(
+            "INSERT OR REPLACE INTO stored_days (kind, date, stored_at, meters) VALUES (?, ?, ?, ?)",
+            [
+                (kind, date_str, stored_at, '\n'.join(sorted(covered.get(date_str, frozenset()) | set(meter_numbers))))
+                for date_str in dates
+            ]
+        )
+
+    def _replace_rows(self, conn, table, dates, meter_numbers, rows):
+        """Replace table's rows for meter_numbers on dates with rows, keeping other meters' rows"""
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS put_meters (meter_number TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM put_meters")
+        conn.executemany("INSERT OR IGNORE INTO put_meters VALUES (?)", [(meter,) for meter in meter_numbers])
+        placeholders = ', '.join(['?'] * len(dates))
+        conn.execute(
+            f"""DELETE FROM {table} WHERE date IN ({placeholders})
+                AND meter_number IN (SELECT meter_number FROM put_meters)""",
+            list(dates)
+        )
+        columns = ', '.join(rows.columns)
+        conn.executemany(
+            f"INSERT INTO {table} ({columns}) VALUES ({', '.join(['?'] * len(rows.columns))})",
+            rows.astype(object).itertuples(index=False, name=None)
+        )
+
+    def get_sla_counts(self, dates):
+        """
+        Counts for the stored subset of dates
+        Returns: (long-format frame of meter_number, date and the four counts,
+        {stored date: frozenset of the meter numbers it covers})
+        """
+        columns = ['meter_number', 'date'] + COUNT_COLUMNS
+        if not dates:
+            return pd.DataFrame(columns=columns), {}
+        with self._connect() as conn:
+            stored = self._stored_meters(conn, 'sla', dates)
+            if not stored:
+                return pd.DataFrame(columns=columns), stored
+            placeholders = ', '.join(['?'] * len(stored))
+            frame = pd.read_sql_query(
+                f"SELECT {', '.join(columns)} FROM sla_counts WHERE date IN ({placeholders})",
+                conn,
+                params=list(stored)
+            )
+        return frame, stored
+
+    def get_sla_counts_between(self, start_date, end_date):
+        """Long-format counts for every stored day from start_date to end_date inclusive"""
+        columns = ['meter_number', 'date'] + COUNT_COLUMNS
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                f"""SELECT {', '.join(columns)} FROM sla_counts
+                    WHERE date >= ? AND date <= ? ORDER BY date, meter_number""",
+                conn,
+                params=[start_date, end_date]
+            )
+
+    def stored_meters(self, kind, dates):
+        """
+        {date: frozenset of covered meter numbers} for the subset of dates already stored
+        for kind ('sla', 'slot_masks', 'alarms', 'alarm_counts' or 'latency')
+        """
+        if not dates:
+            return {}
+        with self._connect() as conn:
+            return self._stored_meters(conn, kind, dates)
+
+    def put_sla_counts(self, dates, counts, meter_numbers):
+        """
+        Store the rows of a long-format counts frame fetched for meter_numbers on dates
+        and mark those meters complete for them
+        When the frame also carries the load slot mask columns they are stored as well.
+        """
+        if not dates:
+            return
+        dates = set(dates)
+        with self._lock, self._connect() as conn:
+            rows = counts[counts['date'].isin(dates)][['meter_number', 'date'] + COUNT_COLUMNS]
+            self._replace_rows(conn, 'sla_counts', dates, meter_numbers, rows)
+            self._mark_stored(conn, 'sla', dates, meter_numbers)
+            if set(MASK_COLUMNS) <= set(counts.columns):
+                rows = counts[counts['date'].isin(dates)][['meter_number', 'date'] + MASK_COLUMNS]
+                self._replace_rows(conn, 'slot_masks', dates, meter_numbers, rows)
+                self._mark_stored(conn, 'slot_masks', dates, meter_numbers)
+
+    def get_slot_masks(self, dates):
+        """
+        Load slot mask halves for the stored subset of dates
+        Returns: (long-format frame of meter_number, date and MASK_COLUMNS,
+        {stored date: frozenset of the meter numbers it covers})
+        """
+        columns = ['meter_number', 'date'] + MASK_COLUMNS
+        if not dates:
+            return pd.DataFrame(columns=columns), {}
+        with self._connect() as conn:
+            stored = self._stored_meters(conn, 'slot_masks', dates)
+            if not stored:
+                return pd.DataFrame(columns=columns), stored
+            placeholders = ', '.join(['?'] * len(stored))
+            frame = pd.read_sql_query(
+                f"SELECT {', '.join(columns)} FROM slot_masks WHERE date IN ({placeholders})",
+                conn,
+                params=list(stored)
+            )
+        return frame, stored
+
+    def get_alarms(self, dates):
+        """
+        Alarms for the stored subset of dates
+        Returns: (dict {date: list of alarm records}, {stored date: frozenset of the meter numbers it covers})
+        """
+        if not dates:
+            return {}, {}
+        with self._connect() as conn:
+            stored = self._stored_meters(conn, 'alarms', dates)
+            alarms_by_date = {date_str: [] for date_str in stored}
+            if not stored:
+                return alarms_by_date, stored
+            placeholders = ', '.join(['?'] * len(stored))
+            rows = conn.execute(
+                f"""SELECT date, meter_number, alarm_type, alarm_time FROM alarms
+                    WHERE date IN ({placeholders}) ORDER BY meter_number, alarm_time""",
+                list(stored)
+            ).fetchall()
+        for date_str, meter_number, alarm_type, alarm_time in rows:
+            alarms_by_date[date_str].append({
+                'meter_number': meter_number,
+                'alarm_type': alarm_type,
+                'alarm_time': datetime.fromisoformat(alarm_time)
+            })
+        return alarms_by_date, stored
+
+    def put_alarms(self, alarms_by_date, meter_numbers):
+        """Store {date: list of alarm records} fetched for meter_numbers and mark those meters complete"""
+        if not alarms_by_date:
+            return
+        dates = list(alarms_by_date)
+        rows = pd.DataFrame(
+            [
+                (date_str, alarm['meter_number'], alarm['alarm_type'], _to_iso(alarm['alarm_time']))
+                for date_str, alarms in alarms_by_date.items()
+                for alarm in alarms
+            ],
+            columns=['date', 'meter_number', 'alarm_type', 'alarm_time']
+        )
+        with self._lock, self._connect() as conn:
+            self._replace_rows(conn, 'alarms', dates, meter_numbers, rows)
+            self._mark_stored(conn, 'alarms', dates, meter_numbers)
+
+    def get_alarm_counts(self, dates):
+        """
+        Per-meter, per-type alarm counts for the stored subset of dates
+        Returns: (long-format frame of date, meter_number, alarm_type, alarm_count,
+        {stored date: frozenset of the meter numbers it covers})
+        """
+        columns = ['date', 'meter_number', 'alarm_type', 'alarm_count']
+        if not dates:
+            return pd.DataFrame(columns=columns), {}
+        with self._connect() as conn:
+            stored = self._stored_meters(conn, 'alarm_counts', dates)
+            if not stored:
+                return pd.DataFrame(columns=columns), stored
+            placeholders = ', '.join(['?'] * len(stored))
+            frame = pd.read_sql_query(
+                f"SELECT {', '.join(columns)} FROM alarm_counts WHERE date IN ({placeholders})",
+                conn,
+                params=list(stored)
+            )
+        return frame, stored
+
+    def put_alarm_counts(self, dates, counts, meter_numbers):
+        """Store the rows of a long-format alarm counts frame fetched for meter_numbers on dates"""
+        if not dates:
+            return
+        dates = set(dates)
+        with self._lock, self._connect() as conn:
+            rows = counts[counts['date'].isin(dates)][['date', 'meter_number', 'alarm_type', 'alarm_count']]
+            self._replace_rows(conn, 'alarm_counts', dates, meter_numbers, rows)
+            self._mark_stored(conn, 'alarm_counts', dates, meter_numbers)
+
+    def get_latency_histograms(self, dates):
+        """
+        Per-meter reporting-latency bucket counts for the stored subset of dates
+        Returns: (long-format frame of date, meter_number, bucket, row_count,
+        {stored date: frozenset of the meter numbers it covers})
+        """
+        columns = ['date', 'meter_number', 'bucket', 'row_count']
+        if not dates:
+            return pd.DataFrame(columns=columns), {}
+        with self._connect() as conn:
+            stored = self._stored_meters(conn, 'latency', dates)
+            if not stored:
+                return pd.DataFrame(columns=columns), stored
+            placeholders = ', '.join(['?'] * len(stored))
+            frame = pd.read_sql_query(
+                f"SELECT {', '.join(columns)} FROM latency_histograms WHERE date IN ({placeholders})",
+                conn,
+                params=list(stored)
+            )
+        return frame, stored
+
+    def put_latency_histograms(self, dates, histograms, meter_numbers):
+        """Store the rows of a long-format latency histogram frame fetched for meter_numbers on dates"""
+        if not dates:
+            return
+        dates = set(dates)
+        with self._lock, self._connect() as conn:
+            rows = histograms[histograms['date'].isin(dates)][['date', 'meter_number', 'bucket', 'row_count']]
+            self._replace_rows(conn, 'latency_histograms', dates, meter_numbers, rows)
+            self._mark_stored(conn, 'latency', dates, meter_numbers)
+
+    def invalidate(self, dates):
+        """Forget stored days so the next fetch re-queries them, e.g. after late reconciliation"""
+        if not dates:
+            return
+        dates = list(dates)
+        placeholders = ', '.join(['?'] * len(dates))
+        with self._lock, self._connect() as conn:
+            conn.execute(f"DELETE FROM stored_days WHERE date IN ({placeholders})", dates)
+            conn.execute(f"DELETE FROM sla_counts WHERE date IN ({placeholders})", dates)
+            conn.execute(f"DELETE FROM slot_masks WHERE date IN ({placeholders})", dates)
+            conn.execute(f"DELETE FROM alarms WHERE date IN ({placeholders})", dates)
+            conn.execute(f"DELETE FROM alarm_counts WHERE date IN ({placeholders})", dates)
+            conn.execute(f"DELETE FROM latency_histograms WHERE date IN ({placeholders})", dates)
+
+def _to_iso(value):
+    return value.isoformat(sep=' ') if isinstance(value, datetime) else str(value)
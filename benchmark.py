@@ -0,0 +1,194 @@
+"""
+Benchmarks for the dashboard's data stages
+
+Measures best-of-N latency and peak Python memory (tracemalloc) per stage.
+In-memory stages use synthetic counts; --db adds the query stages, run against
+a stand-in database populated with synthetic.py. Results can be saved and later
+compared, failing when a stage gets slower than the tolerance allows.
+
+Run with:  python benchmark.py [--meters N] [--days N] [--db]
+           python benchmark.py --save bench_baseline.json
+           python benchmark.py --compare bench_baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import database
+import styling
+
+def synthetic_counts(meter_count, day_count, seed=0):
+    """Registry, target dates and a long-format counts frame with some meter-days missing"""
+    rng = np.random.default_rng(seed)
+    registry = [
+        {'meter_number': f'SM{i:07d}', 'type': '4G' if i % 3 == 0 else 'BLE', 'expected_load': 96, 'group': None}
+        for i in range(meter_count)
+    ]
+    start = date(2025, 1, 1)
+    target_dates = [(start + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(day_count)]
+
+    meter_numbers = np.repeat([m['meter_number'] for m in registry], day_count)
+    dates = np.tile(target_dates, meter_count)
+    load_with = rng.integers(60, 97, size=len(dates))
+    load_without = load_with - rng.integers(0, 10, size=len(dates)).clip(max=load_with)
+    midnight_with = rng.integers(0, 2, size=len(dates))
+    counts = pd.DataFrame({
+        'meter_number': meter_numbers,
+        'date': dates,
+        'load_without_recon': load_without,
+        'load_with_recon': load_with,
+        'midnight_without_recon': midnight_with * rng.integers(0, 2, size=len(dates)),
+        'midnight_with_recon': midnight_with,
+    })
+    present = rng.random(len(counts)) > 0.05
+    return registry, target_dates, counts[present].reset_index(drop=True)
+
+def legacy_date_frames(counts, registry, target_dates):
+    """The former dict-and-loop construction, kept as the benchmark baseline"""
+    lookup = {
+        (row[0], row[1]): tuple(row[2:])
+        for row in counts.itertuples(index=False, name=None)
+    }
+    date_dataframes = {}
+    for target_date in target_dates:
+        date_results = []
+        for meter in registry:
+            meter_number = meter['meter_number']
+            load_without, load_with, midnight_without, midnight_with = lookup.get(
+                (meter_number, target_date), (0, 0, 0, 0)
+            )
+            expected_load = meter['expected_load']
+            date_results.append({
+                'Meter Number': meter_number,
+                'Type': meter['type'],
+                'Expected Load': expected_load,
+                'Load Received Without Reconcillation': load_without,
+                'Received Load Percentage': round((load_without / expected_load) * 100, 2) if expected_load > 0 else 0,
+                'Load Received With Reconcillation': load_with,
+                'Received Load Percentage with Reconcillation': round((load_with / expected_load) * 100, 2) if expected_load > 0 else 0,
+                'Midnight Received without Reconcillation': midnight_without,
+                'Midnight Received with Reconcillation': midnight_with
+            })
+        date_dataframes[target_date] = pd.DataFrame(date_results)
+    return date_dataframes
+
+def timed(func, *args, repeat=3):
+    """Best wall time of repeat runs, with the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def peak_memory(func, *args):
+    """Peak memory in bytes allocated by Python during one run of func"""
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def check_date_frames(meter_count, day_count):
+    """Confirm the vectorized frames match the legacy loop and report the speedup"""
+    registry, target_dates, counts = synthetic_counts(meter_count, day_count)
+    legacy_time, legacy = timed(legacy_date_frames, counts, registry, target_dates)
+    vector_time, vector = timed(database.build_date_frames, counts, registry, target_dates)
+
+    for target_date in target_dates:
+        # The legacy loop predates the Source column
+        expected = legacy[target_date]
+        pd.testing.assert_frame_equal(expected, vector[target_date][expected.columns], check_dtype=False)
+
+    print(f"build_date_frames  {meter_count} meters x {day_count} days")
+    print(f"  legacy loop  {legacy_time * 1000:9.1f} ms")
+    print(f"  vectorized   {vector_time * 1000:9.1f} ms  ({legacy_time / vector_time:.1f}x faster)")
+
+def in_memory_stages(meter_count, day_count):
+    """(name, func, args) for the stages that need no database"""
+    registry, target_dates, counts = synthetic_counts(meter_count, day_count)
+    frames = database.build_date_frames(counts, registry, target_dates)
+    one_day = frames[target_dates[0]]
+    return [
+        ('build_date_frames', database.build_date_frames, (counts, registry, target_dates)),
+        ('compute_fleet_summary', styling.compute_fleet_summary, (frames,)),
+        ('apply_sla_styling', lambda df: styling.apply_sla_styling(df)._compute(), (one_day,)),
+    ]
+
+def database_stages(day_count):
+    """(name, func, args) for the query stages, using the configured registry and database"""
+    last_day = date.today() - timedelta(days=1)
+    target_dates = [(last_day - timedelta(days=d)).strftime('%Y-%m-%d') for d in range(day_count)]
+    meter_numbers = [m['meter_number'] for m in database.get_meters()]
+
+    def drain_alarms(dates):
+        return sum(1 for _ in database.iter_alarms(dates, meter_numbers))
+
+    return [
+        ('fetch_sla_counts', database.fetch_sla_counts, (target_dates, meter_numbers)),
+        ('fetch_alarm_counts', database.fetch_alarm_counts, (target_dates, meter_numbers)),
+        ('iter_alarms', drain_alarms, (target_dates,)),
+    ]
+
+def run_stages(stages, repeat):
+    results = {}
+    for name, func, args in stages:
+        seconds, _ = timed(func, *args, repeat=repeat)
+        peak = peak_memory(func, *args)
+        results[name] = {'seconds': seconds, 'peak_bytes': peak}
+        print(f"  {name:<24} {seconds * 1000:9.1f} ms  peak {peak / 2**20:8.1f} MiB")
+    return results
+
+def compare(results, baseline_path, tolerance):
+    """Print regressions against a saved baseline; True if none exceed tolerance"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    ok = True
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for key in ('seconds', 'peak_bytes'):
+            if previous[key] and current[key] > previous[key] * (1 + tolerance):
+                ok = False
+                print(f"REGRESSION {name} {key}: {previous[key]:.4g} -> {current[key]:.4g}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--meters', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--db', action='store_true', help="also benchmark the query stages")
+    parser.add_argument('--db-days', type=int, default=3, help="days fetched by the query stages")
+    parser.add_argument('--save', help="write results to this JSON file")
+    parser.add_argument('--compare', help="compare against a JSON file written by --save")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown, e.g. 0.25 = 25%%")
+    parser.add_argument('--skip-check', action='store_true', help="skip the legacy loop comparison")
+    args = parser.parse_args()
+
+    if not args.skip_check:
+        check_date_frames(args.meters, args.days)
+
+    print(f"Stages  {args.meters} meters x {args.days} days")
+    stages = in_memory_stages(args.meters, args.days)
+    if args.db:
+        stages += database_stages(args.db_days)
+    results = run_stages(stages, args.repeat)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
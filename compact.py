@@ -0,0 +1,84 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Repeated string columns held as categoricals in cached frames
+CATEGORY_COLUMNS = ('Meter Number', 'Type', 'Source', 'meter_number', 'type', 'alarm_type')
+
+def downcast_integers(series):
+    """Smallest integer dtype that holds series (unsigned when it has no negatives)"""
+    if series.empty:
+        return series
+    return pd.to_numeric(series, downcast='unsigned' if series.min() >= 0 else 'integer')
+
+def shared_categories(frames):
+    """One CategoricalDtype per category column across frames, so every date shares its categories"""
+    values = {}
+    for df in frames:
+        for col in CATEGORY_COLUMNS:
+            if col in df.columns:
+                values.setdefault(col, set()).update(df[col].dropna().astype(str).unique())
+    return {col: pd.CategoricalDtype(sorted(found)) for col, found in values.items()}
+
+def compact_frame(df, categories=None):
+    """Copy of df with categorical string columns and downcast integer columns"""
+    categories = categories or {}
+    compacted = {}
+    for col in df.columns:
+        series = df[col]
+        if col in CATEGORY_COLUMNS:
+            compacted[col] = series.astype(categories.get(col, 'category'))
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            compacted[col] = downcast_integers(series)
+        else:
+            compacted[col] = series
+    return pd.DataFrame(compacted, index=df.index)
+
+def compact_frames(frames):
+    """Compact a dict {key: DataFrame} with categories shared across all frames"""
+    categories = shared_categories(frames.values())
+    return {key: compact_frame(df, categories) for key, df in frames.items()}
+
+def compact_payload(data):
+    """Dashboard payload (see warmer.fetch_dashboard_data) with every frame compacted"""
+    return {
+        key: compact_frames(value) if key in ('sla_data', 'alarm_counts', 'latency') else value
+        for key, value in data.items()
+    }
+
+def alarm_columns(alarms):
+    """Columnar frame (meter_number, alarm_type as categoricals, alarm_time) from a list of alarm records"""
+    return pd.DataFrame({
+        'meter_number': pd.Categorical([alarm['meter_number'] for alarm in alarms]),
+        'alarm_type': pd.Categorical([alarm['alarm_type'] for alarm in alarms]),
+        'alarm_time': pd.to_datetime([alarm['alarm_time'] for alarm in alarms]),
+    })
+
+def footprint(value, _seen=None):
+    """
+    Approximate bytes held by value: deep frame memory plus containers, arrays and scalars
+    Categories shared between frames (see shared_categories) are counted once.
+    """
+    seen = set() if _seen is None else _seen
+    if isinstance(value, pd.DataFrame):
+        return int(value.index.memory_usage(deep=True)) + sum(_series_bytes(value[col], seen) for col in value.columns)
+    if isinstance(value, pd.Series):
+        return int(value.index.memory_usage(deep=True)) + _series_bytes(value, seen)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(footprint(k, seen) + footprint(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(footprint(item, seen) for item in value)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+def _series_bytes(series, seen):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        shared = id(categories) in seen
+        seen.add(id(categories))
+        return int(series.cat.codes.nbytes) + (0 if shared else int(categories.memory_usage(deep=True)))
+    return int(series.memory_usage(deep=True, index=False))
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 try:
     import mysql.connector
@@ -5,278 +6,1670 @@ except ImportError:
     # Fallback for Streamlit Cloud
     import pymysql as mysql
 from datetime import datetime, timedelta
-import streamlit as st
-
-# Fixed meters list (keep exactly as is)
-FIXED_METERS = [
-    {'meter_number': 'AS3313009', 'type': '4G'},
-    {'meter_number': 'AS3313010', 'type': '4G'},
-    {'meter_number': 'AS3313011', 'type': 'BLE'},
-    {'meter_number': 'AS3313012', 'type': 'BLE'},
-    {'meter_number': 'AS3313013', 'type': 'BLE'},
-    {'meter_number': 'AS3313014', 'type': 'BLE'},
-    {'meter_number': 'AS3313015', 'type': '4G'},
-    {'meter_number': 'AS3313017', 'type': 'BLE'},
-    {'meter_number': 'AS3313019', 'type': '4G'},
-    {'meter_number': 'AS3313020', 'type': 'BLE'}
-]
-
-def get_db_connection():
-    """Create database connection using Streamlit secrets"""
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+import math
+from contextlib import contextmanager
+import re
+import logging
+import sys
+import threading
+import time
+import tomllib
+import aggregate_store
+import latency
+import meters
+import metrics
+import slots
+import utils
+
+logger = logging.getLogger('sla_dashboard.database')
+
+class DataAccessError(Exception):
+    """Base class for errors raised by the data access functions in this module"""
+
+class ConfigurationError(DataAccessError):
+    """A required configuration section such as [db_connection] is missing"""
+
+class DatabaseConnectionError(DataAccessError):
+    """A database connection could not be opened"""
+
+class QueryError(DataAccessError):
+    """A query failed; name is the metrics name of the query or task"""
+
+    def __init__(self, message, name=None):
+        super().__init__(message)
+        self.name = name
+
+class QueryTimeoutError(QueryError):
+    """A query or task outlived its timeout"""
+
+class PoolExhaustedError(DataAccessError):
+    """Raised when no pooled connection becomes free within the pool timeout"""
+
+class CircuitOpenError(DatabaseConnectionError):
+    """Raised without touching the network while the circuit breaker considers the database down"""
+
+# MySQL error raised when a MAX_EXECUTION_TIME hint aborts a SELECT
+MYSQL_QUERY_TIMEOUT_ERRNO = 3024
+
+# Client errors meaning the server is unreachable or the connection dropped:
+# can't connect (2002/2003), unknown host (2005), server gone away (2006),
+# lost connection (2013), can't read handshake (2055)
+MYSQL_CONNECTION_ERRNOS = {2002, 2003, 2005, 2006, 2013, 2055}
+
+def is_connection_error(error):
+    """True for failures that say the database is unreachable rather than that a query was bad"""
+    if isinstance(error, DatabaseConnectionError):
+        return True
+    errno = getattr(error, 'errno', None) or (error.args[0] if error.args else None)
+    return errno in MYSQL_CONNECTION_ERRNOS
+
+# Configuration and message sink injected by scripts and workers; None means
+# read Streamlit secrets and show messages on the page
+_config = None
+_message_sink = None
+
+def configure(config=None, message_sink=None):
+    """
+    Use config ({section: {key: value}}) instead of Streamlit secrets, and send
+    notifications to message_sink(level, message) instead of the page or the log
+    """
+    global _config, _message_sink
+    _config = config
+    _message_sink = message_sink
+
+def load_config_file(path='.streamlit/secrets.toml'):
+    """Read a secrets.toml-style file without importing Streamlit"""
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+def get_config_section(name):
+    """A configuration section as a dict, from injected config or Streamlit secrets; {} if absent"""
+    if _config is not None:
+        return dict(_config.get(name, {}))
+    import streamlit as st
+    try:
+        return dict(st.secrets[name]) if name in st.secrets else {}
+    except Exception:
+        return {}
+
+def _streamlit_context():
+    """The running Streamlit script's context, or None outside a Streamlit session"""
+    if 'streamlit' not in sys.modules:
+        return None
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    return get_script_run_ctx(suppress_warning=True)
+
+def notify(level, message):
+    """
+    Report message ('error', 'warning' or 'write') to the configured message sink,
+    else on the page in a Streamlit session, else to the log
+    """
+    if _message_sink is not None:
+        _message_sink(level, message)
+    elif _streamlit_context() is not None:
+        import streamlit as st
+        getattr(st, level)(message)
+    else:
+        logger.log({'error': logging.ERROR, 'warning': logging.WARNING}.get(level, logging.INFO), message)
+
+# Schema queried when neither [db_connection] nor [hes_sources] names one
+DEFAULT_SCHEMA = 'sense_hes_demo'
+
+# Schema names are interpolated into SQL, so only plain identifiers are accepted
+SCHEMA_NAME = re.compile(r'^[A-Za-z0-9_$]+$')
+
+def get_hes_sources():
+    """
+    HES instances to query, in configuration order
+    Each [hes_sources.<name>] table gives a schema and optionally its own
+    connection settings (host, port, database, user, password, pool_size, ...)
+    and query_timeout; anything it leaves out comes from [db_connection] and
+    [query_execution]. Without [hes_sources] there is a single source named after
+    the [db_connection] schema (default sense_hes_demo). Meters the registry does
+    not assign to a source belong to the first one.
+    Returns: list of {'name', 'schema', 'connection', 'query_timeout'}
+    Raises ConfigurationError for a schema name that is not a plain identifier.
+    """
+    base = get_config_section('db_connection')
+    configured = get_config_section('hes_sources')
+    base_schema = base.pop('schema', DEFAULT_SCHEMA)
+    query_timeout = get_execution_settings()['query_timeout']
+
+    sources = []
+    for name, settings in (configured.items() if configured else [(base_schema, {})]):
+        settings = dict(settings)
+        schema = settings.pop('schema', base_schema)
+        if not SCHEMA_NAME.match(schema):
+            raise ConfigurationError(f"Invalid schema name for HES source {name}: {schema!r}")
+        sources.append({
+            'name': name,
+            'schema': schema,
+            'query_timeout': float(settings.pop('query_timeout', query_timeout)),
+            'connection': {**base, **settings},
+        })
+    return sources
+
+def get_hes_source(name=None):
+    """
+    The configured HES source called name, or the first source when name is None
+    Raises ConfigurationError for an unknown name.
+    """
+    sources = get_hes_sources()
+    if name is None:
+        return sources[0]
+    for source in sources:
+        if source['name'] == name:
+            return source
+    raise ConfigurationError(f"HES source {name!r} is not configured in [hes_sources]")
+
+def source_table(source, table):
+    """Schema-qualified name of table in a get_hes_sources() record"""
+    return f"{source['schema']}.{table}"
+
+def get_db_connection(source=None):
+    """
+    Create database connection to an HES source (default: the first)
+    Connection settings come from [hes_sources] on top of [db_connection].
+    Raises ConfigurationError or DatabaseConnectionError.
+    """
+    # Check if configuration is available
+    source = get_hes_source(source)
+    db_config = source['connection']
+    if not db_config:
+        raise ConfigurationError("Database configuration not found in secrets")
     try:
-        # Check if secrets are available
-        if 'db_connection' not in st.secrets:
-            st.error("❌ Database configuration not found in secrets")
-            return None
-            
         conn = mysql.connector.connect(
-            host=st.secrets['db_connection']['host'],
-            port=st.secrets['db_connection']['port'],
-            database=st.secrets['db_connection']['database'],
-            user=st.secrets['db_connection']['user'],
-            password=st.secrets['db_connection']['password'],
-            connect_timeout=10,
+            host=db_config['host'],
+            port=db_config['port'],
+            database=db_config['database'],
+            user=db_config['user'],
+            password=db_config['password'],
+            connect_timeout=int(db_config.get('connect_timeout', 10)),
             buffered=True,
             autocommit=True
         )
         return conn
     except Exception as e:
-        st.error(f"❌ Connection failed: {str(e)}")
-        return None
+        raise DatabaseConnectionError(f"Connection to {source['name']} failed: {str(e)}") from e
 
-# Rest of your database.py code remains EXACTLY THE SAME...
-def test_db_connection():
-    """Test database connection"""
-    conn = get_db_connection()
-    if conn:
-        conn.close()
+class CircuitBreaker:
+    """
+    Process-wide record of whether one HES database is reachable
+    Closed: requests go through. After failure_threshold consecutive connection
+    failures (or one health check that could not connect) it opens: requests raise
+    CircuitOpenError immediately, and a background thread probes the database
+    every reset_timeout seconds (half-open) until a probe succeeds and it closes.
+    A successful health check is trusted for health_ttl seconds.
+    """
+
+    def __init__(self, probe, failure_threshold=3, reset_timeout=30, health_ttl=30):
+        self._probe = probe
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.health_ttl = health_ttl
+        self._lock = threading.Lock()
+        self._prober = None
+        self.state = 'closed'
+        self.failures = 0
+        self.last_error = None
+        self.opened_at = None
+        self.last_success = None
+
+    def before_request(self):
+        """Raise CircuitOpenError unless the circuit is closed"""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            retry_in = max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+            error = self.last_error
+        raise CircuitOpenError(f"Database unavailable, next check in {retry_in:.0f}s (last error: {error})")
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.last_success = time.monotonic()
+
+    def record_failure(self, error, trip=False):
+        """Count a connection failure; trip opens the circuit at once"""
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == 'closed' and (trip or self.failures >= self.failure_threshold):
+                self._open()
+
+    def _open(self):
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+        if self._prober is None or not self._prober.is_alive():
+            self._prober = threading.Thread(target=self._probe_until_closed, name="sla-db-probe", daemon=True)
+            self._prober.start()
+
+    def _probe_until_closed(self):
+        while True:
+            time.sleep(self.reset_timeout)
+            with self._lock:
+                self.state = 'half_open'
+            try:
+                self._probe()
+            except Exception as e:
+                with self._lock:
+                    self.state = 'open'
+                    self.opened_at = time.monotonic()
+                    self.last_error = str(e)
+                continue
+            self.record_success()
+            return
+
+    def check_health(self, check):
+        """
+        Cached health: False at once while open, True if a check succeeded within
+        health_ttl, otherwise run check() and record its outcome
+        Only connection errors count against the circuit; any other failure is
+        reported as unhealthy without tripping it.
+        """
+        with self._lock:
+            if self.state != 'closed':
+                return False
+            if self.last_success is not None and time.monotonic() - self.last_success < self.health_ttl:
+                return True
+        try:
+            check()
+        except Exception as e:
+            if is_connection_error(e):
+                self.record_failure(e, trip=True)
+            return False
+        self.record_success()
         return True
-    return False
 
-def execute_query(query, params=None):
-    """Execute query and return results"""
-    conn = None
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return []
-        
-        cursor = conn.cursor()
-        start_time = datetime.now()
-        
-        if params:
-            cursor.execute(query, params)
+    def status(self):
+        """Snapshot for the connection-status expander"""
+        with self._lock:
+            retry_in = (
+                max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+                if self.state != 'closed' else None
+            )
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'last_error': self.last_error,
+                'retry_in': retry_in,
+            }
+
+class _PooledConnection:
+    """A live connection plus the bookkeeping the pool needs to reuse it"""
+
+    def __init__(self, conn, max_prepared):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.max_prepared = max_prepared
+        self.prepared = OrderedDict()
+
+    def cursor_for(self, query):
+        """
+        Return (cursor, reusable, cache_hit) for query
+        Prepared cursors are cached per statement text so repeated queries skip re-preparing.
+        """
+        if self.max_prepared <= 0:
+            return self.conn.cursor(), False, False
+
+        cursor = self.prepared.get(query)
+        if cursor is not None:
+            self.prepared.move_to_end(query)
+            return cursor, True, True
+
+        # Connections are opened with buffered=True, and the driver has no buffered
+        # prepared cursor; execute_query always fetches every row, so unbuffered is safe
+        cursor = self.conn.cursor(prepared=True, buffered=False)
+        self.prepared[query] = cursor
+        if len(self.prepared) > self.max_prepared:
+            _, evicted = self.prepared.popitem(last=False)
+            try:
+                evicted.close()
+            except Exception:
+                pass
+        return cursor, True, False
+
+    def close(self):
+        for cursor in self.prepared.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self.prepared.clear()
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    """
+    Process-wide pool of reusable MySQL connections
+    Connections idle longer than health_check_interval are pinged before reuse,
+    and connections older than pool_recycle seconds are closed and replaced.
+    """
+
+    def __init__(self, connect, pool_size=5, pool_timeout=10, pool_recycle=1800,
+                 health_check_interval=30, max_prepared=32, breaker=None):
+        self._connect = connect
+        self.breaker = breaker
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.health_check_interval = health_check_interval
+        self.max_prepared = max_prepared
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'recycled': 0,
+            'health_check_failures': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'prepared_hits': 0,
+            'in_use': 0,
+        }
+
+    def _is_stale(self, pooled, now):
+        return now - pooled.created_at > self.pool_recycle
+
+    def _is_healthy(self, pooled, now):
+        if now - pooled.last_used < self.health_check_interval:
+            return True
+        try:
+            pooled.conn.ping(reconnect=False)
+            return True
+        except Exception:
+            with self._lock:
+                self._stats['health_check_failures'] += 1
+            return False
+
+    def acquire(self, timeout=None):
+        """
+        Check out a connection, blocking up to timeout (default pool_timeout) seconds for a free slot
+        Fails fast with CircuitOpenError while the breaker considers the database down.
+        """
+        if self.breaker:
+            self.breaker.before_request()
+        timeout = self.pool_timeout if timeout is None else max(0.0, timeout)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['waits'] += 1
+            if not self._slots.acquire(timeout=timeout):
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                raise PoolExhaustedError(
+                    f"No database connection free after {timeout:.0f}s (pool size {self.pool_size})"
+                )
+
+        try:
+            while True:
+                with self._lock:
+                    pooled = self._idle.pop() if self._idle else None
+                if pooled is None:
+                    break
+
+                now = time.monotonic()
+                if self._is_stale(pooled, now) or not self._is_healthy(pooled, now):
+                    pooled.close()
+                    with self._lock:
+                        self._stats['recycled'] += 1
+                    continue
+
+                with self._lock:
+                    self._stats['reused'] += 1
+                    self._stats['in_use'] += 1
+                return pooled
+
+            try:
+                conn = self._connect()
+                if conn is None:
+                    raise DatabaseConnectionError("Could not open a database connection")
+            except Exception as e:
+                if self.breaker and is_connection_error(e):
+                    self.breaker.record_failure(e)
+                raise
+            if self.breaker:
+                self.breaker.record_success()
+            with self._lock:
+                self._stats['created'] += 1
+                self._stats['in_use'] += 1
+            return _PooledConnection(conn, self.max_prepared)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, pooled, discard=False):
+        """Return a connection to the pool, closing it instead if discard is set"""
+        try:
+            if discard or self._is_stale(pooled, time.monotonic()):
+                pooled.close()
+                with self._lock:
+                    self._stats['recycled'] += 1
+            else:
+                pooled.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(pooled)
+        finally:
+            with self._lock:
+                self._stats['in_use'] -= 1
+            self._slots.release()
+
+    def cursor(self, pooled, query):
+        """Cursor for query on a checked-out connection, counting prepared-statement reuse"""
+        cursor, reusable, cache_hit = pooled.cursor_for(query)
+        if cache_hit:
+            with self._lock:
+                self._stats['prepared_hits'] += 1
+        return cursor, reusable
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that checks out a connection (see acquire) and always gives it back"""
+        pooled = self.acquire(timeout)
+        try:
+            yield pooled
+        except Exception as e:
+            self.release(pooled, discard=True)
+            if self.breaker and is_connection_error(e):
+                self.breaker.record_failure(e)
+            raise
         else:
-            cursor.execute(query)
-        
-        results = cursor.fetchall()
-        cursor.close()
-        
-        query_time = (datetime.now() - start_time).total_seconds()
-        if query_time > 2.0:
-            st.warning(f"⚠️ Query took {query_time:.2f}s")
-        
+            self.release(pooled)
+
+    def stats(self):
+        """Snapshot of pool counters for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['pool_size'] = self.pool_size
+        return stats
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for pooled in idle:
+            pooled.close()
+
+# One pool and one circuit breaker per HES source, keyed by source name
+_pools = {}
+_pool_lock = threading.Lock()
+
+def get_pool(source=None):
+    """
+    Return the process-wide connection pool of an HES source (default: the first),
+    creating it from its configuration on first use
+    Raises ConfigurationError when the source has no connection settings.
+    """
+    source = get_hes_source(source)
+    name = source['name']
+    pool = _pools.get(name)
+    if pool is not None:
+        return pool
+
+    with _pool_lock:
+        if name not in _pools:
+            db_config = source['connection']
+            if not db_config:
+                raise ConfigurationError("Database configuration not found in secrets")
+
+            _pools[name] = ConnectionPool(
+                lambda: get_db_connection(name),
+                pool_size=int(db_config.get('pool_size', 5)),
+                pool_timeout=float(db_config.get('pool_timeout', 10)),
+                pool_recycle=float(db_config.get('pool_recycle', 1800)),
+                health_check_interval=float(db_config.get('health_check_interval', 30)),
+                max_prepared=int(db_config.get('max_prepared_statements', 32)),
+                breaker=get_circuit_breaker(name)
+            )
+    return _pools[name]
+
+def smallest_pool_size():
+    """Connection pool size of the most constrained HES source"""
+    return min(int(source['connection'].get('pool_size', 5)) for source in get_hes_sources())
+
+_breakers = {}
+_breaker_lock = threading.Lock()
+
+def probe_database(source=None):
+    """Open a fresh connection, ping and close it; used for half-open probes"""
+    conn = get_db_connection(source)
+    try:
+        conn.ping(reconnect=False)
+    finally:
+        conn.close()
+
+def get_circuit_breaker(source=None):
+    """
+    Return the process-wide circuit breaker of an HES source, shared by every session
+    Configured by the optional [circuit_breaker] secrets section
+    (failure_threshold, reset_timeout, health_ttl).
+    """
+    name = get_hes_source(source)['name']
+    with _breaker_lock:
+        if name not in _breakers:
+            settings = get_config_section('circuit_breaker')
+            _breakers[name] = CircuitBreaker(
+                lambda: probe_database(name),
+                failure_threshold=int(settings.get('failure_threshold', 3)),
+                reset_timeout=float(settings.get('reset_timeout', 30)),
+                health_ttl=float(settings.get('health_ttl', 30))
+            )
+        return _breakers[name]
+
+def get_db_health():
+    """
+    Cached database health for the page: {'healthy', 'state', 'failures', 'last_error',
+    'retry_in', 'sources', 'unavailable'}, where sources maps each HES source name to
+    its own {'healthy', 'state', ...} and unavailable lists the unhealthy ones. Healthy
+    while any source is, so one HES instance being down only takes out its own
+    meters; the other top-level fields describe the first unhealthy source. Sources
+    are checked concurrently and never waited on while their circuit is open.
+    """
+    try:
+        names = [source['name'] for source in get_hes_sources()]
+    except ConfigurationError as e:
+        return {
+            'healthy': False, 'state': 'closed', 'failures': 0, 'last_error': str(e), 'retry_in': None,
+            'sources': {}, 'unavailable': []
+        }
+    checks = run_tasks({name: (test_db_connection, (name,)) for name in names})
+    sources = {
+        name: {'healthy': bool(checks[name]), **get_circuit_breaker(name).status()}
+        for name in names
+    }
+    unavailable = [name for name in names if not sources[name]['healthy']]
+    first = sources[unavailable[0] if unavailable else names[0]]
+    return {**first, 'healthy': len(unavailable) < len(names), 'sources': sources, 'unavailable': unavailable}
+
+def get_pool_stats(source=None):
+    """
+    Pool counters for the connection-status expander and monitoring: one source's,
+    or summed over every HES source when source is None; {} when unconfigured
+    """
+    try:
+        if source is not None:
+            return get_pool(source).stats()
+        names = [s['name'] for s in get_hes_sources()]
+    except ConfigurationError:
+        return {}
+    per_source = [stats for stats in (get_pool_stats(name) for name in names) if stats]
+    if not per_source:
+        return {}
+    return {key: sum(stats[key] for stats in per_source) for key in per_source[0]}
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_aggregate_store():
+    """
+    Return the process-wide on-disk store for closed days, or None if disabled
+    Configured by the optional [aggregate_store] secrets section (enabled, path).
+    """
+    global _store
+    if _store is not None:
+        return _store
+
+    with _store_lock:
+        if _store is None:
+            settings = get_config_section('aggregate_store')
+            if not settings.get('enabled', True):
+                return None
+            _store = aggregate_store.AggregateStore(settings.get('path', '.sla_cache/aggregates.sqlite3'))
+    return _store
+
+def invalidate_stored_days(target_dates):
+    """Drop stored closed days so late reconciliation is picked up on the next fetch"""
+    store = get_aggregate_store()
+    if store:
+        store.invalidate(target_dates)
+
+def missing_fetches(target_dates, meter_numbers, stored):
+    """
+    What the aggregate store lacks for target_dates, as [(dates, meter numbers)] to fetch
+    stored maps each stored date to the meters it covers; days lacking the same
+    meters share one fetch, so a meter added to the registry is fetched for the
+    stored days instead of showing as zero on them.
+    """
+    wanted = frozenset(meter_numbers)
+    groups = {}
+    for date_str in target_dates:
+        missing = wanted - stored.get(date_str, frozenset())
+        if missing:
+            groups.setdefault(missing, []).append(date_str)
+    return [(dates, [m for m in meter_numbers if m in missing]) for missing, dates in groups.items()]
+
+def covered_rows(frame, stored, meter_numbers):
+    """Rows of a frame read from the store for the wanted meters its date covers"""
+    wanted = frozenset(meter_numbers)
+    keep = np.zeros(len(frame), dtype=bool)
+    for date_str, covered in stored.items():
+        keep |= (frame['date'] == date_str).to_numpy() & frame['meter_number'].isin(covered & wanted).to_numpy()
+    return frame[keep]
+
+def answered_meters(meter_numbers, unavailable):
+    """meter_numbers less those held by the HES sources in unavailable, i.e. the meters safe to store"""
+    if not unavailable:
+        return list(meter_numbers)
+    return [
+        meter_number
+        for source, batch in source_batches(meter_numbers) if source['name'] not in unavailable
+        for meter_number in batch
+    ]
+
+def test_db_connection(source=None):
+    """
+    Test the connection to an HES source (default: the first) on a dedicated connection
+    The ping never waits for the query pool, so a busy pool is not mistaken for
+    an unreachable database. The result is cached by the circuit breaker: a recent
+    success is reused and an open circuit answers False without touching the network.
+    """
+    try:
+        name = get_hes_source(source)['name']
+        breaker = get_circuit_breaker(name)
+    except ConfigurationError:
+        return False
+    return breaker.check_health(lambda: probe_database(name))
+
+def with_timeout_hint(query, timeout):
+    """Add a MAX_EXECUTION_TIME optimizer hint so MySQL aborts the SELECT after timeout seconds"""
+    if not timeout:
+        return query
+    return re.sub(r'^\s*SELECT', f"SELECT /*+ MAX_EXECUTION_TIME({int(timeout * 1000)}) */", query, count=1)
+
+def as_data_access_error(error, name):
+    """Wrap a driver exception in the matching DataAccessError subclass"""
+    if isinstance(error, DataAccessError):
+        return error
+    errno = getattr(error, 'errno', None) or (error.args[0] if error.args else None)
+    if errno == MYSQL_QUERY_TIMEOUT_ERRNO:
+        wrapped = QueryTimeoutError(f"{name} exceeded its execution time limit", name)
+    else:
+        wrapped = QueryError(f"{name} failed: {str(error)}", name)
+    wrapped.__cause__ = error
+    return wrapped
+
+def execute_query(query, params=None, timeout=None, raise_errors=True, name='query', source=None):
+    """
+    Execute query on a pooled connection to an HES source (default: the first) and return results
+    Connect, execute and fetch times, row counts and errors are recorded in
+    metrics under name. Inside a run_tasks task the wait for a pooled connection
+    lasts until that run's deadline, so fan-outs larger than the pool queue for
+    connections instead of failing after pool_timeout. Failures raise a
+    DataAccessError (QueryTimeoutError when the timeout hint aborted the query);
+    with raise_errors=False they are reported and swallowed into an empty result instead.
+    """
+    try:
+        pool = get_pool(source)
+        query = with_timeout_hint(query, timeout)
+        with metrics.QueryTimer(name) as timer:
+            timer.phase('connect')
+            deadline = task_deadline()
+            with pool.connection(None if deadline is None else deadline - time.monotonic()) as pooled:
+                cursor, reusable = pool.cursor(pooled, query)
+
+                timer.phase('execute')
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+
+                timer.phase('fetch')
+                results = cursor.fetchall()
+                timer.rows = len(results)
+                if not reusable:
+                    cursor.close()
+
+        if timer.total > 2.0:
+            notify('warning', f"⚠️ Query {name} took {timer.total:.2f}s")
+
         return results
     except Exception as e:
-        st.error(f"Query error: {str(e)}")
+        error = as_data_access_error(e, name)
+        if raise_errors:
+            raise error
+        notify('error', f"Query error: {str(error)}")
         return []
+
+def get_execution_settings():
+    """
+    Concurrency settings from the optional [query_execution] secrets section
+    mode: 'concurrent' (default) or 'serial'; max_workers bounds parallel queries;
+    query_timeout is the per-query limit in seconds.
+    """
+    settings = get_config_section('query_execution')
+    return {
+        'mode': settings.get('mode', 'concurrent'),
+        'max_workers': int(settings.get('max_workers', 4)),
+        'query_timeout': float(settings.get('query_timeout', 30)),
+        'min_free_connections': int(settings.get('min_free_connections', 2)),
+    }
+
+def db_under_pressure(min_free_connections):
+    """True when the pool has too few free slots to fan out queries"""
+    stats = get_pool_stats()
+    if not stats:
+        return False
+    return stats['pool_size'] - stats['in_use'] < min_free_connections
+
+def use_serial_execution(settings, task_count):
+    """True when tasks should run one after another rather than fan out"""
+    return (
+        settings['mode'] == 'serial'
+        or getattr(_task_context, 'serial', False)
+        or task_count < 2
+        or db_under_pressure(settings['min_free_connections'])
+    )
+
+def collect_task_results(outcomes, raise_errors):
+    """
+    Turn {name: (result, error)} into {name: result}
+    Failed tasks are reported and yield None, or the first error is raised when raise_errors is set.
+    """
+    results = {}
+    for name, (result, error) in outcomes.items():
+        if error is not None:
+            if raise_errors:
+                raise error
+            if isinstance(error, QueryTimeoutError):
+                notify('warning', f"⚠️ {str(error)}")
+            elif getattr(error, 'name', None) == name:
+                notify('error', str(error))
+            else:
+                notify('error', f"Error in {name}: {str(error)}")
+            results[name] = None
+        else:
+            results[name] = result
+    return results
+
+# Per-thread state of the run_tasks call whose task the thread is running
+_task_context = threading.local()
+
+def task_deadline():
+    """time.monotonic() deadline of the run_tasks call this thread is running a task for, or None"""
+    return getattr(_task_context, 'deadline', None)
+
+@contextmanager
+def _task_deadline(deadline):
+    previous = task_deadline()
+    _task_context.deadline = deadline
+    try:
+        yield
     finally:
-        if conn:
-            conn.close()
+        _task_context.deadline = previous
 
-def get_alarms_data(target_dates):
+@contextmanager
+def serial_tasks():
     """
-    Fetch alarm data for all target dates in optimized query
-    Returns: dict {date: list of alarm records}
+    Run every run_tasks call made by this thread inside the block serially
+    For callers that already fan out themselves, so nested fan-out cannot
+    multiply their threads past the connection pool.
+    """
+    previous = getattr(_task_context, 'serial', False)
+    _task_context.serial = True
+    try:
+        yield
+    finally:
+        _task_context.serial = previous
+
+def run_tasks(tasks, timeout=None, raise_errors=False):
+    """
+    Run named tasks {name: (func, args)} and return {name: result}
+    Tasks run on a bounded thread pool unless serial mode is configured or the
+    pool is under pressure. A task that fails or outlives the timeout (default
+    query_timeout) yields None, or raises its DataAccessError when raise_errors
+    is set; tasks not yet started by then are cancelled. Called from inside
+    another run_tasks task, it shares that run's deadline instead: the outer
+    timeout is sized for every query underneath it (see fetch_timeout).
     """
+    settings = get_execution_settings()
+    timeout = timeout or settings['query_timeout']
+    outer_deadline = task_deadline()
+    if outer_deadline is not None:
+        timeout = max(0.0, outer_deadline - time.monotonic())
+    deadline = time.monotonic() + timeout
+
+    if use_serial_execution(settings, len(tasks)):
+        outcomes = {}
+        with _task_deadline(deadline):
+            for name, (func, args) in tasks.items():
+                try:
+                    outcomes[name] = (func(*args), None)
+                except Exception as e:
+                    outcomes[name] = (None, as_data_access_error(e, name))
+        return collect_task_results(outcomes, raise_errors)
+
+    # Worker threads share the session's context so their messages reach the page
+    ctx = _streamlit_context()
+
+    def run_with_ctx(func, args):
+        if ctx is not None:
+            from streamlit.runtime.scriptrunner import add_script_run_ctx
+            add_script_run_ctx(threading.current_thread(), ctx)
+        with _task_deadline(deadline):
+            return func(*args)
+
+    executor = ThreadPoolExecutor(max_workers=min(settings['max_workers'], len(tasks)))
     try:
-        if not target_dates:
-            return {}
-        
-        meter_numbers = [m['meter_number'] for m in FIXED_METERS]
-        meter_placeholders = ', '.join(['%s'] * len(meter_numbers))
-        
-        # Build date conditions for BETWEEN clauses
-        date_conditions = []
-        for date_str in target_dates:
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            next_day = (date_obj + timedelta(days=1)).strftime('%Y-%m-%d')
-            date_conditions.append(f"(alarm_time BETWEEN '{date_str} 00:00:00' AND '{next_day} 00:00:00')")
-        
-        date_condition = ' OR '.join(date_conditions)
-        
-        # OPTIMIZED QUERY: Alarm data for all dates
+        futures = {name: executor.submit(run_with_ctx, func, args) for name, (func, args) in tasks.items()}
+        done, not_done = wait(futures.values(), timeout=timeout)
+
+        outcomes = {}
+        for name, future in futures.items():
+            if future in not_done:
+                future.cancel()
+                outcomes[name] = (None, QueryTimeoutError(f"{name} timed out after {timeout:.0f}s", name))
+            elif future.exception() is not None:
+                outcomes[name] = (None, as_data_access_error(future.exception(), name))
+            else:
+                outcomes[name] = (future.result(), None)
+        return collect_task_results(outcomes, raise_errors)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+_registry = {'meters': None, 'loaded_at': 0.0}
+_registry_lock = threading.Lock()
+
+def get_registry_settings():
+    """
+    Meter registry settings from the optional [meter_registry] secrets section
+    source: 'fixed' (default), 'file' (CSV at path) or 'table' (rows from query,
+    run against every HES source with {schema} replaced by that source's schema); ttl: seconds before the registry is reloaded; lists longer than
+    in_list_threshold are queried in batches of batch_size meters.
+    """
+    settings = get_config_section('meter_registry')
+    return {
+        'source': settings.get('source', 'fixed'),
+        'path': settings.get('path', 'meters.csv'),
+        'query': settings.get(
+            'query',
+            "SELECT meter_number, type, expected_load, group_name FROM {schema}.meter_registry"
+        ),
+        'ttl': float(settings.get('ttl', 600)),
+        'in_list_threshold': int(settings.get('in_list_threshold', 1000)),
+        'batch_size': int(settings.get('batch_size', 1000)),
+    }
+
+def load_meters(settings, previous=None):
+    """
+    Load registry records from the configured source
+    From tables, a HES source that cannot be read keeps its meters from the
+    previous registry (if any) instead of failing the whole load.
+    Raises: DataAccessError when no source could be read
+    """
+    if settings['source'] == 'file':
+        return meters.load_meters_from_csv(settings['path'])
+    if settings['source'] == 'table':
+        # Each HES source lists its own meters; a meter listed twice keeps the first source
+        sources = get_hes_sources()
+        tasks = {
+            f"meter registry ({source['name']})": (
+                execute_query,
+                (settings['query'].replace('{schema}', source['schema']), None, source['query_timeout'],
+                 True, 'meter registry', source['name'])
+            )
+            for source in sources
+        }
+        results = run_tasks(tasks)
+        failed = [source['name'] for source in sources if results[f"meter registry ({source['name']})"] is None]
+        if len(failed) == len(sources):
+            raise DataAccessError(f"Meter registry could not be read from {', '.join(failed)}")
+        previous = previous or []
+        return meters.normalize_meters(
+            record
+            for source in sources
+            for record in (
+                [meter for meter in previous if meter.get('source') == source['name']]
+                if source['name'] in failed
+                else meters.meters_from_rows(results[f"meter registry ({source['name']})"], source['name'])
+            )
+        )
+    return meters.normalize_meters(meters.FIXED_METERS)
+
+def get_meters():
+    """
+    Return the monitored meters as registry records
+    (meter_number, type, expected_load, group), reloaded every ttl seconds.
+    A failed reload keeps the previous registry, or the fixed list on first load.
+    """
+    settings = get_registry_settings()
+    with _registry_lock:
+        fresh = time.monotonic() - _registry['loaded_at'] < settings['ttl']
+        if _registry['meters'] is not None and fresh:
+            return _registry['meters']
+        try:
+            loaded = load_meters(settings, _registry['meters'])
+            if not loaded:
+                raise ValueError("meter registry is empty")
+            _registry['meters'] = loaded
+        except Exception as e:
+            notify('warning', f"⚠️ Meter registry unavailable, using previous list: {str(e)}")
+            if _registry['meters'] is None:
+                _registry['meters'] = meters.normalize_meters(meters.FIXED_METERS)
+        _registry['loaded_at'] = time.monotonic()
+        return _registry['meters']
+
+def meter_batches(meter_numbers):
+    """Split meter numbers so no single IN-list exceeds the configured threshold"""
+    settings = get_registry_settings()
+    if len(meter_numbers) <= settings['in_list_threshold']:
+        return [meter_numbers]
+    return meters.chunk(meter_numbers, settings['batch_size'])
+
+def batched_timeout(task_count, query_timeout=None):
+    """Overall deadline for task_count queries of query_timeout (default: configured) sharing max_workers threads"""
+    settings = get_execution_settings()
+    rounds = math.ceil(task_count / max(1, settings['max_workers']))
+    return (query_timeout or settings['query_timeout']) * max(1, rounds)
+
+def fetch_timeout(queries_per_batch, meter_numbers=None):
+    """
+    Overall deadline for a fetch that runs queries_per_batch queries for every
+    (source, meter batch) pair (see source_batches) on max_workers threads;
+    meter_numbers defaults to the whole registry
+    """
+    if meter_numbers is None:
+        meter_numbers = [m['meter_number'] for m in get_meters()]
+    batches = source_batches(meter_numbers)
+    query_timeout = max((source['query_timeout'] for source, _ in batches), default=None)
+    return batched_timeout(queries_per_batch * len(batches), query_timeout)
+
+def meter_sources(registry):
+    """HES source name of each registry record, the first configured source where none is set"""
+    default = get_hes_source()['name']
+    return [meter.get('source') or default for meter in registry]
+
+def source_batches(meter_numbers):
+    """
+    Group meter numbers by the HES source holding them (see meter_sources), then
+    split each group with meter_batches; meters not in the registry go to the first source
+    Returns: list of (source record, meter number batch), so every batch is one query
+    Raises ConfigurationError when the registry names a source that is not configured.
+    """
+    registry = get_meters()
+    by_meter = dict(zip((m['meter_number'] for m in registry), meter_sources(registry)))
+    default = get_hes_source()['name']
+    grouped = {}
+    for meter_number in meter_numbers:
+        grouped.setdefault(by_meter.get(meter_number, default), []).append(meter_number)
+    return [
+        (source, batch)
+        for name, numbers in grouped.items()
+        for source in [get_hes_source(name)]
+        for batch in meter_batches(numbers)
+    ]
+
+def run_source_tasks(meter_numbers, build_tasks):
+    """
+    Fan a fetch out over every (source, batch) pair from source_batches
+    build_tasks(source, batch, label) returns {task name: (func, args)} for one
+    batch; label identifies the batch in task names. Each source's batches run as
+    one task, so a source whose queries fail or time out is left out as a whole
+    (and reported) while the others' results are kept.
+    Returns: ({task name: result} for the sources that answered, names of the sources that did not)
+    Raises: DataAccessError when no source answered
+    """
+    by_source = {}
+    timeouts = []
+    for i, (source, batch) in enumerate(source_batches(meter_numbers)):
+        by_source.setdefault(source['name'], {}).update(build_tasks(source, batch, f"{i + 1} ({source['name']})"))
+        timeouts.append(source['query_timeout'])
+    task_count = sum(len(tasks) for tasks in by_source.values())
+
+    def run_source(tasks):
+        try:
+            return run_tasks(tasks, raise_errors=True), None
+        except DataAccessError as e:
+            return None, e
+
+    # Nested run_tasks calls share this deadline, sized for every query (see run_tasks)
+    outcomes = run_tasks(
+        {name: (run_source, (tasks,)) for name, tasks in by_source.items()},
+        timeout=batched_timeout(task_count, max(timeouts, default=None))
+    )
+    results = {}
+    errors = {}
+    for name, outcome in outcomes.items():
+        if outcome is None:
+            # The source outlived the deadline, which run_tasks has already reported
+            errors[name] = QueryTimeoutError(f"{name} timed out", name)
+        elif outcome[1] is not None:
+            errors[name] = outcome[1]
+        else:
+            results.update(outcome[0])
+    if by_source and len(errors) == len(by_source):
+        raise next(iter(errors.values()))
+    for name, error in errors.items():
+        if outcomes[name] is not None:
+            notify('error', f"❌ HES source {name} unavailable, its meters are left out: {str(error)}")
+    return results, sorted(errors)
+
+def require_sources(unavailable):
+    """Raise DataAccessError naming the HES sources that did not answer, if any"""
+    if unavailable:
+        raise DataAccessError(f"HES source(s) unavailable: {', '.join(unavailable)}")
+
+# Data for a day counts as received on time until 04:10 the following morning
+SERVER_TIME_CUTOFF = timedelta(days=1, hours=4, minutes=10)
+
+def coalesce_date_ranges(target_dates):
+    """
+    Merge 'YYYY-MM-DD' dates into sorted, non-overlapping half-open ranges
+    Returns: list of (start_datetime, end_datetime) with end exclusive
+    """
+    days = sorted({datetime.strptime(date_str, '%Y-%m-%d') for date_str in target_dates})
+    ranges = []
+    for day in days:
+        if ranges and ranges[-1][1] == day:
+            ranges[-1] = (ranges[-1][0], day + timedelta(days=1))
+        else:
+            ranges.append((day, day + timedelta(days=1)))
+    return ranges
+
+def build_in_clause(column, values):
+    """Return (sql, params) for column IN (...) with one bound parameter per value"""
+    placeholders = ', '.join(['%s'] * len(values))
+    return f"{column} IN ({placeholders})", list(values)
+
+def build_range_clause(column, target_dates):
+    """
+    Return (sql, params) selecting rows whose column falls on any target date
+    Uses bare range comparisons on the column so MySQL can do an index range scan.
+    """
+    conditions = []
+    params = []
+    for start, end in coalesce_date_ranges(target_dates):
+        conditions.append(f"({column} >= %s AND {column} < %s)")
+        params.extend([start, end])
+    return '(' + ' OR '.join(conditions) + ')', params
+
+def build_cutoff_clause(column):
+    """Return (sql, params) keeping rows received before the next day's 04:10 server_time cutoff"""
+    cutoff_minutes = int(SERVER_TIME_CUTOFF.total_seconds() // 60)
+    return f"server_time < TIMESTAMPADD(MINUTE, %s, DATE({column}))", [cutoff_minutes]
+
+def build_where(*clauses):
+    """Join (sql, params) clauses with AND, returning the combined (sql, params)"""
+    sql = ' AND '.join(clause for clause, _ in clauses)
+    params = [param for _, clause_params in clauses for param in clause_params]
+    return sql, params
+
+def build_slot_mask_columns(column, on_time_sql):
+    """
+    SELECT expressions for the 96-slot received masks of column, as four 48-bit halves
+    (slots.MASK_COLUMNS order); BIT_OR ignores the NULLs of non-matching rows.
+    """
+    slot = f"((HOUR({column}) * 60 + MINUTE({column})) DIV {slots.SLOT_MINUTES})"
+    half = slots.HALF_SLOTS
+    low = f"{slot} < {half}"
+    high = f"{slot} >= {half}"
+    return [
+        f"BIT_OR(CASE WHEN {on_time_sql} AND {low} THEN 1 << {slot} END) as mask_without_recon_low",
+        f"BIT_OR(CASE WHEN {on_time_sql} AND {high} THEN 1 << ({slot} - {half}) END) as mask_without_recon_high",
+        f"BIT_OR(CASE WHEN {low} THEN 1 << {slot} END) as mask_with_recon_low",
+        f"BIT_OR(CASE WHEN {high} THEN 1 << ({slot} - {half}) END) as mask_with_recon_high",
+    ]
+
+def build_sla_count_query(table, column, meter_numbers, target_dates, slot_masks=False):
+    """
+    Return (query, params) counting distinct slots per meter and date in one pass
+    The first count keeps only on-time rows (no command_code, before the server_time
+    cutoff) and the second counts every row, i.e. with reconciliation. With
+    slot_masks the same pass also returns which 15-minute slots were received.
+    """
+    cutoff_sql, cutoff_params = build_cutoff_clause(column)
+    where_sql, where_params = build_where(
+        build_in_clause('meter_number', meter_numbers),
+        build_range_clause(column, target_dates)
+    )
+    on_time_sql = f"command_code IS NULL AND {cutoff_sql}"
+    columns = [
+        'meter_number',
+        f'DATE({column}) as date',
+        f'COUNT(DISTINCT CASE WHEN {on_time_sql} THEN {column} END) as without_recon_count',
+        f'COUNT(DISTINCT {column}) as with_recon_count',
+    ]
+    select_params = list(cutoff_params)
+    if slot_masks:
+        columns += build_slot_mask_columns(column, on_time_sql)
+        # Both without-recon masks repeat the cutoff placeholder
+        select_params += cutoff_params * 2
+    select_sql = ',\n            '.join(columns)
+    query = f"""
+        SELECT 
+            {select_sql}
+        FROM {table}
+        WHERE {where_sql}
+        GROUP BY meter_number, DATE({column})
+        """
+    return query, select_params + where_params
+
+def iter_alarms(target_dates, meter_numbers=None, fetch_size=1000):
+    """
+    Stream alarms for target dates as (date, alarm record) pairs
+    Each meter batch is one query over a single parameterized time range read
+    through an unbuffered cursor in fetch_size chunks, so memory stays flat
+    however many alarms there are; HES sources are read one after another.
+    Rows on dates outside target_dates (gaps in the range) are skipped.
+    Failures raise a DataAccessError.
+    """
+    if not target_dates:
+        return
+    
+    wanted = set(target_dates)
+    ranges = coalesce_date_ranges(target_dates)
+    start, end = ranges[0][0], ranges[-1][1]
+    if meter_numbers is None:
+        meter_numbers = [m['meter_number'] for m in get_meters()]
+    
+    for source, batch in source_batches(meter_numbers):
+        pool = get_pool(source['name'])
+        meter_sql, meter_params = build_in_clause('meter_number', batch)
         alarms_query = f"""
-        SELECT alarm_time, meter_number, alarm_type 
-        FROM sense_hes_demo.push_alarm_parsed 
-        WHERE meter_number IN ({meter_placeholders})
-          AND ({date_condition})
+        SELECT alarm_time, meter_number, alarm_type
+        FROM {source_table(source, 'push_alarm_parsed')}
+        WHERE {meter_sql}
+          AND alarm_time >= %s AND alarm_time < %s
         ORDER BY meter_number, alarm_time
         """
-        
-        params = meter_numbers
-        alarms_results = execute_query(alarms_query, params)
-        
-        # Organize alarms by date
-        alarms_by_date = {}
-        for date_str in target_dates:
-            alarms_by_date[date_str] = []
-        
-        for row in alarms_results:
-            alarm_time, meter_number, alarm_type = row
-            alarm_date = alarm_time.strftime('%Y-%m-%d') if isinstance(alarm_time, datetime) else str(alarm_time).split()[0]
-            
-            if alarm_date in alarms_by_date:
-                alarms_by_date[alarm_date].append({
-                    'meter_number': meter_number,
-                    'alarm_type': alarm_type,
-                    'alarm_time': alarm_time
-                })
-        
-        return alarms_by_date
-        
-    except Exception as e:
-        st.error(f"Error fetching alarms data: {str(e)}")
+        try:
+            with metrics.QueryTimer('alarm stream') as timer:
+                timer.phase('connect')
+                pooled = pool.acquire()
+                exhausted = False
+                try:
+                    timer.phase('execute')
+                    cursor = pooled.conn.cursor(buffered=False)
+                    cursor.execute(alarms_query, meter_params + [start, end])
+                    # Fetch time includes the time the consumer spends between batches
+                    timer.phase('fetch')
+                    while True:
+                        rows = cursor.fetchmany(fetch_size)
+                        if not rows:
+                            break
+                        timer.rows += len(rows)
+                        for alarm_time, meter_number, alarm_type in rows:
+                            alarm_date = alarm_time.strftime('%Y-%m-%d') if isinstance(alarm_time, datetime) else str(alarm_time).split()[0]
+                            if alarm_date in wanted:
+                                yield alarm_date, {
+                                    'meter_number': meter_number,
+                                    'alarm_type': alarm_type,
+                                    'alarm_time': alarm_time
+                                }
+                    cursor.close()
+                    exhausted = True
+                finally:
+                    # A half-read unbuffered result leaves the connection unusable
+                    pool.release(pooled, discard=not exhausted)
+        except Exception as e:
+            raise as_data_access_error(e, 'alarm stream')
+
+def get_alarms_data(target_dates):
+    """
+    Fetch alarm data for all target dates, streamed through iter_alarms
+    Returns: dict {date: list of alarm records}
+    Raises: DataAccessError
+    """
+    if not target_dates:
         return {}
+    
+    # Closed days come from the on-disk store; only the meters it lacks hit MySQL
+    meter_numbers = [m['meter_number'] for m in get_meters()]
+    wanted = frozenset(meter_numbers)
+    store = get_aggregate_store()
+    stored_alarms, stored = store.get_alarms(target_dates) if store else ({}, {})
+    alarms_by_date = {
+        date_str: [alarm for alarm in alarms if alarm['meter_number'] in stored[date_str] & wanted]
+        for date_str, alarms in stored_alarms.items()
+    }
+    
+    for fetch_dates, fetch_meters in missing_fetches(target_dates, meter_numbers, stored):
+        # Bucket rows by date as they stream in
+        fetched = {date_str: [] for date_str in fetch_dates}
+        for alarm_date, alarm in iter_alarms(fetch_dates, fetch_meters):
+            fetched[alarm_date].append(alarm)
+        if store:
+            store.put_alarms(
+                {date_str: fetched[date_str] for date_str in fetch_dates if utils.is_day_closed(date_str)},
+                fetch_meters
+            )
+        for date_str, alarms in fetched.items():
+            if date_str in alarms_by_date:
+                alarms_by_date[date_str] = sorted(
+                    alarms_by_date[date_str] + alarms, key=lambda alarm: (alarm['meter_number'], str(alarm['alarm_time']))
+                )
+            else:
+                alarms_by_date[date_str] = alarms
+    
+    return alarms_by_date
 
-def get_all_dates_data(target_dates):
+ALARM_COUNT_COLUMNS = ['date', 'meter_number', 'alarm_type', 'alarm_count']
+
+def fetch_alarm_counts(target_dates, meter_numbers):
     """
-    Fetch SLA data for all dates in optimized queries
-    Returns: dict {date: DataFrame}
+    Count alarms per date, meter and type in SQL
+    Returns: (long-format frame of ALARM_COUNT_COLUMNS, names of HES sources that did
+    not answer and have no rows; only answered_meters may be stored)
+    Raises: DataAccessError if no source answered
     """
-    try:
-        if not target_dates:
-            return {}
-        
-        meter_numbers = [m['meter_number'] for m in FIXED_METERS]
-        meter_types = {m['meter_number']: m['type'] for m in FIXED_METERS}
-        
-        # Placeholders for SQL IN clause
-        meter_placeholders = ', '.join(['%s'] * len(meter_numbers))
-        date_placeholders = ', '.join(['%s'] * len(target_dates))
-        
-        # Build server_time conditions for each date
-        server_time_conditions = []
-        for date_str in target_dates:
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            next_day = (date_obj + timedelta(days=1)).strftime('%Y-%m-%d')
-            server_time_conditions.append(f"(DATE(DATETIME_SLOT) = '{date_str}' AND server_time < '{next_day} 04:10:00')")
-        
-        server_time_condition = ' OR '.join(server_time_conditions)
-        
-        # OPTIMIZED QUERY 1: Load data without reconciliation
-        load_without_recon_query = f"""
-        SELECT 
-            meter_number,
-            DATE(DATETIME_SLOT) as date,
-            COUNT(DISTINCT DATETIME_SLOT) as load_count
-        FROM sense_hes_demo.amr_load_data
-        WHERE meter_number IN ({meter_placeholders})
-            AND DATE(DATETIME_SLOT) IN ({date_placeholders})
-            AND command_code is NULL
-        GROUP BY meter_number, DATE(DATETIME_SLOT)
+    def build_tasks(source, batch, label):
+        where_sql, where_params = build_where(
+            build_in_clause('meter_number', batch),
+            build_range_clause('alarm_time', target_dates)
+        )
+        counts_query = f"""
+        SELECT DATE(alarm_time) as date, meter_number, alarm_type, COUNT(*) as alarm_count
+        FROM {source_table(source, 'push_alarm_parsed')}
+        WHERE {where_sql}
+        GROUP BY DATE(alarm_time), meter_number, alarm_type
         """
-        
-        # OPTIMIZED QUERY 2: Load data with reconciliation
-        load_with_recon_query = f"""
-        SELECT 
-            meter_number,
+        return {f'alarm counts query {label}': (
+            execute_query, (counts_query, where_params, source['query_timeout'], True, 'alarm counts', source['name'])
+        )}
+    
+    results, unavailable = run_source_tasks(meter_numbers, build_tasks)
+    counts = pd.DataFrame.from_records(
+        [row for rows in results.values() for row in rows], columns=ALARM_COUNT_COLUMNS
+    )
+    counts['date'] = counts['date'].astype(str)
+    counts['alarm_count'] = counts['alarm_count'].astype('int64')
+    return counts, unavailable
+
+def get_alarm_counts(target_dates):
+    """
+    Per-meter, per-type alarm counts for each date, served from the store for closed days
+    Returns: (dict {date: DataFrame(meter_number, alarm_type, alarm_count)}, names of
+    HES sources that did not answer)
+    Raises: DataAccessError
+    """
+    if not target_dates:
+        return {}, []
+    
+    meter_numbers = [m['meter_number'] for m in get_meters()]
+    store = get_aggregate_store()
+    counts, stored = (
+        store.get_alarm_counts(target_dates) if store else (pd.DataFrame(columns=ALARM_COUNT_COLUMNS), {})
+    )
+    counts = covered_rows(counts, stored, meter_numbers)
+    
+    unavailable = set()
+    for fetch_dates, fetch_meters in missing_fetches(target_dates, meter_numbers, stored):
+        fetched, missed = fetch_alarm_counts(fetch_dates, fetch_meters)
+        if store:
+            store.put_alarm_counts(
+                [d for d in fetch_dates if utils.is_day_closed(d)], fetched, answered_meters(fetch_meters, missed)
+            )
+        unavailable.update(missed)
+        counts = pd.concat([counts, fetched], ignore_index=True)
+    
+    counts['alarm_count'] = counts['alarm_count'].astype('int64')
+    counts = counts.sort_values(['meter_number', 'alarm_type'], kind='stable')
+    grouped = dict(tuple(counts.groupby('date', sort=False)))
+    return {
+        date_str: grouped[date_str].drop(columns='date').reset_index(drop=True)
+        if date_str in grouped else pd.DataFrame(columns=ALARM_COUNT_COLUMNS[1:])
+        for date_str in target_dates
+    }, sorted(unavailable)
+
+def get_meter_alarms(meter_number, date_str, page=1, page_size=50):
+    """
+    One page of individual alarms for a single meter and date, oldest first,
+    from the HES source holding the meter
+    Returns: list of alarm records
+    Raises: DataAccessError
+    """
+    source = source_batches([meter_number])[0][0]
+    where_sql, where_params = build_where(
+        ('meter_number = %s', [meter_number]),
+        build_range_clause('alarm_time', [date_str])
+    )
+    alarms_query = f"""
+    SELECT alarm_time, meter_number, alarm_type
+    FROM {source_table(source, 'push_alarm_parsed')}
+    WHERE {where_sql}
+    ORDER BY alarm_time
+    LIMIT %s OFFSET %s
+    """
+    params = where_params + [int(page_size), (max(1, int(page)) - 1) * int(page_size)]
+    rows = execute_query(
+        alarms_query, params, source['query_timeout'], raise_errors=True, name='meter alarms', source=source['name']
+    )
+    return [
+        {'meter_number': meter, 'alarm_type': alarm_type, 'alarm_time': alarm_time}
+        for alarm_time, meter, alarm_type in rows
+    ]
+
+def build_latency_histogram_query(table, meter_numbers, target_dates):
+    """
+    Return (query, params) bucketing load rows by reporting latency per meter and date
+    Latency is server_time - DATETIME_SLOT in minutes; INTERVAL() maps it to the
+    index of its latency.BUCKET_BOUNDS bucket, so only bucket counts leave MySQL.
+    """
+    where_sql, where_params = build_where(
+        build_in_clause('meter_number', meter_numbers),
+        build_range_clause('DATETIME_SLOT', target_dates),
+        ('server_time IS NOT NULL', [])
+    )
+    bounds = ', '.join(str(bound) for bound in latency.BUCKET_BOUNDS)
+    query = f"""
+        SELECT
             DATE(DATETIME_SLOT) as date,
-            COUNT(DISTINCT DATETIME_SLOT) as load_count
-        FROM sense_hes_demo.amr_load_data
-        WHERE meter_number IN ({meter_placeholders})
-            AND DATE(DATETIME_SLOT) IN ({date_placeholders})
-        GROUP BY meter_number, DATE(DATETIME_SLOT)
-        """
-        
-        # Build midnight server_time conditions
-        midnight_server_time_conditions = []
-        for date_str in target_dates:
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            next_day = (date_obj + timedelta(days=1)).strftime('%Y-%m-%d')
-            midnight_server_time_conditions.append(f"(DATE(D6_SNAP_DATETIME) = '{date_str}' AND server_time < '{next_day} 04:10:00')")
-        
-        midnight_server_time_condition = ' OR '.join(midnight_server_time_conditions)
-        
-        # OPTIMIZED QUERY 3: Midnight without reconciliation
-        midnight_without_recon_query = f"""
-        SELECT 
             meter_number,
-            DATE(D6_SNAP_DATETIME) as date,
-            COUNT(DISTINCT D6_SNAP_DATETIME) as midnight_count
-        FROM sense_hes_demo.amr_midnight_data
-        WHERE meter_number IN ({meter_placeholders})
-            AND DATE(D6_SNAP_DATETIME) IN ({date_placeholders})
-            AND command_code is NULL
-        GROUP BY meter_number, DATE(D6_SNAP_DATETIME)
+            INTERVAL(TIMESTAMPDIFF(MINUTE, DATETIME_SLOT, server_time), {bounds}) as bucket,
+            COUNT(*) as row_count
+        FROM {table}
+        WHERE {where_sql}
+        GROUP BY DATE(DATETIME_SLOT), meter_number, bucket
         """
-        
-        # OPTIMIZED QUERY 4: Midnight with reconciliation
-        midnight_with_recon_query = f"""
-        SELECT 
-            meter_number,
-            DATE(D6_SNAP_DATETIME) as date,
-            COUNT(DISTINCT D6_SNAP_DATETIME) as midnight_count
-        FROM sense_hes_demo.amr_midnight_data
-        WHERE meter_number IN ({meter_placeholders})
-            AND DATE(D6_SNAP_DATETIME) IN ({date_placeholders})
-        GROUP BY meter_number, DATE(D6_SNAP_DATETIME)
-        """
-        
-        params = meter_numbers + target_dates
-        
-        # Execute all queries
-        st.write("⚡ Executing queries...")
-        load_without_recon_results = execute_query(load_without_recon_query, params)
-        load_with_recon_results = execute_query(load_with_recon_query, params)
-        midnight_without_recon_results = execute_query(midnight_without_recon_query, params)
-        midnight_with_recon_results = execute_query(midnight_with_recon_query, params)
-        
-        # Build lookup dictionaries
-        load_without_recon_dict = {(row[0], str(row[1])): row[2] for row in load_without_recon_results}
-        load_with_recon_dict = {(row[0], str(row[1])): row[2] for row in load_with_recon_results}
-        midnight_without_recon_dict = {(row[0], str(row[1])): row[2] for row in midnight_without_recon_results}
-        midnight_with_recon_dict = {(row[0], str(row[1])): row[2] for row in midnight_with_recon_results}
-        
-        # Build DataFrames for each date
-        date_dataframes = {}
-        
-        for target_date in target_dates:
-            date_results = []
-            
-            for meter_number in meter_numbers:
-                key = (meter_number, target_date)
-                
-                load_without = load_without_recon_dict.get(key, 0)
-                load_with = load_with_recon_dict.get(key, 0)
-                midnight_without = midnight_without_recon_dict.get(key, 0)
-                midnight_with = midnight_with_recon_dict.get(key, 0)
-                
-                expected_load = 96
-                
-                # Calculate percentages
-                received_percentage = round((load_without / expected_load) * 100, 2) if expected_load > 0 else 0
-                received_percentage_with_recon = round((load_with / expected_load) * 100, 2) if expected_load > 0 else 0
-                
-                date_results.append({
-                    'Meter Number': meter_number,
-                    'Type': meter_types[meter_number],
-                    'Expected Load': expected_load,
-                    'Load Received Without Reconcillation': load_without,
-                    'Received Load Percentage': received_percentage,
-                    'Load Received With Reconcillation': load_with,
-                    'Received Load Percentage with Reconcillation': received_percentage_with_recon,
-                    'Midnight Received without Reconcillation': midnight_without,
-                    'Midnight Received with Reconcillation': midnight_with
-                })
-            
-            date_dataframes[target_date] = pd.DataFrame(date_results)
-        
-        return date_dataframes
-        
-    except Exception as e:
-        st.error(f"Error fetching data: {str(e)}")
-        import traceback
-        st.error(traceback.format_exc())
+    return query, where_params
+
+def fetch_latency_histograms(target_dates, meter_numbers):
+    """
+    Query MySQL for per-meter latency bucket counts
+    Returns: (long-format frame of latency.HISTOGRAM_COLUMNS, names of HES sources that
+    did not answer and have no rows; only answered_meters may be stored)
+    Raises: DataAccessError if no source answered
+    """
+    def build_tasks(source, batch, label):
+        query, params = build_latency_histogram_query(source_table(source, 'amr_load_data'), batch, target_dates)
+        return {f'latency query {label}': (
+            execute_query, (query, params, source['query_timeout'], True, 'latency histograms', source['name'])
+        )}
+    
+    results, unavailable = run_source_tasks(meter_numbers, build_tasks)
+    histograms = pd.DataFrame.from_records(
+        [row for rows in results.values() for row in rows], columns=latency.HISTOGRAM_COLUMNS
+    )
+    histograms['date'] = histograms['date'].astype(str)
+    histograms[['bucket', 'row_count']] = histograms[['bucket', 'row_count']].astype('int64')
+    return histograms, unavailable
+
+def get_latency_histograms(target_dates):
+    """
+    Per-meter reporting-latency histograms for each date, served from the store for closed days
+    Returns: (dict {date: DataFrame(meter_number, type, bucket, row_count)}, names of
+    HES sources that did not answer)
+    Raises: DataAccessError
+    """
+    if not target_dates:
+        return {}, []
+    
+    registry = get_meters()
+    meter_numbers = [m['meter_number'] for m in registry]
+    store = get_aggregate_store()
+    histograms, stored = (
+        store.get_latency_histograms(target_dates) if store
+        else (pd.DataFrame(columns=latency.HISTOGRAM_COLUMNS), {})
+    )
+    histograms = covered_rows(histograms, stored, meter_numbers)
+    
+    unavailable = set()
+    for fetch_dates, fetch_meters in missing_fetches(target_dates, meter_numbers, stored):
+        fetched, missed = fetch_latency_histograms(fetch_dates, fetch_meters)
+        if store:
+            store.put_latency_histograms(
+                [d for d in fetch_dates if utils.is_day_closed(d)], fetched, answered_meters(fetch_meters, missed)
+            )
+        unavailable.update(missed)
+        histograms = pd.concat([histograms, fetched], ignore_index=True)
+    
+    types = pd.DataFrame(registry, columns=['meter_number', 'type'])
+    histograms = histograms.astype({'bucket': 'int64', 'row_count': 'int64'}).merge(types, on='meter_number', how='left')
+    histograms['type'] = histograms['type'].fillna('Unknown')
+    grouped = dict(tuple(histograms.groupby('date', sort=False)))
+    return {
+        date_str: grouped[date_str].drop(columns='date').reset_index(drop=True)
+        if date_str in grouped else pd.DataFrame(columns=['meter_number', 'bucket', 'row_count', 'type'])
+        for date_str in target_dates
+    }, sorted(unavailable)
+
+COUNT_COLUMNS = aggregate_store.COUNT_COLUMNS
+
+def counts_frame(records=()):
+    """Long-format counts frame: one row per (meter_number, date) with the four COUNT_COLUMNS"""
+    frame = pd.DataFrame.from_records(list(records), columns=['meter_number', 'date'] + COUNT_COLUMNS)
+    frame[COUNT_COLUMNS] = frame[COUNT_COLUMNS].astype('int64')
+    return frame
+
+def fetch_sla_counts(target_dates, meter_numbers):
+    """
+    Query MySQL for the four SLA counts per meter and date
+    Returns: (long-format counts frame (see counts_frame) plus the load slot
+    slots.MASK_COLUMNS, names of HES sources that did not answer and have no rows;
+    only answered_meters may be stored)
+    Raises: DataAccessError if no source answered
+    """
+    # One pass per table, HES source and meter batch, concurrently when allowed
+    def build_tasks(source, batch, label):
+        load_query, load_params = build_sla_count_query(
+            source_table(source, 'amr_load_data'), 'DATETIME_SLOT', batch, target_dates, slot_masks=True
+        )
+        midnight_query, midnight_params = build_sla_count_query(
+            source_table(source, 'amr_midnight_data'), 'D6_SNAP_DATETIME', batch, target_dates
+        )
+        timeout = source['query_timeout']
+        return {
+            f'load query {label}': (execute_query, (load_query, load_params, timeout, True, 'load counts', source['name'])),
+            f'midnight query {label}': (execute_query, (midnight_query, midnight_params, timeout, True, 'midnight counts', source['name'])),
+        }
+    
+    results, unavailable = run_source_tasks(meter_numbers, build_tasks)
+    key_columns = ['meter_number', 'date']
+    load_rows = [row for name, rows in results.items() if name.startswith('load') for row in rows]
+    midnight_rows = [row for name, rows in results.items() if name.startswith('midnight') for row in rows]
+    load = pd.DataFrame.from_records(load_rows, columns=key_columns + COUNT_COLUMNS[:2] + slots.MASK_COLUMNS)
+    midnight = pd.DataFrame.from_records(midnight_rows, columns=key_columns + COUNT_COLUMNS[2:])
+    for frame in (load, midnight):
+        frame['date'] = frame['date'].astype(str)
+    
+    counts = load.merge(midnight, on=key_columns, how='outer')
+    value_columns = COUNT_COLUMNS + slots.MASK_COLUMNS
+    counts[value_columns] = counts[value_columns].fillna(0).astype('int64')
+    return counts[key_columns + value_columns], unavailable
+
+def build_date_frames(counts, registry, target_dates):
+    """
+    Turn a long-format counts frame into per-date SLA DataFrames
+    Every registry meter appears for every date (missing counts are 0), tagged
+    with the HES source holding it; the work is a single MultiIndex reindex plus
+    column arithmetic, no per-row Python.
+    Returns: dict {date: DataFrame}
+    """
+    meters_df = pd.DataFrame(registry, columns=['meter_number', 'type', 'expected_load'])
+    index = pd.MultiIndex.from_product([list(target_dates), meters_df['meter_number']], names=['date', 'meter_number'])
+    
+    wide = (
+        counts.drop_duplicates(['date', 'meter_number'], keep='last')
+        .set_index(['date', 'meter_number'])[COUNT_COLUMNS]
+        .reindex(index, fill_value=0)
+        .astype('int64')
+    )
+    
+    repeats = len(target_dates)
+    expected = np.tile(meters_df['expected_load'].to_numpy(dtype='int64'), repeats)
+    safe_expected = np.where(expected > 0, expected, 1)
+    
+    def percentage(values):
+        return np.where(expected > 0, np.round(values / safe_expected * 100, 2), 0.0)
+    
+    frame = pd.DataFrame({
+        'Meter Number': wide.index.get_level_values('meter_number'),
+        'Type': np.tile(meters_df['type'].to_numpy(), repeats),
+        'Source': np.tile(np.array(meter_sources(registry), dtype=object), repeats),
+        'Expected Load': expected,
+        'Load Received Without Reconcillation': wide['load_without_recon'].to_numpy(),
+        'Received Load Percentage': percentage(wide['load_without_recon'].to_numpy()),
+        'Load Received With Reconcillation': wide['load_with_recon'].to_numpy(),
+        'Received Load Percentage with Reconcillation': percentage(wide['load_with_recon'].to_numpy()),
+        'Midnight Received without Reconcillation': wide['midnight_without_recon'].to_numpy(),
+        'Midnight Received with Reconcillation': wide['midnight_with_recon'].to_numpy()
+    })
+    
+    # Rows are laid out date-major, so each date is one contiguous slice
+    meter_count = len(meters_df)
+    return {
+        target_date: frame.iloc[i * meter_count:(i + 1) * meter_count].reset_index(drop=True)
+        for i, target_date in enumerate(target_dates)
+    }
+
+def rollup_closed_days(target_dates, force=False, chunk_days=7):
+    """
+    Make sure the aggregate store holds the four counts for every registry meter on
+    every closed day in target_dates
+    Days are fetched chunk_days at a time, for the meters each lacks; force
+    re-fetches every meter. Meters of sources that answered are stored even when
+    another source did not.
+    Returns: list of dates written
+    Raises: ConfigurationError if the aggregate store is disabled, DataAccessError if a fetch failed
+    """
+    store = get_aggregate_store()
+    if not store:
+        raise ConfigurationError("Aggregate store is disabled ([aggregate_store] enabled = false)")
+    
+    closed = sorted(d for d in target_dates if utils.is_day_closed(d))
+    meter_numbers = [m['meter_number'] for m in get_meters()]
+    if force:
+        fetches = [(closed, meter_numbers)] if closed else []
+    else:
+        fetches = missing_fetches(closed, meter_numbers, store.stored_meters('sla', closed))
+    
+    written = []
+    for fetch_dates, fetch_meters in fetches:
+        for i in range(0, len(fetch_dates), chunk_days):
+            chunk_dates = fetch_dates[i:i + chunk_days]
+            counts, unavailable = fetch_sla_counts(chunk_dates, fetch_meters)
+            store.put_sla_counts(chunk_dates, counts, answered_meters(fetch_meters, unavailable))
+            require_sources(unavailable)
+            written.extend(chunk_dates)
+    return sorted(written)
+
+def get_trend_data(start_date, end_date):
+    """
+    Daily SLA percentages per meter between two 'YYYY-MM-DD' dates, read only from the rollup store
+    Returns: long-format DataFrame with date, meter_number, type, the four counts and
+    load_percentage / load_percentage_with_recon
+    """
+    store = get_aggregate_store()
+    if not store:
+        return pd.DataFrame()
+    
+    # Meters with no rows on a stored day that covers them count as zero rather
+    # than dropping out; days stored before a meter joined the registry leave it out
+    days = pd.date_range(start_date, end_date, freq='D').strftime('%Y-%m-%d').tolist()
+    stored = store.stored_meters('sla', days)
+    registry = pd.DataFrame(get_meters(), columns=['meter_number', 'type', 'expected_load'])
+    index = pd.MultiIndex.from_tuples(
+        [(day, meter) for day in sorted(stored) for meter in registry['meter_number'] if meter in stored[day]],
+        names=['date', 'meter_number']
+    )
+    counts = (
+        store.get_sla_counts_between(start_date, end_date)
+        .drop_duplicates(['date', 'meter_number'])
+        .set_index(['date', 'meter_number'])[COUNT_COLUMNS]
+        .reindex(index, fill_value=0)
+        .reset_index()
+    )
+    trend = counts.merge(registry, on='meter_number', how='left')
+    expected = trend['expected_load'].where(trend['expected_load'] > 0)
+    trend['load_percentage'] = (trend['load_without_recon'] / expected * 100).round(2)
+    trend['load_percentage_with_recon'] = (trend['load_with_recon'] / expected * 100).round(2)
+    trend['date'] = pd.to_datetime(trend['date'])
+    return trend
+
+def get_sla_counts(target_dates, meter_numbers, slot_masks=False):
+    """
+    Long-format SLA counts for target_dates: stored days from the aggregate store,
+    the rest from HES (closed days fetched here are stored for next time)
+    A stored day only serves the meters it was fetched for; the meters it lacks
+    (say, new in the registry) are fetched and added to it.
+    With slot_masks the frame also carries slots.MASK_COLUMNS, taken from the
+    same load query; meters stored without their masks are fetched again.
+    Returns: (counts, names of HES sources that did not answer; their meters have
+    no rows on the fetched days and are not stored)
+    Raises: DataAccessError
+    """
+    store = get_aggregate_store()
+    counts, stored = store.get_sla_counts(target_dates) if store else (counts_frame(), {})
+    if slot_masks:
+        masks, mask_stored = (
+            store.get_slot_masks(target_dates) if store
+            else (pd.DataFrame(columns=['meter_number', 'date'] + slots.MASK_COLUMNS), {})
+        )
+        stored = {date_str: stored[date_str] & mask_stored[date_str] for date_str in stored.keys() & mask_stored.keys()}
+        counts = counts.merge(masks, on=['meter_number', 'date'], how='left')
+        counts[slots.MASK_COLUMNS] = counts[slots.MASK_COLUMNS].fillna(0).astype('int64')
+    counts = covered_rows(counts, stored, meter_numbers)
+    
+    unavailable = set()
+    fetches = missing_fetches(target_dates, meter_numbers, stored)
+    if fetches:
+        notify('write', "⚡ Executing queries...")
+    for fetch_dates, fetch_meters in fetches:
+        fetched, missed = fetch_sla_counts(fetch_dates, fetch_meters)
+        if store:
+            store.put_sla_counts(
+                [d for d in fetch_dates if utils.is_day_closed(d)], fetched, answered_meters(fetch_meters, missed)
+            )
+        unavailable.update(missed)
+        counts = pd.concat([counts, fetched[counts.columns]], ignore_index=True)
+    return counts, sorted(unavailable)
+
+def get_stored_slot_masks(start_date, end_date):
+    """
+    Received load slots for the stored days between two 'YYYY-MM-DD' dates, read
+    only from the aggregate store (the SLA fetches and rollup.py store them)
+    Meters the store does not cover on every one of those days are left out.
+    Returns: slots.SlotMasks, or None without a store or a stored day in range
+    """
+    store = get_aggregate_store()
+    if not store:
+        return None
+    days = pd.date_range(start_date, end_date, freq='D').strftime('%Y-%m-%d').tolist()
+    frame, stored = store.get_slot_masks(days)
+    if not stored:
+        return None
+    covered = frozenset.intersection(*stored.values())
+    meter_numbers = [m['meter_number'] for m in get_meters() if m['meter_number'] in covered]
+    return slots.SlotMasks.from_frame(frame, meter_numbers, sorted(stored))
+
+def get_all_dates_data(target_dates):
+    """
+    Fetch SLA data for all dates with one aggregate query per table
+    Closed days are served from the aggregate store when available.
+    Returns: dict {date: DataFrame}
+    Raises: DataAccessError
+    """
+    if not target_dates:
         return {}
+    
+    registry = get_meters()
+    counts, unavailable = get_sla_counts(target_dates, [m['meter_number'] for m in registry])
+    require_sources(unavailable)
+    return build_date_frames(counts, registry, target_dates)
 
+def get_sla_data_and_masks(target_dates):
+    """
+    get_all_dates_data plus the load slot masks for the same dates, from one fetch
+    Meters of HES sources that did not answer are left out rather than shown as
+    receiving nothing.
+    Returns: (dict {date: DataFrame}, slots.SlotMasks, names of the sources that did not answer)
+    Raises: DataAccessError
+    """
+    registry = get_meters()
+    counts, unavailable = get_sla_counts(target_dates, [m['meter_number'] for m in registry], slot_masks=True)
+    if unavailable:
+        registry = [meter for meter, source in zip(registry, meter_sources(registry)) if source not in unavailable]
+    meter_numbers = [m['meter_number'] for m in registry]
+    return (
+        build_date_frames(counts, registry, target_dates),
+        slots.SlotMasks.from_frame(counts, meter_numbers, list(target_dates)),
+        unavailable
+    )
@@ -0,0 +1,74 @@
+import hashlib
+import io
+import importlib.util
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# format -> (file extension, MIME type, module needed to write it or None)
+FORMATS = {
+    'csv': ('csv', 'text/csv', None),
+    'parquet': ('parquet', 'application/vnd.apache.parquet', 'pyarrow'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'openpyxl'),
+}
+
+def available_formats():
+    """Export formats whose optional writer dependency is installed"""
+    return [
+        name for name, (_, _, module) in FORMATS.items()
+        if module is None or importlib.util.find_spec(module) is not None
+    ]
+
+def frame_digest(dataframe):
+    """Content hash of a frame: its column names, dtypes and every value, independent of object identity"""
+    digest = hashlib.sha1()
+    digest.update(repr([(str(name), str(dtype)) for name, dtype in dataframe.dtypes.items()]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(dataframe, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def render(dataframe, fmt):
+    """Serialize a frame to bytes in fmt ('csv', 'parquet' or 'xlsx')"""
+    if fmt == 'csv':
+        return dataframe.to_csv(index=False).encode('utf-8')
+    buffer = io.BytesIO()
+    if fmt == 'parquet':
+        dataframe.to_parquet(buffer, index=False)
+    elif fmt == 'xlsx':
+        dataframe.to_excel(buffer, index=False, sheet_name='SLA Report', engine='openpyxl')
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return buffer.getvalue()
+
+class ExportCache:
+    """
+    Rendered export bytes keyed by (frame content hash, format), least recently used evicted first
+    Identical frames from different reruns or sessions share one entry.
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, dataframe, fmt):
+        key = (frame_digest(dataframe), fmt)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        data = render(dataframe, fmt)
+        with self._lock:
+            self._entries[key] = data
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data
+
+    def __len__(self):
+        return len(self._entries)
+
+_cache = ExportCache()
+
+def get_export(dataframe, fmt):
+    """Export bytes for dataframe in fmt, rendered at most once per distinct frame content"""
+    return _cache.get(dataframe, fmt)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# Upper bounds in minutes of the reporting-latency buckets (server_time - DATETIME_SLOT);
+# bucket i holds latencies in [bounds[i-1], bounds[i]), the last bucket everything above
+BUCKET_BOUNDS = (15, 30, 60, 120, 240, 480, 720, 1440, 2880, 10080)
+BUCKET_COUNT = len(BUCKET_BOUNDS) + 1
+
+HISTOGRAM_COLUMNS = ['date', 'meter_number', 'bucket', 'row_count']
+QUANTILES = (0.5, 0.95, 0.99)
+
+def bucket_labels():
+    """Readable label per bucket, e.g. '15-30 min', '>= 7 d'"""
+    def fmt(minutes):
+        if minutes % 1440 == 0:
+            return f"{minutes // 1440} d"
+        if minutes % 60 == 0:
+            return f"{minutes // 60} h"
+        return f"{minutes} min"
+
+    labels = [f"< {fmt(BUCKET_BOUNDS[0])}"]
+    labels += [f"{fmt(low)} - {fmt(high)}" for low, high in zip(BUCKET_BOUNDS, BUCKET_BOUNDS[1:])]
+    labels.append(f">= {fmt(BUCKET_BOUNDS[-1])}")
+    return labels
+
+def histogram_matrix(histograms, key):
+    """
+    Pivot long histogram rows into one row of bucket counts per key value
+    Returns: DataFrame indexed by key with columns 0..BUCKET_COUNT-1
+    """
+    return (
+        histograms.groupby([key, 'bucket'], observed=True)['row_count'].sum()
+        .unstack('bucket', fill_value=0)
+        .reindex(columns=range(BUCKET_COUNT), fill_value=0)
+    )
+
+def bucket_quantiles(matrix, quantiles=QUANTILES):
+    """
+    Approximate quantiles in minutes from a (groups x buckets) count matrix
+    Ranks are interpolated linearly inside the bucket they fall in; the open-ended
+    last bucket reports its lower bound. Groups with no rows get NaN.
+    Returns: float array of shape (groups, len(quantiles))
+    """
+    counts = np.asarray(matrix, dtype=float)
+    lower = np.array((0,) + BUCKET_BOUNDS, dtype=float)
+    upper = np.array(BUCKET_BOUNDS + (BUCKET_BOUNDS[-1],), dtype=float)
+    cumulative = counts.cumsum(axis=1)
+    totals = cumulative[:, -1:]
+    result = np.full((counts.shape[0], len(quantiles)), np.nan)
+    rows = np.arange(counts.shape[0])
+    for j, q in enumerate(quantiles):
+        rank = q * totals[:, 0]
+        # First bucket whose cumulative count reaches the rank
+        bucket = (cumulative < rank[:, None]).sum(axis=1).clip(max=BUCKET_COUNT - 1)
+        before = np.where(bucket > 0, cumulative[rows, bucket - 1], 0.0)
+        in_bucket = counts[rows, bucket]
+        fraction = np.divide(rank - before, in_bucket, out=np.zeros_like(rank), where=in_bucket > 0)
+        value = lower[bucket] + fraction * (upper[bucket] - lower[bucket])
+        result[:, j] = np.where(totals[:, 0] > 0, value, np.nan)
+    return result
+
+def latency_summary(histograms, key):
+    """
+    Row count and p50/p95/p99 latency in minutes per key ('meter_number' or 'type')
+    Returns: DataFrame with key, Rows, P50 (min), P95 (min), P99 (min)
+    """
+    columns = [key, 'Rows'] + [f"P{int(q * 100)} (min)" for q in QUANTILES]
+    if histograms.empty:
+        return pd.DataFrame(columns=columns)
+    matrix = histogram_matrix(histograms, key)
+    summary = pd.DataFrame(bucket_quantiles(matrix).round(1), index=matrix.index, columns=columns[2:])
+    summary.insert(0, 'Rows', matrix.sum(axis=1).astype('int64'))
+    return summary.reset_index()[columns]
+
+def fleet_histogram(histograms):
+    """Rows per bucket across all meters: DataFrame with Latency label and Rows, in bucket order"""
+    counts = histograms.groupby('bucket', observed=True)['row_count'].sum().reindex(range(BUCKET_COUNT), fill_value=0)
+    return pd.DataFrame({'Latency': bucket_labels(), 'Rows': counts.to_numpy().astype('int64')})
@@ -1,9 +1,15 @@
 import streamlit as st
+import altair as alt
 import pandas as pd
-from datetime import datetime, timezone, timedelta
+from datetime import timedelta
+import compact
 import database
+import exports
+import latency
+import metrics
 import utils
 import styling
+import warmer
 
 # Configure page
 st.set_page_config(
@@ -70,89 +76,151 @@ html[data-theme="dark"] .main-header {
 </style>
 """, unsafe_allow_html=True)
 
-def get_ist_time():
-    """Get current time in IST (UTC+5:30)"""
-    utc_time = datetime.now(timezone.utc)
-    ist_time = utc_time + timedelta(hours=5, minutes=30)
-    return ist_time.strftime("%d-%m-%Y %H:%M:%S")
+# Every cached function keeps at most [cache] max_entries results
+CACHE_MAX_ENTRIES = int(database.get_config_section('cache').get('max_entries', 16))
 
 # Cache data loading with error handling
-@st.cache_data(ttl=300, show_spinner=False)
-def load_all_data(_target_dates):
-    """Cache data for 5 minutes with error handling"""
-    try:
-        sla_data = database.get_all_dates_data(_target_dates)
-        alarms_data = database.get_alarms_data(_target_dates)
-        return {'sla_data': sla_data, 'alarms_data': alarms_data}
-    except Exception as e:
-        st.error(f"❌ Error loading data: {str(e)}")
-        return {'sla_data': {}, 'alarms_data': {}}
-
-def export_to_csv(dataframe, filename):
-    """Helper function to export dataframe to CSV"""
-    csv = dataframe.to_csv(index=False)
-    return csv.encode('utf-8')
-
-def display_remarks_section(alarms_data, date_string, display_name):
-    """Display remarks section with alarms information"""
+@st.cache_data(ttl=300, show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def load_all_data(target_dates):
+    """
+    Cache data for 5 minutes per tuple of target dates; used until the warmer has a snapshot
+    Failures raise DataAccessError and are not cached, so the next rerun retries.
+    """
+    metrics.REGISTRY.cache_miss('load_all_data')
+    return warmer.fetch_dashboard_data(list(target_dates))
+
+def display_export_buttons(dataframe, date_string):
+    """Download buttons per available format; the file is only rendered when a button is clicked"""
+    formats = exports.available_formats()
+    for column, fmt in zip(st.columns(len(formats)), formats):
+        extension, mime, _ = exports.FORMATS[fmt]
+        with column:
+            st.download_button(
+                label=f"📥 Export {fmt.upper()}",
+                data=lambda fmt=fmt: exports.get_export(dataframe, fmt),
+                file_name=f"sla_report_{date_string}.{extension}",
+                mime=mime,
+                use_container_width=True,
+                key=f"download_{fmt}_{date_string}"
+            )
+
+ALARMS_PAGE_SIZE = 50
+
+@st.cache_data(ttl=300, show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def load_meter_alarms(meter_number, date_string, page):
+    """Cache one drill-down page of a meter's alarms for 5 minutes, as a columnar frame"""
+    return compact.alarm_columns(database.get_meter_alarms(meter_number, date_string, page, ALARMS_PAGE_SIZE))
+
+def display_remarks_section(alarm_counts, date_string, display_name, error=None):
+    """Display alarm counts per meter and type, with paginated drill-down for one meter"""
     st.markdown("---")
     st.markdown('<div class="remarks-container">', unsafe_allow_html=True)
     st.markdown('<h3 class="remarks-title">🔔 Remarks</h3>', unsafe_allow_html=True)
     
-    if alarms_data and date_string in alarms_data and alarms_data[date_string]:
-        alarms_for_date = alarms_data[date_string]
-        
-        # Group alarms by meter number
-        alarms_by_meter = {}
-        for alarm in alarms_for_date:
-            meter_number = alarm['meter_number']
-            if meter_number not in alarms_by_meter:
-                alarms_by_meter[meter_number] = []
-            alarms_by_meter[meter_number].append(alarm)
+    counts = alarm_counts.get(date_string) if alarm_counts else None
+    if error:
+        st.error(f"❌ Alarm counts could not be loaded: {error}")
+    elif counts is not None and not counts.empty:
+        # Counts per meter with one column per alarm type, noisiest meters first
+        by_meter = counts.pivot_table(
+            index='meter_number', columns='alarm_type', values='alarm_count', aggfunc='sum', fill_value=0
+        )
+        by_meter.insert(0, 'Total', by_meter.sum(axis=1))
+        by_meter = by_meter.sort_values('Total', ascending=False)
+        by_meter.index.name = 'Meter Number'
+        st.dataframe(by_meter, use_container_width=True, height=min(38 * (len(by_meter) + 1), 400))
         
-        # Display alarms for each meter
-        for meter_number, meter_alarms in alarms_by_meter.items():
-            st.markdown(f'<div class="remarks-item">', unsafe_allow_html=True)
-            st.markdown(f"**{meter_number}**")
-            for alarm in meter_alarms:
-                alarm_time = alarm['alarm_time']
-                if isinstance(alarm_time, datetime):
-                    alarm_time_str = alarm_time.strftime('%Y-%m-%d %H:%M:%S')
-                else:
-                    alarm_time_str = str(alarm_time)
-                
-                st.markdown(f"• {alarm['alarm_type']} on {alarm_time_str}")
-            st.markdown('</div>', unsafe_allow_html=True)
+        # Individual alarms are only fetched for the meter being expanded
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            meter_number = st.selectbox(
+                "View alarms for meter",
+                options=list(by_meter.index),
+                index=None,
+                placeholder="Select a meter",
+                key=f"alarm_meter_{date_string}"
+            )
+        if meter_number:
+            total = int(by_meter.loc[meter_number, 'Total'])
+            page_count = max(1, -(-total // ALARMS_PAGE_SIZE))
+            with col2:
+                page = st.number_input(
+                    f"Page (of {page_count})", min_value=1, max_value=page_count, value=1,
+                    key=f"alarm_page_{date_string}_{meter_number}"
+                )
+            try:
+                alarms = load_meter_alarms(meter_number, date_string, int(page))
+            except database.DataAccessError as e:
+                st.error(f"Error fetching alarms for {meter_number}: {str(e)}")
+                alarms = compact.alarm_columns([])
+            lines = [
+                f"• {alarm_type} on {alarm_time:%Y-%m-%d %H:%M:%S}"
+                for alarm_type, alarm_time in zip(alarms['alarm_type'], alarms['alarm_time'])
+            ]
+            st.markdown(f"**{meter_number}** ({total} alarms)\n\n" + "\n\n".join(lines))
     else:
         st.markdown('<div class="no-remarks">No alarms reported for this date</div>', unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+def display_latency_section(histograms, error=None):
+    """Display how late load rows arrive (server_time - slot time) next to the SLA table"""
+    with st.expander("⏱️ Reconciliation Latency", expanded=bool(error)):
+        if error:
+            st.error(f"❌ Latency data could not be loaded: {error}")
+            return
+        if histograms is None or histograms.empty:
+            st.caption("No latency data for this date")
+            return
+
+        col1, col2 = st.columns([3, 2])
+        with col1:
+            st.markdown("**Load rows by arrival latency**")
+            st.altair_chart(
+                alt.Chart(latency.fleet_histogram(histograms)).mark_bar().encode(
+                    x=alt.X('Latency:N', sort=None),
+                    y=alt.Y('Rows:Q'),
+                    tooltip=['Latency', 'Rows']
+                ),
+                use_container_width=True
+            )
+        with col2:
+            st.markdown("**Percentiles by type**")
+            by_type = latency.latency_summary(histograms, 'type')
+            st.dataframe(by_type.rename(columns={'type': 'Type'}), use_container_width=True, hide_index=True)
+
+        st.markdown("**Percentiles by meter** (slowest P95 first)")
+        by_meter = latency.latency_summary(histograms, 'meter_number').rename(columns={'meter_number': 'Meter Number'})
+        by_meter = by_meter.sort_values('P95 (min)', ascending=False, kind='stable')
+        st.dataframe(by_meter, use_container_width=True, hide_index=True, height=min(38 * (len(by_meter) + 1), 400))
+
 def display_tab_content(tab_date_info, all_data, use_real_data):
     """Display content for a tab with enhanced features"""
     display_name, date_string = tab_date_info
     sla_data_dict = all_data.get('sla_data', {})
-    alarms_data = all_data.get('alarms_data', {})
+    alarm_counts = all_data.get('alarm_counts', {})
+    latency_data = all_data.get('latency', {})
+    # Sections whose fetch failed, as opposed to ones with nothing to show
+    errors = all_data.get('errors', {})
+    summary = all_data.get('summary', {}).get(date_string)
 
     if use_real_data and date_string in sla_data_dict and not sla_data_dict[date_string].empty:
         # Real data
         st.markdown(f'<h2 class="section-title">📈 SLA Report - {display_name}</h2>', unsafe_allow_html=True)
         sla_data = sla_data_dict[date_string]
+        unavailable = all_data.get('unavailable_sources')
+        if unavailable:
+            st.warning(
+                f"⚠️ HES source(s) {', '.join(unavailable)} did not answer: "
+                "their meters are not included in the figures below"
+            )
 
         # Metrics
-        styling.create_metric_row(sla_data, display_name, is_real_data=True)
-
-        # Export button at bottom left without heading
-        csv_data = export_to_csv(sla_data, f"sla_report_{date_string}.csv")
-        st.markdown(f'<div class="export-button">', unsafe_allow_html=True)
-        st.download_button(
-            label="📥 Export CSV",
-            data=csv_data,
-            file_name=f"sla_report_{date_string}.csv",
-            mime="text/csv",
-            use_container_width=True,
-            key=f"download_{date_string}"
-        )
+        styling.create_metric_row(sla_data, display_name, is_real_data=True, summary=summary)
+
+        # Export buttons at bottom left; files are rendered only when clicked
+        st.markdown('<div class="export-button">', unsafe_allow_html=True)
+        display_export_buttons(sla_data, date_string)
         st.markdown('</div>', unsafe_allow_html=True)
 
         # Detailed table (centered via middle column)
@@ -166,8 +234,8 @@ def display_tab_content(tab_date_info, all_data, use_real_data):
 
         # Summary with additional stats
         total_meters = len(sla_data)
-        if 'SLA Status' in sla_data.columns:
-            met_sla = len(sla_data[sla_data['SLA Status'] == 'Met'])
+        if summary:
+            met_sla = summary['sla_met']
             sla_percentage = (met_sla / total_meters * 100) if total_meters > 0 else 0
             st.markdown(
                 f'<p style="color: #666666 !important; font-size: 14px;">📊 Total Meters: {total_meters} | '
@@ -179,9 +247,11 @@ def display_tab_content(tab_date_info, all_data, use_real_data):
                 f'<p style="color: #666666 !important; font-size: 14px;">📊 Total Meters: {total_meters} | Date: {display_name}</p>',
                 unsafe_allow_html=True
             )
+
+        display_latency_section(latency_data.get(date_string), errors.get('latency'))
         
         # Display Remarks section
-        display_remarks_section(alarms_data, date_string, display_name)
+        display_remarks_section(alarm_counts, date_string, display_name, errors.get('alarm_counts'))
         
     else:
         # Sample data
@@ -207,46 +277,286 @@ def display_tab_content(tab_date_info, all_data, use_real_data):
         # Display empty Remarks section for sample data
         display_remarks_section({}, date_string, display_name)
 
+@st.fragment
+def display_date_tabs(tab_dates, all_data, use_real_data):
+    """
+    Date selector plus the selected date's content
+    Only the active date is rendered, and as a fragment, switching dates or
+    using its drill-down widgets reruns just this section, not the whole page.
+    """
+    labels = {date_string: f"📅 {display_name}" for display_name, date_string in tab_dates}
+    active_date = st.segmented_control(
+        "Date",
+        options=list(labels),
+        default=tab_dates[0][1],
+        required=True,
+        format_func=labels.get,
+        label_visibility="collapsed",
+        key="active_date_tab"
+    )
+    active = next((tab for tab in tab_dates if tab[1] == active_date), tab_dates[0])
+    display_tab_content(active, all_data, use_real_data)
+
+@st.cache_data(ttl=300, show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def load_trend_data(start_date, end_date):
+    """Cache rollup reads for 5 minutes"""
+    return database.get_trend_data(start_date, end_date)
+
+@st.fragment
+def display_trend_section():
+    """Display SLA trends for an arbitrary date range, read only from the daily rollup; reruns on its own"""
+    st.markdown("---")
+    st.markdown('<h2 class="section-title">📈 SLA Trends</h2>', unsafe_allow_html=True)
+
+    last_day = (utils.get_ist_now() - timedelta(days=1)).date()
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        selected_range = st.date_input(
+            "Date range",
+            value=(last_day - timedelta(days=29), last_day),
+            max_value=last_day,
+            key="trend_range"
+        )
+    with col2:
+        metric = st.radio(
+            "Load percentage",
+            ["With Reconcillation", "Without Reconcillation"],
+            horizontal=True,
+            key="trend_metric"
+        )
+
+    if not isinstance(selected_range, tuple) or len(selected_range) != 2:
+        st.info("Select a start and an end date")
+        return
+
+    start_date, end_date = (d.strftime('%Y-%m-%d') for d in selected_range)
+    trend = load_trend_data(start_date, end_date)
+    if trend.empty:
+        st.info("No rolled-up days in this range yet. Run `python rollup.py` to backfill them.")
+        return
+
+    column = 'load_percentage_with_recon' if metric == "With Reconcillation" else 'load_percentage'
+
+    st.markdown("**Average load percentage by type**")
+    by_type = trend.pivot_table(index='date', columns='type', values=column, aggfunc='mean')
+    st.line_chart(by_type)
+
+    meter_options = sorted(trend['meter_number'].unique())
+    selected_meters = st.multiselect(
+        "Meters", options=meter_options, default=meter_options[:5], key="trend_meters"
+    )
+    if selected_meters:
+        st.markdown("**Load percentage per meter**")
+        by_meter = trend[trend['meter_number'].isin(selected_meters)].pivot_table(
+            index='date', columns='meter_number', values=column, aggfunc='mean'
+        )
+        st.line_chart(by_meter)
+
+@st.cache_data(ttl=300, show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def load_stored_slot_masks(start_date, end_date):
+    """Cache stored slot mask reads for 5 minutes"""
+    return database.get_stored_slot_masks(start_date, end_date)
+
+@st.fragment
+def display_gap_section(tab_masks):
+    """
+    Display which 15-minute load slots are missing over a date range; reruns on its own
+    Within the tab dates the masks loaded with the tab data are used, wider ranges
+    read the stored days' masks from the aggregate store.
+    """
+    st.markdown("---")
+    st.markdown('<h2 class="section-title">🧩 Load Gap Analysis</h2>', unsafe_allow_html=True)
+
+    tab_days = sorted(tab_masks.dates) if tab_masks is not None else []
+    last_day = (utils.get_ist_now() - timedelta(days=1)).date()
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        selected_range = st.date_input(
+            "Date range",
+            value=(pd.Timestamp(tab_days[0]).date(), pd.Timestamp(tab_days[-1]).date()) if tab_days
+            else (last_day - timedelta(days=6), last_day),
+            max_value=last_day,
+            key="gap_range"
+        )
+    with col2:
+        mode = st.radio(
+            "Slots",
+            ["With Reconcillation", "Without Reconcillation", "Recovered by Reconcillation"],
+            key="gap_mode"
+        )
+
+    if not isinstance(selected_range, tuple) or len(selected_range) != 2:
+        st.info("Select a start and an end date")
+        return
+
+    start_date, end_date = (d.strftime('%Y-%m-%d') for d in selected_range)
+    days = pd.date_range(start_date, end_date, freq='D').strftime('%Y-%m-%d').tolist()
+    if tab_days and set(days) <= set(tab_days):
+        masks = tab_masks.select_dates(days)
+    else:
+        masks = load_stored_slot_masks(start_date, end_date)
+        if masks is None:
+            st.info("No stored days in this range yet. Run `python rollup.py` to backfill them.")
+            return
+        if len(masks.dates) < len(days):
+            st.caption(f"{len(days) - len(masks.dates)} day(s) in this range are not stored yet and are left out")
+
+    if mode == "Recovered by Reconcillation":
+        heatmap = masks.recovered_heatmap()
+        title = "**Share of meters whose slot only arrived through reconciliation**"
+    else:
+        heatmap = masks.gap_heatmap(with_recon=mode == "With Reconcillation")
+        title = "**Share of meters missing each slot**"
+    cells = heatmap.rename_axis('Date').reset_index().melt(id_vars='Date', var_name='Slot', value_name='Share')
+    st.markdown(title)
+    st.altair_chart(
+        alt.Chart(cells).mark_rect().encode(
+            x=alt.X('Slot:O', sort=None, axis=alt.Axis(values=heatmap.columns[::8].tolist())),
+            y=alt.Y('Date:O'),
+            color=alt.Color('Share:Q', scale=alt.Scale(scheme='reds', domain=[0, 1]), legend=alt.Legend(format='%')),
+            tooltip=['Date', 'Slot', alt.Tooltip('Share:Q', format='.1%')]
+        ),
+        use_container_width=True
+    )
+
+    st.markdown("**Meters with the longest outages**")
+    summary = masks.meter_summary()
+    st.dataframe(summary.head(50), use_container_width=True, hide_index=True)
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">📊 SLA Performance Dashboard</h1>', unsafe_allow_html=True)
     st.markdown('<p class="sub-header">Real-time SLA Monitoring & Analytics</p>', unsafe_allow_html=True)
 
-    # Current time in IST - ALWAYS get fresh timestamp
-    current_time = get_ist_time()
+    # Structured query log and Prometheus exporter, both optional
+    metrics_settings = database.get_config_section('metrics')
+    if metrics_settings.get('log_file'):
+        metrics.configure_logging(metrics_settings['log_file'])
+    if metrics_settings.get('exporter_port'):
+        metrics.start_http_exporter(int(metrics_settings['exporter_port']))
+
+    # Background warmer keeps the current tab dates precomputed
+    warmer_settings = database.get_config_section('cache_warmer')
+    # snapshot_dir shares snapshots with other app processes and `python warmer.py` workers
+    # worker = "external" leaves all fetching to such a worker: the app only reads snapshot_dir
+    # memory_budget_mb bounds the in-memory snapshots (least recently used evicted first)
+    memory_budget_mb = warmer_settings.get('memory_budget_mb')
+    external_worker = warmer_settings.get('worker') == 'external'
+    try:
+        cache_warmer = warmer.get_warmer(
+            interval=float(warmer_settings.get('interval', 240)),
+            snapshot_dir=warmer_settings.get('snapshot_dir'),
+            max_bytes=int(float(memory_budget_mb) * 1024 * 1024) if memory_budget_mb else None,
+            external=external_worker
+        )
+    except database.ConfigurationError as e:
+        st.error(f"❌ {str(e)}")
+        st.stop()
+
+    # Get dates for tabs
+    tab_dates = utils.get_tab_dates_with_names()
+    date_strings = [tab_dates[0][1], tab_dates[1][1], tab_dates[2][1]]
+    snapshot = cache_warmer.get_snapshot(date_strings)
+
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.info(f"🕐 **Last Updated:** {current_time} IST")
+        if snapshot:
+            st.info(
+                f"🕐 **Last Updated:** {snapshot['finished_at'].strftime('%d-%m-%Y %H:%M:%S')} IST "
+                f"(refreshed in {snapshot['duration']:.1f}s)"
+            )
+        elif cache_warmer.last_run and cache_warmer.last_run['error']:
+            st.warning(f"⚠️ Background refresh failed: {cache_warmer.last_run['error']}")
+        elif external_worker:
+            st.info("🕐 Waiting for the warmer worker's first snapshot…")
+        else:
+            st.info("🕐 Background refresh in progress…")
+        if snapshot and cache_warmer.is_refreshing(date_strings):
+            st.caption("🔄 Refreshing in the background; showing the last loaded data until it completes")
 
-    # Database connection test
+    # Database health comes from the shared circuit breaker: a recent successful
+    # check is reused and an outage is reported without waiting on a connect
     with st.expander("🔌 Database Connection Status", expanded=False):
-        try:
-            if database.test_db_connection():
-                st.success("✅ Database connected successfully!")
-                use_real_data = True
-            else:
-                st.error("❌ Database connection failed")
-                st.warning("⚠️ Showing sample data instead")
-                use_real_data = False
-        except Exception as e:
-            st.error(f"❌ Database error: {str(e)}")
+        health = database.get_db_health()
+        # Real data as long as one HES source answers; the others' meters are left out
+        use_real_data = health['healthy']
+        if use_real_data and health['unavailable']:
+            st.warning(
+                f"⚠️ HES source(s) unavailable: {', '.join(health['unavailable'])} "
+                f"({health['last_error']}); their meters are left out"
+            )
+        elif use_real_data:
+            st.success("✅ Database connected successfully!")
+        else:
+            st.error(f"❌ Database connection failed: {health['last_error'] or 'not configured'}")
+            if health['retry_in'] is not None:
+                st.caption(f"Circuit {health['state'].replace('_', '-')}; next connection check in {health['retry_in']:.0f}s")
             st.warning("⚠️ Showing sample data instead")
-            use_real_data = False
-
-    # Get dates for tabs
-    tab_dates = utils.get_tab_dates_with_names()
-    date_strings = [tab_dates[0][1], tab_dates[1][1], tab_dates[2][1]]
+        if len(health['sources']) > 1:
+            st.caption("HES sources: " + " | ".join(
+                f"{'✅' if status['healthy'] else '❌'} {name} ({status['state'].replace('_', '-')})"
+                for name, status in health['sources'].items()
+            ))
+
+        # Closed days are served from the on-disk store; this forces a re-fetch
+        # of the visible days when reconciliation lands after the cutoff
+        if st.button("♻️ Re-fetch stored days (late reconciliation)", key="invalidate_stored_days"):
+            database.invalidate_stored_days(date_strings)
+            cache_warmer.request_refresh(date_strings)
+            st.rerun()
+
+        # One pool per HES source
+        for source_name in health['sources'] or [None]:
+            pool_stats = database.get_pool_stats(source_name)
+            if pool_stats:
+                label = f"Pool {source_name}" if len(health['sources']) > 1 else "Pool"
+                st.caption(
+                    f"{label}: {pool_stats['in_use']} in use / {pool_stats['idle']} idle / size {pool_stats['pool_size']} | "
+                    f"created {pool_stats['created']}, reused {pool_stats['reused']}, recycled {pool_stats['recycled']}, "
+                    f"prepared hits {pool_stats['prepared_hits']}, waits {pool_stats['waits']}, timeouts {pool_stats['timeouts']}"
+                )
+
+    with st.expander("🧪 Query Metrics", expanded=False):
+        metric_rows = metrics.REGISTRY.summary_rows()
+        if metric_rows:
+            st.dataframe(pd.DataFrame(metric_rows), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No queries recorded yet")
+        cache_footprint = cache_warmer.sink.footprint()
+        budget = cache_footprint.get('max_bytes')
+        st.caption(
+            f"Snapshot cache: {cache_footprint['entries']} snapshot(s), "
+            f"{cache_footprint['bytes'] / 1024 / 1024:.1f} MB in memory"
+            + (f" of {budget / 1024 / 1024:.0f} MB budget" if budget else "")
+            + (f", {cache_footprint['evictions']} evicted" if 'evictions' in cache_footprint else "")
+            + (f", {cache_footprint['disk_bytes'] / 1024 / 1024:.1f} MB on disk" if 'disk_bytes' in cache_footprint else "")
+            + f" | st.cache_data: up to {CACHE_MAX_ENTRIES} entries per function"
+        )
+        if st.checkbox("Show Prometheus text", key="show_prometheus_metrics"):
+            st.code(metrics.REGISTRY.render_prometheus(), language="text")
 
     # Info about meters
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.success(f"📋 **Monitoring {len(database.FIXED_METERS)} Fixed Meters**")
+        st.success(f"📋 **Monitoring {len(database.get_meters())} Meters**")
 
     # Load all data at once
     all_data = {}
     if use_real_data:
         with st.spinner("⚡ Loading data for all dates..."):
-            all_data = load_all_data(date_strings)
+            metrics.REGISTRY.cache_request('warmer snapshot')
+            if snapshot:
+                all_data = snapshot['data']
+            elif external_worker:
+                # Only the worker queries MySQL; the tabs fill in once it publishes
+                metrics.REGISTRY.cache_miss('warmer snapshot')
+            else:
+                metrics.REGISTRY.cache_miss('warmer snapshot')
+                metrics.REGISTRY.cache_request('load_all_data')
+                try:
+                    all_data = load_all_data(tuple(date_strings))
+                except database.DataAccessError as e:
+                    st.error(f"❌ Error loading data: {str(e)}")
             if all_data and all_data.get('sla_data'):
                 loaded_count = len([d for d in all_data['sla_data'].values() if not d.empty])
                 if loaded_count > 0:
@@ -255,24 +565,24 @@ def main():
                     st.warning("⚠️ No data available for selected dates")
                     use_real_data = False
 
-    # Create tabs
-    tab1, tab2, tab3 = st.tabs([f"📅 {tab_dates[0][0]}", f"📅 {tab_dates[1][0]}", f"📅 {tab_dates[2][0]}"])
+    # Date tabs: only the selected date is rendered
+    display_date_tabs(tab_dates, all_data, use_real_data)
 
-    # Display data in tabs
-    with tab1:
-        display_tab_content(tab_dates[0], all_data, use_real_data)
+    display_trend_section()
+    # Slot masks for the tab dates come with the tab data; other days are read from the store
+    display_gap_section(all_data.get('slot_masks') if use_real_data else None)
 
-    with tab2:
-        display_tab_content(tab_dates[1], all_data, use_real_data)
-
-    with tab3:
-        display_tab_content(tab_dates[2], all_data, use_real_data)
-
-    # Refresh button at bottom right - WITH CACHE CLEAR
+    # Refresh button at bottom right - queues one shared background refetch;
+    # closed days come back from the store, so only the open day hits MySQL
     st.markdown('<div class="refresh-button">', unsafe_allow_html=True)
     if st.button("🔄 Refresh Data", type="primary", use_container_width=True):
-        st.cache_data.clear()  # CLEAR CACHE ON REFRESH
-        st.rerun()
+        min_interval = float(warmer_settings.get('min_refresh_interval', 60))
+        status = cache_warmer.request_refresh(date_strings, min_interval)
+        if status == 'rate_limited':
+            wait = cache_warmer.seconds_until_refresh_allowed(min_interval)
+            st.toast(f"⏳ Data was refreshed moments ago, try again in {wait:.0f}s")
+        else:
+            st.toast("🔄 Refreshing in the background, new data shows on the next interaction")
     st.markdown('</div>', unsafe_allow_html=True)
 
 if __name__ == "__main__":
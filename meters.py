@@ -0,0 +1,60 @@
+import csv
+
+DEFAULT_EXPECTED_LOAD = 96
+
+# Default fleet used when no registry source is configured
+FIXED_METERS = [
+    {'meter_number': 'AS3313009', 'type': '4G'},
+    {'meter_number': 'AS3313010', 'type': '4G'},
+    {'meter_number': 'AS3313011', 'type': 'BLE'},
+    {'meter_number': 'AS3313012', 'type': 'BLE'},
+    {'meter_number': 'AS3313013', 'type': 'BLE'},
+    {'meter_number': 'AS3313014', 'type': 'BLE'},
+    {'meter_number': 'AS3313015', 'type': '4G'},
+    {'meter_number': 'AS3313017', 'type': 'BLE'},
+    {'meter_number': 'AS3313019', 'type': '4G'},
+    {'meter_number': 'AS3313020', 'type': 'BLE'}
+]
+
+def normalize_meter(record):
+    """Fill in registry defaults for a meter record"""
+    expected_load = record.get('expected_load')
+    return {
+        'meter_number': str(record['meter_number']).strip(),
+        'type': record.get('type') or 'Unknown',
+        'expected_load': int(expected_load) if expected_load not in (None, '') else DEFAULT_EXPECTED_LOAD,
+        'group': record.get('group') or None,
+        'source': record.get('source') or None,
+    }
+
+def normalize_meters(records):
+    """Normalize records, dropping blanks and duplicate meter numbers (first wins)"""
+    meters = []
+    seen = set()
+    for record in records:
+        if not record.get('meter_number'):
+            continue
+        meter = normalize_meter(record)
+        if meter['meter_number'] not in seen:
+            seen.add(meter['meter_number'])
+            meters.append(meter)
+    return meters
+
+def load_meters_from_csv(path):
+    """
+    Load a registry CSV with columns meter_number, type, expected_load, group, source
+    Only meter_number is required; source names the HES source holding the meter.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        return normalize_meters(csv.DictReader(f))
+
+def meters_from_rows(rows, source=None):
+    """Build registry records from (meter_number, type, expected_load, group) query rows read from source"""
+    return normalize_meters(
+        {'meter_number': row[0], 'type': row[1], 'expected_load': row[2], 'group': row[3], 'source': source}
+        for row in rows
+    )
+
+def chunk(values, size):
+    """Split values into consecutive lists of at most size items"""
+    return [values[i:i + size] for i in range(0, len(values), size)]
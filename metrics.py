@@ -0,0 +1,186 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger('sla_dashboard.metrics')
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+class Registry:
+    """Thread-safe store of query timings, row and error counts and cache counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}   # (query, phase) -> Histogram
+        self.rows = {}         # query -> rows returned
+        self.errors = {}       # query -> failed executions
+        self.cache_requests = {}  # cache -> lookups
+        self.cache_misses = {}    # cache -> lookups that had to compute
+
+    def observe(self, query, phase, seconds):
+        with self._lock:
+            self.histograms.setdefault((query, phase), Histogram()).observe(seconds)
+
+    def add_rows(self, query, count):
+        with self._lock:
+            self.rows[query] = self.rows.get(query, 0) + count
+
+    def add_error(self, query):
+        with self._lock:
+            self.errors[query] = self.errors.get(query, 0) + 1
+
+    def cache_request(self, cache):
+        with self._lock:
+            self.cache_requests[cache] = self.cache_requests.get(cache, 0) + 1
+
+    def cache_miss(self, cache):
+        with self._lock:
+            self.cache_misses[cache] = self.cache_misses.get(cache, 0) + 1
+
+    def summary_rows(self):
+        """One dict per (query, phase) for tabular display"""
+        with self._lock:
+            return [
+                {
+                    'Query': query,
+                    'Phase': phase,
+                    'Count': hist.count,
+                    'Avg (ms)': round(hist.sum / hist.count * 1000, 1) if hist.count else 0.0,
+                    'Max (ms)': round(hist.max * 1000, 1),
+                    'Rows': self.rows.get(query, 0),
+                    'Errors': self.errors.get(query, 0),
+                }
+                for (query, phase), hist in sorted(self.histograms.items())
+            ]
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            '# HELP sla_query_duration_seconds Time spent per query phase (connect, execute, fetch)',
+            '# TYPE sla_query_duration_seconds histogram',
+        ]
+        with self._lock:
+            for (query, phase), hist in sorted(self.histograms.items()):
+                labels = f'query="{query}",phase="{phase}"'
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'sla_query_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'sla_query_duration_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+                lines.append(f'sla_query_duration_seconds_sum{{{labels}}} {hist.sum}')
+                lines.append(f'sla_query_duration_seconds_count{{{labels}}} {hist.count}')
+
+            for name, help_text, values, label in (
+                ('sla_query_rows_total', 'Rows returned per query', self.rows, 'query'),
+                ('sla_query_errors_total', 'Failed query executions', self.errors, 'query'),
+                ('sla_cache_requests_total', 'Cache lookups', self.cache_requests, 'cache'),
+                ('sla_cache_misses_total', 'Cache lookups that had to compute', self.cache_misses, 'cache'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for key, value in sorted(values.items()):
+                    lines.append(f'{name}{{{label}="{key}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+class QueryTimer:
+    """
+    Time the phases of one query and record them on exit
+    Usage:  with QueryTimer('load counts') as timer: ... timer.phase('execute') ...
+    """
+
+    def __init__(self, query, registry=REGISTRY):
+        self.query = query
+        self.registry = registry
+        self.phases = {}
+        self.rows = 0
+        self._phase = None
+        self._started = None
+
+    def phase(self, name):
+        """End the current phase, if any, and start timing name"""
+        now = time.perf_counter()
+        if self._phase is not None:
+            self.phases[self._phase] = now - self._started
+        self._phase, self._started = name, now
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.phase(None)
+        for name, seconds in self.phases.items():
+            self.registry.observe(self.query, name, seconds)
+        if exc_type is None:
+            self.registry.add_rows(self.query, self.rows)
+        else:
+            self.registry.add_error(self.query)
+        logger.info(json.dumps({
+            'event': 'query',
+            'query': self.query,
+            **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in self.phases.items()},
+            'rows': self.rows,
+            'error': None if exc_type is None else str(exc),
+        }))
+        return False
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+def configure_logging(log_file):
+    """Append structured query logs to log_file (once per process)"""
+    if any(getattr(handler, 'baseFilename', None) for handler in logger.handlers):
+        return
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+def start_http_exporter(port, host='0.0.0.0', registry=REGISTRY):
+    """Serve /metrics for Prometheus scrapes from a daemon thread (once per process)"""
+    global _exporter
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = ThreadingHTTPServer((host, port), Handler)
+            threading.Thread(target=_exporter.serve_forever, name="sla-metrics-exporter", daemon=True).start()
+    return _exporter
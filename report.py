@@ -0,0 +1,154 @@
+"""
+Write fleet SLA reports for arbitrary date ranges without Streamlit
+
+Reads [db_connection] and the other sections from a secrets.toml-style file,
+fetches the range in chunks of days (several chunks in flight at once, each
+running its queries one after another so the total never exceeds the
+connection pool) and appends each chunk to the output as soon as it and every earlier chunk are
+done, so memory is bounded by the chunks in flight rather than the range.
+
+Run with:  python report.py --start 2025-01-01 --end 2025-01-31 --output sla_jan.csv
+           python report.py --start 2025-01-01 --end 2025-03-31 --format parquet --output sla_q1.parquet
+"""
+import argparse
+import logging
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import database
+import utils
+from rollup import date_range
+
+class CsvSink:
+    """Append frames to a CSV file, writing the header once"""
+
+    def __init__(self, path):
+        self.path = path
+        self._header = True
+
+    def write(self, frame):
+        frame.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        if self._header:
+            # Empty range: still leave a file with just the header behind
+            self.write(pd.DataFrame(columns=REPORT_COLUMNS))
+
+class ParquetSink:
+    """Append frames to a Parquet file one row group at a time (needs pyarrow)"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        self._pa = pa
+        self._pq = pq
+        self.path = path
+        self._writer = None
+
+    def write(self, frame):
+        table = self._pa.Table.from_pandas(frame, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+SINKS = {'csv': CsvSink, 'parquet': ParquetSink}
+
+REPORT_COLUMNS = [
+    'Date', 'Meter Number', 'Type', 'Source', 'Expected Load',
+    'Load Received Without Reconcillation', 'Received Load Percentage',
+    'Load Received With Reconcillation', 'Received Load Percentage with Reconcillation',
+    'Midnight Received without Reconcillation', 'Midnight Received with Reconcillation',
+]
+
+def chunk_report(chunk_dates, registry):
+    """Dashboard-shaped SLA rows for chunk_dates with a leading Date column"""
+    # The chunks are the fan-out; a chunk's own source/batch queries run serially
+    with database.serial_tasks():
+        counts, unavailable = database.get_sla_counts(chunk_dates, [m['meter_number'] for m in registry])
+    # A report with a source's meters silently missing would be wrong, not partial
+    database.require_sources(unavailable)
+    frames = database.build_date_frames(counts, registry, chunk_dates)
+    return pd.concat(
+        [frame.assign(Date=date_str) for date_str, frame in frames.items()],
+        ignore_index=True
+    )[REPORT_COLUMNS]
+
+def write_report(dates, sink, chunk_days=7, workers=4):
+    """
+    Fetch dates chunk_days at a time with up to workers chunks in flight and
+    write them to sink in date order
+    Each chunk holds one connection at a time, so workers is capped at the
+    smallest HES connection pool.
+    Returns: number of rows written
+    """
+    workers = max(1, min(workers, database.smallest_pool_size()))
+    registry = database.get_meters()
+    chunks = [dates[i:i + chunk_days] for i in range(0, len(dates), chunk_days)]
+    rows = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for chunk_dates in chunks:
+            in_flight.append((chunk_dates, executor.submit(chunk_report, chunk_dates, registry)))
+            # Only submit ahead of the writer by workers chunks so finished
+            # frames cannot pile up behind a slow one
+            if len(in_flight) >= workers:
+                rows += _write_next(in_flight, sink)
+        while in_flight:
+            rows += _write_next(in_flight, sink)
+    return rows
+
+def _write_next(in_flight, sink):
+    chunk_dates, future = in_flight.popleft()
+    frame = future.result()
+    sink.write(frame)
+    print(f"  {chunk_dates[0]} to {chunk_dates[-1]}: {len(frame)} rows")
+    return len(frame)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--start', help="first date (YYYY-MM-DD), defaults to 30 days before --end")
+    parser.add_argument('--end', help="last date (YYYY-MM-DD), defaults to yesterday")
+    parser.add_argument('--output', required=True, help="file to write")
+    parser.add_argument('--format', choices=sorted(SINKS), help="output format, defaults to the --output extension")
+    parser.add_argument('--chunk-days', type=int, default=7, help="days fetched per chunk")
+    parser.add_argument('--workers', type=int, default=4, help="chunks fetched concurrently (at most the pool size)")
+    parser.add_argument('--secrets', default='.streamlit/secrets.toml', help="configuration file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(message)s')
+    database.configure(database.load_config_file(args.secrets))
+
+    yesterday = (utils.get_ist_now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    end_date = args.end or yesterday
+    start_date = args.start or (
+        datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=29)
+    ).strftime('%Y-%m-%d')
+    output_format = args.format or args.output.rsplit('.', 1)[-1].lower()
+    if output_format not in SINKS:
+        parser.error("use --format csv or --format parquet")
+
+    dates = date_range(start_date, end_date)
+    sink = SINKS[output_format](args.output)
+    print(f"Writing {len(dates)} day(s) from {start_date} to {end_date} to {args.output}")
+    try:
+        rows = write_report(dates, sink, chunk_days=args.chunk_days, workers=args.workers)
+    except database.DataAccessError as e:
+        sys.exit(f"Report failed: {e}")
+    finally:
+        sink.close()
+    print(f"Wrote {rows} rows")
+
+if __name__ == '__main__':
+    main()
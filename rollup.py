@@ -0,0 +1,52 @@
+"""
+Maintain the daily SLA rollup in the aggregate store
+
+Fetches the four SLA counts for every closed day in the range that is not yet
+stored, so trend views never have to scan the raw HES tables.
+
+Run with:  python rollup.py --days 90
+           python rollup.py --start 2025-01-01 --end 2025-03-31 --force
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime, timedelta
+
+import database
+import utils
+
+def date_range(start_date, end_date):
+    """Every 'YYYY-MM-DD' date from start_date to end_date inclusive"""
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    return [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((end - start).days + 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--days', type=int, default=90, help="roll up this many days back from yesterday")
+    parser.add_argument('--start', help="first date (YYYY-MM-DD), overrides --days")
+    parser.add_argument('--end', help="last date (YYYY-MM-DD), defaults to yesterday")
+    parser.add_argument('--chunk-days', type=int, default=7, help="days fetched per query")
+    parser.add_argument('--force', action='store_true', help="re-fetch days that are already stored")
+    parser.add_argument('--secrets', default='.streamlit/secrets.toml', help="configuration file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(message)s')
+    database.configure(database.load_config_file(args.secrets))
+
+    yesterday = (utils.get_ist_now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    end_date = args.end or yesterday
+    start_date = args.start or (
+        datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=args.days - 1)
+    ).strftime('%Y-%m-%d')
+
+    try:
+        written = database.rollup_closed_days(
+            date_range(start_date, end_date), force=args.force, chunk_days=args.chunk_days
+        )
+    except database.DataAccessError as e:
+        sys.exit(f"Rollup failed: {e}")
+    print(f"Rolled up {len(written)} day(s) between {start_date} and {end_date}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+SLOTS_PER_DAY = 96
+SLOT_MINUTES = 15
+HALF_SLOTS = SLOTS_PER_DAY // 2
+
+# Server-side masks come back as two 48-bit halves per reconciliation mode:
+# bit i of *_low is slot i, bit i of *_high is slot 48 + i
+MASK_COLUMNS = ['mask_without_recon_low', 'mask_without_recon_high', 'mask_with_recon_low', 'mask_with_recon_high']
+
+def pack_halves(low, high):
+    """
+    Pack 48-bit low/high mask halves into 12-byte little-endian bit arrays
+    Returns: uint8 array of shape (n, 12); np.unpackbits(..., bitorder='little') yields slots 0-95
+    """
+    low = np.asarray(low, dtype='<u8').reshape(-1, 1).view(np.uint8)[:, :6]
+    high = np.asarray(high, dtype='<u8').reshape(-1, 1).view(np.uint8)[:, :6]
+    return np.ascontiguousarray(np.hstack([low, high]))
+
+def unpack(packed):
+    """Boolean received-slot array of shape packed.shape[:-1] + (96,)"""
+    return np.unpackbits(packed, axis=-1, bitorder='little').astype(bool)
+
+def longest_run(missing):
+    """Length of the longest run of True along the last axis, vectorized over the others"""
+    index = np.arange(missing.shape[-1])
+    # Position of the last received slot at or before each slot; -1 before the first
+    last_present = np.maximum.accumulate(np.where(missing, -1, index), axis=-1)
+    return (index - last_present).max(axis=-1)
+
+class SlotMasks:
+    """
+    Received 15-minute load slots for dates x meters, held as packed bit arrays
+    without_recon and with_recon are uint8 arrays of shape (dates, meters, 12), so a
+    month for 10,000 meters takes about 7 MB; analysis unpacks to booleans on demand.
+    """
+
+    def __init__(self, dates, meter_numbers, without_recon, with_recon):
+        self.dates = list(dates)
+        self.meter_numbers = list(meter_numbers)
+        self.without_recon = without_recon
+        self.with_recon = with_recon
+
+    @classmethod
+    def from_frame(cls, frame, meter_numbers, dates):
+        """Build from a long frame of meter_number, date and MASK_COLUMNS; absent meter-days have no slots"""
+        index = pd.MultiIndex.from_product([dates, meter_numbers], names=['date', 'meter_number'])
+        halves = (
+            frame.drop_duplicates(['date', 'meter_number'])
+            .set_index(['date', 'meter_number'])[MASK_COLUMNS]
+            .reindex(index, fill_value=0)
+            .astype('int64')
+        )
+        shape = (len(dates), len(meter_numbers), SLOTS_PER_DAY // 8)
+        without_recon = pack_halves(halves['mask_without_recon_low'], halves['mask_without_recon_high']).reshape(shape)
+        with_recon = pack_halves(halves['mask_with_recon_low'], halves['mask_with_recon_high']).reshape(shape)
+        return cls(dates, meter_numbers, without_recon, with_recon)
+
+    def select_dates(self, dates):
+        """The masks of the given dates only, in that order"""
+        positions = [self.dates.index(date) for date in dates]
+        return SlotMasks(dates, self.meter_numbers, self.without_recon[positions], self.with_recon[positions])
+
+    @property
+    def nbytes(self):
+        return self.without_recon.nbytes + self.with_recon.nbytes
+
+    def received(self, with_recon=True):
+        """Boolean (dates, meters, 96) array of received slots"""
+        return unpack(self.with_recon if with_recon else self.without_recon)
+
+    def recovered(self):
+        """Boolean (dates, meters, 96) array of slots that only arrived through reconciliation"""
+        return unpack(self.with_recon & ~self.without_recon)
+
+    def gap_heatmap(self, with_recon=True):
+        """Share of meters missing each slot on each date: DataFrame of dates x 96 slot start times"""
+        missing = ~self.received(with_recon)
+        share = missing.mean(axis=1) if self.meter_numbers else np.zeros((len(self.dates), SLOTS_PER_DAY))
+        return pd.DataFrame(share, index=self.dates, columns=slot_labels())
+
+    def recovered_heatmap(self):
+        """Share of meters whose slot only arrived through reconciliation: DataFrame of dates x 96 slot start times"""
+        recovered = self.recovered()
+        share = recovered.mean(axis=1) if self.meter_numbers else np.zeros((len(self.dates), SLOTS_PER_DAY))
+        return pd.DataFrame(share, index=self.dates, columns=slot_labels())
+
+    def meter_summary(self):
+        """
+        Per-meter gap statistics across all dates
+        Returns: DataFrame with Meter Number, Days With Gaps, Missing Slots, Longest Outage (slots),
+        Longest Outage Date and Recovered By Reconciliation, worst meters first
+        """
+        missing = ~self.received(with_recon=True)
+        longest = longest_run(missing)                       # (dates, meters)
+        worst_day = longest.argmax(axis=0) if self.dates else np.zeros(len(self.meter_numbers), dtype=int)
+        summary = pd.DataFrame({
+            'Meter Number': self.meter_numbers,
+            'Days With Gaps': missing.any(axis=-1).sum(axis=0),
+            'Missing Slots': missing.sum(axis=(0, 2)),
+            'Longest Outage (slots)': longest.max(axis=0) if self.dates else 0,
+            'Longest Outage Date': [self.dates[i] for i in worst_day] if self.dates else None,
+            'Recovered By Reconciliation': self.recovered().sum(axis=(0, 2)),
+        })
+        return summary.sort_values(
+            ['Longest Outage (slots)', 'Missing Slots'], ascending=False, kind='stable'
+        ).reset_index(drop=True)
+
+def slot_labels():
+    """'HH:MM' start time of each of the 96 slots"""
+    return [f"{(i * SLOT_MINUTES) // 60:02d}:{(i * SLOT_MINUTES) % 60:02d}" for i in range(SLOTS_PER_DAY)]
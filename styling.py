@@ -1,41 +1,80 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
+import database
+import meters
 
 def create_sample_data():
-    """Create sample data"""
+    """Create sample data for the default fleet"""
+    load_without = [71, 78, 80, 80, 80, 75, 75, 80, 69, 80]
+    sample_meters = meters.FIXED_METERS
     sample_data = {
-        'Meter Number': ['AS3313009', 'AS3313010', 'AS3313011', 'AS3313012', 'AS3313013',
-                         'AS3313014', 'AS3313015', 'AS3313017', 'AS3313019', 'AS3313020'],
-        'Type': ['4G', '4G', 'BLE', 'BLE', 'BLE', 'BLE', '4G', 'BLE', '4G', 'BLE'],
-        'Expected Load': [96, 96, 96, 96, 96, 96, 96, 96, 96, 96],
-        'Load Received Without Reconcillation': [71, 78, 80, 80, 80, 75, 75, 80, 69, 80],
+        'Meter Number': [m['meter_number'] for m in sample_meters],
+        'Type': [m['type'] for m in sample_meters],
+        'Expected Load': [meters.DEFAULT_EXPECTED_LOAD] * len(sample_meters),
+        'Load Received Without Reconcillation': load_without,
         'Received Load Percentage': [73.96, 81.25, 83.33, 83.33, 83.33, 78.13, 78.13, 83.33, 71.88, 83.33],
-        'Load Received With Reconcillation': [96, 96, 96, 96, 96, 96, 96, 96, 96, 96],
-        'Received Load Percentage with Reconcillation': [100.00, 100.00, 100.00, 100.00, 100.00, 100.00, 100.00, 100.00, 100.00, 100.00],
-        'Midnight Received without Reconcillation': [1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
-        'Midnight Received with Reconcillation': [1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+        'Load Received With Reconcillation': [96] * len(sample_meters),
+        'Received Load Percentage with Reconcillation': [100.00] * len(sample_meters),
+        'Midnight Received without Reconcillation': [1] * len(sample_meters),
+        'Midnight Received with Reconcillation': [1] * len(sample_meters)
     }
     return pd.DataFrame(sample_data)
 
-def apply_sla_styling(df):
-    """Apply enhanced styling to SLA dataframe"""
-    try:
-        styled_df = df.copy()
+# Cells below these values are highlighted as SLA warnings; the optional
+# [sla_thresholds] config section overrides any of them
+SLA_THRESHOLDS = {
+    'load': 1.0,          # share of the row's Expected Load received per day
+    'percentage': 100.0,  # received load percentage
+    'midnight': 1,        # midnight snapshots per day
+}
 
-        # Format percentage columns
-        if 'Received Load Percentage' in styled_df.columns:
-            styled_df['Received Load Percentage'] = styled_df['Received Load Percentage'].apply(
-                lambda x: f"{float(x):.2f}%" if isinstance(x, (int, float)) else str(x)
-            )
+# Column -> threshold key checked for that column
+WARNING_RULES = {
+    'Load Received Without Reconcillation': 'load',
+    'Received Load Percentage': 'percentage',
+    'Load Received With Reconcillation': 'load',
+    'Received Load Percentage with Reconcillation': 'percentage',
+    'Midnight Received without Reconcillation': 'midnight',
+    'Midnight Received with Reconcillation': 'midnight',
+}
 
-        if 'Received Load Percentage with Reconcillation' in styled_df.columns:
-            styled_df['Received Load Percentage with Reconcillation'] = styled_df['Received Load Percentage with Reconcillation'].apply(
-                lambda x: f"{float(x):.2f}%" if isinstance(x, (int, float)) else str(x)
-            )
+PERCENTAGE_COLUMNS = ['Received Load Percentage', 'Received Load Percentage with Reconcillation']
 
-        # Create styler
-        styler = styled_df.style
+def get_thresholds(thresholds=None):
+    """SLA_THRESHOLDS with the [sla_thresholds] config section, then thresholds, applied over them"""
+    configured = {
+        key: float(value) for key, value in database.get_config_section('sla_thresholds').items()
+        if key in SLA_THRESHOLDS
+    }
+    return {**SLA_THRESHOLDS, **configured, **(thresholds or {})}
 
+def sla_warning_mask(df, thresholds=None):
+    """
+    Boolean frame, True where a checked column is below its threshold
+    Load columns are checked against each row's Expected Load (the default
+    meter load when the column is missing), scaled by the 'load' threshold.
+    """
+    thresholds = get_thresholds(thresholds)
+    if 'Expected Load' in df.columns:
+        expected_load = pd.to_numeric(df['Expected Load'], errors='coerce').to_numpy(dtype='float64')
+    else:
+        expected_load = np.full(len(df), float(meters.DEFAULT_EXPECTED_LOAD))
+    limits = {
+        'load': expected_load * thresholds['load'],
+        'percentage': thresholds['percentage'],
+        'midnight': thresholds['midnight'],
+    }
+    mask = np.zeros(df.shape, dtype=bool)
+    for col, key in WARNING_RULES.items():
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64')
+            mask[:, df.columns.get_loc(col)] = values < limits[key]
+    return pd.DataFrame(mask, index=df.index, columns=df.columns)
+
+def apply_sla_styling(df, thresholds=None):
+    """Apply enhanced styling to SLA dataframe, keeping numeric dtypes"""
+    try:
         # Colors - updated for dark mode compatibility
         header_bg = '#000000'      # Black background for headers
         header_text = '#FFFFFF'    # White text for headers
@@ -73,50 +112,24 @@ def apply_sla_styling(df):
              'props': [('background-color', '#B8F0D0')]}
         ]
 
-        styler = styler.set_table_styles(table_styles, overwrite=False)
-
-        # Conditional formatting
-        def highlight_cells(row):
-            styles = [''] * len(row)
-            try:
-                for i, (col, val) in enumerate(zip(styled_df.columns, row)):
-                    base_style = f'border: 2px solid {border}; background-color: {data_bg}; color: {data_text};'
-                    warning_style = f'border: 2px solid {border}; background-color: {warning_bg}; color: {warning_text}; font-weight: bold;'
-
-                    if col == 'Load Received Without Reconcillation':
-                        styles[i] = warning_style if isinstance(val, (int, float)) and val < 96 else base_style
-
-                    elif col == 'Received Load Percentage':
-                        try:
-                            perc_val = float(str(val).replace('%', ''))
-                            styles[i] = warning_style if perc_val < 100 else base_style
-                        except:
-                            styles[i] = base_style
-
-                    elif col == 'Load Received With Reconcillation':
-                        styles[i] = warning_style if isinstance(val, (int, float)) and val < 96 else base_style
-
-                    elif col == 'Received Load Percentage with Reconcillation':
-                        try:
-                            perc_val = float(str(val).replace('%', ''))
-                            styles[i] = warning_style if perc_val < 100 else base_style
-                        except:
-                            styles[i] = base_style
-
-                    elif col == 'Midnight Received without Reconcillation':
-                        styles[i] = warning_style if isinstance(val, (int, float)) and val < 1 else base_style
-
-                    elif col == 'Midnight Received with Reconcillation':
-                        styles[i] = warning_style if isinstance(val, (int, float)) and val < 1 else base_style
-
-                    else:
-                        styles[i] = base_style
-            except Exception:
-                for i in range(len(styles)):
-                    styles[i] = f'border: 2px solid {border}; background-color: {data_bg}; color: {data_text};'
-            return styles
-
-        styler = styler.apply(highlight_cells, axis=1)
+        styler = df.style.set_table_styles(table_styles, overwrite=False)
+
+        # Percentages stay floats; only their display gets the % suffix
+        percentage_columns = [col for col in PERCENTAGE_COLUMNS if col in df.columns]
+        if percentage_columns:
+            styler = styler.format('{:.2f}%', subset=percentage_columns, na_rep='')
+
+        # Conditional formatting computed column-wise for the whole frame at once
+        base_style = f'border: 2px solid {border}; background-color: {data_bg}; color: {data_text};'
+        warning_style = f'border: 2px solid {border}; background-color: {warning_bg}; color: {warning_text}; font-weight: bold;'
+        mask = sla_warning_mask(df, thresholds)
+        cell_styles = pd.DataFrame(
+            np.where(mask.to_numpy(), warning_style, base_style),
+            index=df.index,
+            columns=df.columns
+        )
+
+        styler = styler.apply(lambda _: cell_styles, axis=None)
         return styler
 
     except Exception as e:
@@ -143,12 +156,72 @@ def create_metric_card(title, value, icon, bg_color='#196B24'):
     </div>
     """, unsafe_allow_html=True)
 
-def create_metric_row(df, display_name, is_real_data=True):
-    """Create metrics row"""
+def compute_fleet_summary(sla_data, thresholds=None):
+    """
+    Summarize every date's SLA frame in one vectorized pass
+    Returns: dict {date: {'total', 'avg_without', 'avg_with', 'midnight_ok', 'sla_met',
+    'by_type': {type: same keys without by_type}}}
+    """
+    frames = {date_str: df for date_str, df in sla_data.items() if df is not None and not df.empty}
+    if not frames:
+        return {}
+
+    thresholds = get_thresholds(thresholds)
+    combined = pd.concat(frames, names=['date', 'row']).reset_index(level='date')
+
+    avg_without = pd.to_numeric(combined['Received Load Percentage'], errors='coerce')
+    avg_with = pd.to_numeric(combined['Received Load Percentage with Reconcillation'], errors='coerce')
+    midnight_ok = combined['Midnight Received with Reconcillation'].to_numpy() >= thresholds['midnight']
+    metrics = pd.DataFrame({
+        'date': combined['date'].to_numpy(),
+        'type': combined['Type'].to_numpy(),
+        'avg_without': avg_without.to_numpy(),
+        'avg_with': avg_with.to_numpy(),
+        'midnight_ok': midnight_ok,
+        'sla_met': midnight_ok & (avg_with.to_numpy() >= thresholds['percentage']),
+    })
+    aggregations = {
+        'total': ('midnight_ok', 'size'),
+        'avg_without': ('avg_without', 'mean'),
+        'avg_with': ('avg_with', 'mean'),
+        'midnight_ok': ('midnight_ok', 'sum'),
+        'sla_met': ('sla_met', 'sum'),
+    }
+    by_date = metrics.groupby('date', sort=False).agg(**aggregations)
+    by_date_type = metrics.groupby(['date', 'type'], sort=True).agg(**aggregations)
+
+    def as_values(row):
+        return {
+            'total': int(row['total']),
+            'avg_without': float(row['avg_without']),
+            'avg_with': float(row['avg_with']),
+            'midnight_ok': int(row['midnight_ok']),
+            'sla_met': int(row['sla_met']),
+        }
+
+    summary = {date_str: {**as_values(row), 'by_type': {}} for date_str, row in by_date.iterrows()}
+    for (date_str, meter_type), row in by_date_type.iterrows():
+        summary[date_str]['by_type'][meter_type] = as_values(row)
+    return summary
+
+def format_average(value):
+    return "N/A" if pd.isna(value) else f"{value:.1f}%"
+
+def create_metric_row(df, display_name, is_real_data=True, summary=None):
+    """
+    Create metrics row from a precomputed summary (see compute_fleet_summary)
+    The summary is computed from df when not supplied, e.g. for sample data.
+    """
     if df.empty:
         st.warning("No data available")
         return
 
+    if summary is None:
+        summary = compute_fleet_summary({display_name: df}).get(display_name)
+    if not summary:
+        st.warning("No data available")
+        return
+
     bg_color = '#196B24' if is_real_data else '#888888'
 
     # Heading for the metric row (theme-aware via CSS class)
@@ -161,35 +234,27 @@ def create_metric_row(df, display_name, is_real_data=True):
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        total_meters = len(df)
-        create_metric_card("Total Meters", total_meters, "📊", bg_color)
+        create_metric_card("Total Meters", summary['total'], "📊", bg_color)
 
     with col2:
-        try:
-            perc_values = df['Received Load Percentage'].apply(
-                lambda x: float(str(x).replace('%', '')) if isinstance(x, str) else float(x)
-            )
-            avg_without = perc_values.mean()
-            create_metric_card("Load Avg Without Recon", f"{avg_without:.1f}%", "📉", bg_color)
-        except:
-            create_metric_card("Load Avg Without Recon", "N/A", "📉", bg_color)
+        create_metric_card("Load Avg Without Recon", format_average(summary['avg_without']), "📉", bg_color)
 
     with col3:
-        try:
-            perc_values_recon = df['Received Load Percentage with Reconcillation'].apply(
-                lambda x: float(str(x).replace('%', '')) if isinstance(x, str) else float(x)
-            )
-            avg_with = perc_values_recon.mean()
-            create_metric_card("Load Avg With Recon", f"{avg_with:.1f}%", "📈", bg_color)
-        except:
-            create_metric_card("Load Avg With Recon", "N/A", "📈", bg_color)
+        create_metric_card("Load Avg With Recon", format_average(summary['avg_with']), "📈", bg_color)
 
     with col4:
-        try:
-            midnight_ok = (df['Midnight Received with Reconcillation'] >= 1).sum()
-            midnight_total = len(df)
-            create_metric_card("Midnight Status", f"{midnight_ok}/{midnight_total}", "🌙", bg_color)
-        except:
-            create_metric_card("Midnight Status", "N/A", "🌙", bg_color)
+        create_metric_card("Midnight Status", f"{summary['midnight_ok']}/{summary['total']}", "🌙", bg_color)
+
+    # Per-type breakdown, e.g. 4G vs BLE
+    if summary['by_type']:
+        breakdown = ' | '.join(
+            f"{meter_type}: {values['total']} meters, SLA met {values['sla_met']}, "
+            f"avg {format_average(values['avg_without'])} / {format_average(values['avg_with'])} with recon"
+            for meter_type, values in summary['by_type'].items()
+        )
+        st.markdown(
+            f'<p style="color: #666666 !important; font-size: 14px; text-align: center;">{breakdown}</p>',
+            unsafe_allow_html=True
+        )
 
     st.markdown("<br>", unsafe_allow_html=True)
@@ -0,0 +1,188 @@
+"""
+Populate a local stand-in HES database with synthetic meter data
+
+Creates amr_load_data, amr_midnight_data and push_alarm_parsed in the schema
+of a configured HES source (the first by default: [hes_sources], else the
+[db_connection] schema, sense_hes_demo unless set) and fills them for
+meters x days, with outage gaps, late reconciliation rows and alarms.
+Never point this at the production HES server.
+
+Run with:  python synthetic.py --meters 1000 --days 30 --alarm-rate 2 --reset [--source NAME]
+"""
+import argparse
+import csv
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import database
+
+TABLES = ('amr_load_data', 'amr_midnight_data', 'push_alarm_parsed')
+
+def ddl(schema):
+    """Statements creating the stand-in schema and its tables"""
+    return [
+        f"CREATE DATABASE IF NOT EXISTS {schema}",
+        f"""CREATE TABLE IF NOT EXISTS {schema}.amr_load_data (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            meter_number VARCHAR(32) NOT NULL,
+            DATETIME_SLOT DATETIME NOT NULL,
+            command_code VARCHAR(16) NULL,
+            server_time DATETIME NOT NULL,
+            KEY meter_slot (meter_number, DATETIME_SLOT)
+        )""",
+        f"""CREATE TABLE IF NOT EXISTS {schema}.amr_midnight_data (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            meter_number VARCHAR(32) NOT NULL,
+            D6_SNAP_DATETIME DATETIME NOT NULL,
+            command_code VARCHAR(16) NULL,
+            server_time DATETIME NOT NULL,
+            KEY meter_snap (meter_number, D6_SNAP_DATETIME)
+        )""",
+        f"""CREATE TABLE IF NOT EXISTS {schema}.push_alarm_parsed (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            meter_number VARCHAR(32) NOT NULL,
+            alarm_time DATETIME NOT NULL,
+            alarm_type VARCHAR(64) NOT NULL,
+            KEY meter_alarm (meter_number, alarm_time)
+        )""",
+    ]
+
+def create_tables(conn, schema, reset=False):
+    """Create the stand-in tables in schema, emptying them when reset is set"""
+    cursor = conn.cursor()
+    for statement in ddl(schema):
+        cursor.execute(statement)
+    if reset:
+        for table in TABLES:
+            cursor.execute(f"TRUNCATE TABLE {schema}.{table}")
+    cursor.close()
+
+ALARM_TYPES = ['Power Fail', 'Power Restore', 'Cover Open', 'Magnet Tamper', 'Low Voltage', 'Over Current']
+RECON_COMMAND_CODE = 'RECON'
+SLOTS_PER_DAY = 96
+
+def synthetic_meters(meter_count):
+    """Registry records for meter_count synthetic meters (every third one 4G)"""
+    return [
+        {'meter_number': f'SM{i:07d}', 'type': '4G' if i % 3 == 0 else 'BLE',
+         'expected_load': SLOTS_PER_DAY, 'group': f'FEEDER-{i % 20:02d}'}
+        for i in range(meter_count)
+    ]
+
+def meter_day_rows(rng, meter_number, day, gap_rate, recon_rate, drop_rate):
+    """
+    Load and midnight rows for one meter-day
+    Each day has an outage window with probability gap_rate plus random single-slot
+    drops; recon_rate of the missing slots arrive later with a command code, after
+    the next day's 04:10 cutoff.
+    """
+    received = rng.random(SLOTS_PER_DAY) >= drop_rate
+    if rng.random() < gap_rate:
+        start = rng.integers(0, SLOTS_PER_DAY)
+        received[start:start + rng.integers(4, 32)] = False
+
+    slots = [day + timedelta(minutes=15 * i) for i in range(SLOTS_PER_DAY)]
+    delays = rng.integers(1, 30, size=SLOTS_PER_DAY)
+    late_recovery = rng.random(SLOTS_PER_DAY) < recon_rate
+    recon_time = day + timedelta(days=1, hours=6) + timedelta(minutes=int(rng.integers(0, 600)))
+
+    load_rows = []
+    for i, slot in enumerate(slots):
+        if received[i]:
+            load_rows.append((meter_number, slot, None, slot + timedelta(minutes=int(delays[i]))))
+        elif late_recovery[i]:
+            load_rows.append((meter_number, slot, RECON_COMMAND_CODE, recon_time))
+
+    midnight_rows = []
+    if rng.random() >= drop_rate * 4:
+        midnight_rows.append((meter_number, day, None, day + timedelta(minutes=int(rng.integers(1, 60)))))
+    elif rng.random() < recon_rate:
+        midnight_rows.append((meter_number, day, RECON_COMMAND_CODE, recon_time))
+    return load_rows, midnight_rows
+
+def alarm_rows(rng, meter_number, day, alarm_rate):
+    """Poisson(alarm_rate) alarms at random times during day"""
+    count = rng.poisson(alarm_rate)
+    seconds = np.sort(rng.integers(0, 86400, size=count))
+    types = rng.choice(ALARM_TYPES, size=count)
+    return [(meter_number, day + timedelta(seconds=int(s)), str(t)) for s, t in zip(seconds, types)]
+
+def insert_batches(conn, query, rows, batch_size):
+    cursor = conn.cursor()
+    for i in range(0, len(rows), batch_size):
+        cursor.executemany(query, rows[i:i + batch_size])
+    cursor.close()
+
+def populate(conn, schema, meters, days, alarm_rate, gap_rate, recon_rate, drop_rate, seed, batch_size=5000):
+    """Generate and insert rows into schema day by day so memory stays bounded by one day of data"""
+    rng = np.random.default_rng(seed)
+    totals = {'load': 0, 'midnight': 0, 'alarms': 0}
+    for day in days:
+        load, midnight, alarms = [], [], []
+        for meter in meters:
+            meter_load, meter_midnight = meter_day_rows(
+                rng, meter['meter_number'], day, gap_rate, recon_rate, drop_rate
+            )
+            load.extend(meter_load)
+            midnight.extend(meter_midnight)
+            alarms.extend(alarm_rows(rng, meter['meter_number'], day, alarm_rate))
+
+        insert_batches(conn, f"INSERT INTO {schema}.amr_load_data (meter_number, DATETIME_SLOT, command_code, server_time) VALUES (%s, %s, %s, %s)", load, batch_size)
+        insert_batches(conn, f"INSERT INTO {schema}.amr_midnight_data (meter_number, D6_SNAP_DATETIME, command_code, server_time) VALUES (%s, %s, %s, %s)", midnight, batch_size)
+        insert_batches(conn, f"INSERT INTO {schema}.push_alarm_parsed (meter_number, alarm_time, alarm_type) VALUES (%s, %s, %s)", alarms, batch_size)
+        totals['load'] += len(load)
+        totals['midnight'] += len(midnight)
+        totals['alarms'] += len(alarms)
+        print(f"  {day:%Y-%m-%d}: {len(load)} load, {len(midnight)} midnight, {len(alarms)} alarms")
+    return totals
+
+def write_registry(path, meters):
+    """Write a registry CSV usable with [meter_registry] source = 'file'"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['meter_number', 'type', 'expected_load', 'group'])
+        writer.writeheader()
+        writer.writerows(meters)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--meters', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--end-date', help="last generated day (YYYY-MM-DD), defaults to yesterday")
+    parser.add_argument('--alarm-rate', type=float, default=2.0, help="mean alarms per meter per day")
+    parser.add_argument('--gap-rate', type=float, default=0.1, help="share of meter-days with an outage window")
+    parser.add_argument('--drop-rate', type=float, default=0.02, help="share of slots randomly missing")
+    parser.add_argument('--recon-rate', type=float, default=0.7, help="share of missing slots reconciled later")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--registry', default='synthetic_meters.csv', help="where to write the meter registry CSV")
+    parser.add_argument('--reset', action='store_true', help="empty the tables first")
+    parser.add_argument('--source', help="HES source to populate, defaults to the first configured one")
+    args = parser.parse_args()
+
+    end = datetime.strptime(args.end_date, '%Y-%m-%d') if args.end_date else (
+        datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    )
+    days = [end - timedelta(days=i) for i in range(args.days - 1, -1, -1)]
+    meters = synthetic_meters(args.meters)
+
+    try:
+        source = database.get_hes_source(args.source)
+        conn = database.get_db_connection(source['name'])
+    except database.DataAccessError as e:
+        raise SystemExit(f"{e}; configure [db_connection] in .streamlit/secrets.toml")
+    try:
+        create_tables(conn, source['schema'], reset=args.reset)
+        print(f"Generating {args.meters} meters x {args.days} days in {source['schema']}")
+        totals = populate(
+            conn, source['schema'], meters, days,
+            args.alarm_rate, args.gap_rate, args.recon_rate, args.drop_rate, args.seed
+        )
+    finally:
+        conn.close()
+
+    write_registry(args.registry, meters)
+    print(f"Inserted {totals['load']} load, {totals['midnight']} midnight and {totals['alarms']} alarm rows")
+    print(f"Registry written to {args.registry}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+# The app modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+DB_CONNECTION = {
+    'host': 'localhost',
+    'port': 3306,
+    'database': 'sense_hes_demo',
+    'user': 'sla',
+    'password': 'secret',
+}
+
+def reset_database_state():
+    database._pools.clear()
+    database._breakers.clear()
+    database._registry.update(meters=None, loaded_at=0.0)
+
+@pytest.fixture
+def messages():
+    """(level, message) pairs sent through database.notify"""
+    return []
+
+@pytest.fixture
+def config(messages):
+    """
+    Injected configuration (a fake [db_connection], aggregate store off) instead of
+    Streamlit secrets; tests may add sections before touching the database module
+    """
+    settings = {
+        'db_connection': dict(DB_CONNECTION),
+        'aggregate_store': {'enabled': False},
+    }
+    database.configure(settings, lambda level, message: messages.append((level, message)))
+    reset_database_state()
+    yield settings
+    database.configure()
+    reset_database_state()
@@ -0,0 +1,95 @@
+"""
+pytest-benchmark cases for the dashboard's data stages
+The query stages run against a MySQL stand-in populated with synthetic.py
+when SLA_TEST_SECRETS points at its secrets.toml, and are skipped otherwise.
+Run with: python -m pytest tests/test_benchmarks.py --benchmark-only
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import database
+import synthetic
+from benchmark import database_stages, in_memory_stages, peak_memory
+from conftest import reset_database_state
+
+METERS, DAYS = 2000, 7
+DB_METERS, DB_DAYS = 200, 3
+# The stand-in tables are emptied and refilled, so they get a schema of their own
+DB_SCHEMA = 'sla_benchmark'
+
+# Peak Python memory allowed per stage at the sizes above
+PEAK_MEMORY_BUDGETS = {
+    'build_date_frames': 8 * 2**20,
+    'compute_fleet_summary': 8 * 2**20,
+    'apply_sla_styling': 32 * 2**20,
+    'fetch_sla_counts': 16 * 2**20,
+    'fetch_alarm_counts': 16 * 2**20,
+    'iter_alarms': 16 * 2**20,
+}
+
+def as_stages(stages):
+    return {name: (func, args) for name, func, args in stages}
+
+@pytest.fixture
+def in_memory(config):
+    """The in-memory stages, built under the injected configuration"""
+    return as_stages(in_memory_stages(METERS, DAYS))
+
+@pytest.fixture(scope='module')
+def synthetic_settings(tmp_path_factory):
+    """Configuration for a stand-in schema filled with DB_METERS x DB_DAYS of synthetic data"""
+    if not os.environ.get('SLA_TEST_SECRETS'):
+        pytest.skip("set SLA_TEST_SECRETS to a secrets.toml for a MySQL stand-in (see synthetic.py)")
+    settings = database.load_config_file(os.environ['SLA_TEST_SECRETS'])
+    settings.pop('hes_sources', None)
+    settings['db_connection'] = {**settings.get('db_connection', {}), 'schema': DB_SCHEMA}
+    settings['aggregate_store'] = {'enabled': False}
+    meters = synthetic.synthetic_meters(DB_METERS)
+    registry = tmp_path_factory.mktemp('registry') / 'meters.csv'
+    synthetic.write_registry(registry, meters)
+    settings['meter_registry'] = {'source': 'file', 'path': str(registry)}
+
+    database.configure(settings)
+    try:
+        conn = database.get_db_connection()
+    except database.DataAccessError as e:
+        database.configure()
+        pytest.skip(f"MySQL stand-in unavailable: {e}")
+    try:
+        synthetic.create_tables(conn, DB_SCHEMA, reset=True)
+        last_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        days = [last_day - timedelta(days=i) for i in range(DB_DAYS)]
+        synthetic.populate(conn, DB_SCHEMA, meters, days, 2.0, 0.1, 0.7, 0.02, seed=0)
+    finally:
+        conn.close()
+        database.configure()
+        reset_database_state()
+    return settings
+
+@pytest.fixture
+def db_stages(synthetic_settings):
+    """The query stages, run against the synthetic stand-in"""
+    database.configure(synthetic_settings)
+    reset_database_state()
+    yield as_stages(database_stages(DB_DAYS))
+    database.configure()
+    reset_database_state()
+
+def run_stage(benchmark, stages, name, **sizes):
+    func, args = stages[name]
+    peak = peak_memory(func, *args)
+    benchmark.extra_info.update(sizes, peak_bytes=peak)
+    assert peak <= PEAK_MEMORY_BUDGETS[name], f"{name} peaked at {peak / 2**20:.1f} MiB"
+    benchmark(func, *args)
+
+@pytest.mark.parametrize('name', ['build_date_frames', 'compute_fleet_summary', 'apply_sla_styling'])
+def test_in_memory_stage(benchmark, in_memory, name):
+    run_stage(benchmark, in_memory, name, meters=METERS, days=DAYS)
+
+@pytest.mark.parametrize('name', ['fetch_sla_counts', 'fetch_alarm_counts', 'iter_alarms'])
+def test_database_stage(benchmark, db_stages, name):
+    run_stage(benchmark, db_stages, name, meters=DB_METERS, days=DB_DAYS)
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+import compact
+
+def test_downcast_integers_picks_smallest_dtype():
+    assert compact.downcast_integers(pd.Series([0, 96], dtype='int64')).dtype == np.uint8
+    assert compact.downcast_integers(pd.Series([0, 70000], dtype='int64')).dtype == np.uint32
+    assert compact.downcast_integers(pd.Series([-1, 100], dtype='int64')).dtype == np.int8
+    empty = pd.Series([], dtype='int64')
+    assert compact.downcast_integers(empty).dtype == np.int64
+
+def test_compact_frames_share_categories_and_keep_values():
+    frames = {
+        '2025-01-01': pd.DataFrame({'Meter Number': ['A', 'B'], 'Type': ['4G', 'BLE'], 'Expected Load': [96, 96]}),
+        '2025-01-02': pd.DataFrame({'Meter Number': ['C', 'A'], 'Type': ['BLE', 'BLE'], 'Expected Load': [96, 48]}),
+    }
+    compacted = compact.compact_frames(frames)
+    first, second = compacted['2025-01-01'], compacted['2025-01-02']
+    assert first['Meter Number'].dtype == second['Meter Number'].dtype
+    assert list(first['Meter Number'].cat.categories) == ['A', 'B', 'C']
+    assert first['Expected Load'].dtype == np.uint8
+    for key, frame in frames.items():
+        pd.testing.assert_frame_equal(compacted[key].astype(frame.dtypes.to_dict()), frame)
+
+def test_footprint_counts_shared_categories_once():
+    frames = compact.compact_frames({
+        day: pd.DataFrame({'Meter Number': [f'SM{i:07d}' for i in range(1000)]}) for day in ('d1', 'd2')
+    })
+    one = compact.footprint(frames['d1'])
+    both = compact.footprint(frames)
+    # The second frame only adds its codes, not another copy of the categories
+    assert both - one < one / 2
@@ -0,0 +1,297 @@
+import sqlite3
+import threading
+import time
+
+import mysql.connector
+import pandas as pd
+import pytest
+from mysql.connector.connection import MySQLConnection
+from mysql.connector.cursor import MySQLCursorPrepared
+
+import aggregate_store
+import benchmark
+import database
+import slots
+
+def production_connection(monkeypatch):
+    """An unconnected MySQLConnection carrying the options get_db_connection passes to connect()"""
+    options = {}
+
+    def connect(**kwargs):
+        options.update(kwargs)
+        conn = MySQLConnection()
+        conn._buffered = kwargs['buffered']
+        conn.is_connected = lambda: True
+        return conn
+
+    monkeypatch.setattr(mysql.connector, 'connect', connect)
+    conn = database.get_db_connection()
+    assert options['buffered'] is True
+    return conn
+
+def test_prepared_cursor_on_production_connection(config, monkeypatch):
+    pooled = database._PooledConnection(production_connection(monkeypatch), max_prepared=32)
+    cursor, reusable, cache_hit = pooled.cursor_for("SELECT 1")
+    assert isinstance(cursor, MySQLCursorPrepared)
+    assert reusable and not cache_hit
+    assert pooled.cursor_for("SELECT 1") == (cursor, True, True)
+
+class FakeConnection:
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+def test_pool_wait_is_bounded_by_timeout_not_pool_timeout():
+    pool = database.ConnectionPool(FakeConnection, pool_size=1, pool_timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(database.PoolExhaustedError):
+        pool.acquire()
+    threading.Timer(0.2, pool.release, (held,)).start()
+    pool.release(pool.acquire(timeout=2))
+    assert pool.stats()['timeouts'] == 1
+
+def test_nested_run_tasks_share_the_outer_deadline(config):
+    config['query_execution'] = {'max_workers': 4, 'min_free_connections': 0}
+    seen = {}
+
+    def inner(name):
+        time.sleep(0.2)
+        seen[name] = database.task_deadline()
+        return name
+
+    def outer():
+        # The inner timeout is far too short on its own; the outer deadline wins
+        return database.run_tasks({name: (inner, (name,)) for name in 'ab'}, timeout=0.01, raise_errors=True)
+
+    started = time.monotonic()
+    results = database.run_tasks({'outer': (outer, ())}, timeout=5, raise_errors=True)
+    assert results == {'outer': {'a': 'a', 'b': 'b'}}
+    assert seen['a'] == seen['b'] == pytest.approx(started + 5, abs=0.5)
+    assert database.task_deadline() is None
+
+def test_rollup_needs_the_aggregate_store(config):
+    with pytest.raises(database.ConfigurationError):
+        database.rollup_closed_days(['2025-01-01'])
+
+def test_circuit_opens_after_threshold_and_probe_closes_it():
+    breaker = database.CircuitBreaker(probe=lambda: None, failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure("refused")
+    breaker.before_request()
+    breaker.record_failure("refused")
+    with pytest.raises(database.CircuitOpenError):
+        breaker.before_request()
+    deadline = time.monotonic() + 2
+    while breaker.state != 'closed' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert breaker.state == 'closed' and breaker.failures == 0
+    breaker.before_request()
+
+def test_circuit_health_check_is_cached_and_trips_on_connection_error():
+    breaker = database.CircuitBreaker(probe=lambda: None, reset_timeout=60, health_ttl=60)
+    calls = []
+    assert breaker.check_health(lambda: calls.append(1))
+    assert breaker.check_health(lambda: calls.append(1))
+    assert len(calls) == 1
+
+    breaker.last_success = None
+    def refused():
+        raise mysql.connector.errors.InterfaceError(errno=2003, msg="Can't connect")
+    assert not breaker.check_health(refused)
+    assert breaker.status()['state'] == 'open'
+    with pytest.raises(database.CircuitOpenError):
+        breaker.before_request()
+
+def test_build_date_frames_fills_missing_meters(config):
+    registry = [
+        {'meter_number': 'A', 'type': '4G', 'expected_load': 96, 'group': None},
+        {'meter_number': 'B', 'type': 'BLE', 'expected_load': 0, 'group': None},
+    ]
+    counts = pd.DataFrame({
+        'meter_number': ['A', 'B'],
+        'date': ['2025-01-01', '2025-01-02'],
+        'load_without_recon': [48, 10],
+        'load_with_recon': [72, 10],
+        'midnight_without_recon': [0, 1],
+        'midnight_with_recon': [1, 1],
+    })
+    frames = database.build_date_frames(counts, registry, ['2025-01-01', '2025-01-02'])
+    first, second = frames['2025-01-01'], frames['2025-01-02']
+    assert first['Meter Number'].tolist() == second['Meter Number'].tolist() == ['A', 'B']
+    assert first['Received Load Percentage'].tolist() == [50.0, 0.0]
+    assert first['Received Load Percentage with Reconcillation'].tolist() == [75.0, 0.0]
+    # A has no row on the second day; B expects nothing so its percentage stays 0
+    assert second['Load Received With Reconcillation'].tolist() == [0, 10]
+    assert second['Received Load Percentage'].tolist() == [0.0, 0.0]
+    assert set(first['Source']) == {database.get_hes_sources()[0]['name']}
+
+def test_build_date_frames_matches_legacy_loop(config):
+    registry, target_dates, counts = benchmark.synthetic_counts(300, 3)
+    legacy = benchmark.legacy_date_frames(counts, registry, target_dates)
+    frames = database.build_date_frames(counts, registry, target_dates)
+    for target_date in target_dates:
+        expected = legacy[target_date]
+        pd.testing.assert_frame_equal(expected, frames[target_date][expected.columns], check_dtype=False)
+
+def test_sla_data_and_masks_come_from_one_fetch(config, monkeypatch, tmp_path):
+    config['aggregate_store'] = {'enabled': True, 'path': str(tmp_path / 'aggregates.sqlite3')}
+    monkeypatch.setattr(database, '_store', None)
+    registry = [
+        {'meter_number': 'A', 'type': '4G', 'expected_load': 96, 'group': None},
+        {'meter_number': 'B', 'type': 'BLE', 'expected_load': 96, 'group': None},
+    ]
+    fetches = []
+
+    def fetch_sla_counts(target_dates, meter_numbers):
+        fetches.append(list(target_dates))
+        counts = database.counts_frame([('A', d, 96, 96, 1, 1) for d in target_dates])
+        # A received slots 0-47 without reconciliation and all 96 with it
+        counts['mask_without_recon_low'] = (1 << 48) - 1
+        counts['mask_without_recon_high'] = 0
+        counts['mask_with_recon_low'] = counts['mask_with_recon_high'] = (1 << 48) - 1
+        return counts, []
+
+    monkeypatch.setattr(database, 'get_meters', lambda: registry)
+    monkeypatch.setattr(database, 'fetch_sla_counts', fetch_sla_counts)
+    dates = ['2025-01-01', '2025-01-02']
+    for _ in range(2):
+        frames, masks, unavailable = database.get_sla_data_and_masks(dates)
+        assert unavailable == []
+        assert frames['2025-01-02']['Load Received With Reconcillation'].tolist() == [96, 0]
+        assert masks.received(with_recon=True).sum(axis=-1).tolist() == [[96, 0], [96, 0]]
+        assert masks.received(with_recon=False).sum(axis=-1).tolist() == [[48, 0], [48, 0]]
+    # Closed days are stored with their masks, so the second call reads the store
+    assert fetches == [dates]
+
+def test_busy_pool_is_not_reported_as_database_down(config, monkeypatch):
+    config['db_connection']['pool_size'] = 1
+    config['db_connection']['pool_timeout'] = 5
+    monkeypatch.setattr(database, 'get_db_connection', lambda source=None: FakeConnection())
+    pool = database.get_pool()
+    held = pool.acquire()
+    try:
+        started = time.monotonic()
+        assert database.test_db_connection()
+        assert time.monotonic() - started < 1
+    finally:
+        pool.release(held)
+
+    breaker = database.CircuitBreaker(probe=lambda: None, failure_threshold=1, health_ttl=0)
+    def exhausted():
+        raise database.PoolExhaustedError("No database connection free after 10s (pool size 1)")
+    for _ in range(3):
+        assert not breaker.check_health(exhausted)
+    assert breaker.status()['state'] == 'closed' and breaker.failures == 0
+
+def two_sources(config, monkeypatch):
+    """Configure HES sources north and south, with every south query failing to connect"""
+    config['hes_sources'] = {'north': {'schema': 'hes_north'}, 'south': {'schema': 'hes_south'}}
+    config['query_execution'] = {'min_free_connections': 0}
+
+    def execute_query(query, params=None, timeout=None, raise_errors=True, name='query', source=None):
+        if source == 'south':
+            raise database.DatabaseConnectionError("Connection to south failed: refused")
+        if 'meter_registry' in query:
+            return [('N1', 'BLE', 96, None)]
+        if 'amr_load_data' in query:
+            return [('N1', '2025-01-01', 90, 96, 0, 0, 0, 0)]
+        return [('N1', '2025-01-01', 1, 1)]
+
+    monkeypatch.setattr(database, 'execute_query', execute_query)
+
+def test_unavailable_source_leaves_out_only_its_meters(config, monkeypatch, messages):
+    two_sources(config, monkeypatch)
+    registry = [
+        {'meter_number': 'N1', 'type': 'BLE', 'expected_load': 96, 'group': None, 'source': 'north'},
+        {'meter_number': 'S1', 'type': 'BLE', 'expected_load': 96, 'group': None, 'source': 'south'},
+    ]
+    monkeypatch.setattr(database, 'get_meters', lambda: registry)
+
+    counts, unavailable = database.fetch_sla_counts(['2025-01-01'], ['N1', 'S1'])
+    assert unavailable == ['south']
+    assert counts['meter_number'].tolist() == ['N1']
+    assert any('south' in message for level, message in messages if level == 'error')
+
+    frames, masks, unavailable = database.get_sla_data_and_masks(['2025-01-01'])
+    assert unavailable == ['south']
+    assert frames['2025-01-01']['Meter Number'].tolist() == ['N1'] and masks.meter_numbers == ['N1']
+    with pytest.raises(database.DataAccessError, match='south'):
+        database.get_all_dates_data(['2025-01-01'])
+
+def test_no_source_answering_raises(config, monkeypatch):
+    two_sources(config, monkeypatch)
+    monkeypatch.setattr(database, 'get_meters', lambda: [
+        {'meter_number': 'S1', 'type': 'BLE', 'expected_load': 96, 'group': None, 'source': 'south'},
+    ])
+    with pytest.raises(database.DatabaseConnectionError):
+        database.fetch_sla_counts(['2025-01-01'], ['S1'])
+
+def test_registry_keeps_previous_meters_of_unavailable_source(config, monkeypatch):
+    two_sources(config, monkeypatch)
+    previous = [{'meter_number': 'S1', 'type': '4G', 'expected_load': 96, 'group': None, 'source': 'south'}]
+    loaded = database.load_meters(database.get_registry_settings() | {'source': 'table'}, previous)
+    assert [(m['meter_number'], m['source']) for m in loaded] == [('N1', 'north'), ('S1', 'south')]
+
+def test_health_is_reported_per_source(config, monkeypatch):
+    config['hes_sources'] = {'north': {'schema': 'hes_north'}, 'south': {'schema': 'hes_south'}}
+    monkeypatch.setattr(database, 'test_db_connection', lambda source=None: source == 'north')
+    health = database.get_db_health()
+    assert health['healthy'] and health['unavailable'] == ['south']
+    assert health['sources']['north']['healthy'] and not health['sources']['south']['healthy']
+
+def test_meter_added_to_registry_is_fetched_for_stored_days(config, monkeypatch, tmp_path):
+    config['aggregate_store'] = {'enabled': True, 'path': str(tmp_path / 'aggregates.sqlite3')}
+    monkeypatch.setattr(database, '_store', None)
+    fetches = []
+
+    def fetch_sla_counts(target_dates, meter_numbers):
+        fetches.append((list(target_dates), list(meter_numbers)))
+        counts = database.counts_frame([(m, d, 90, 96, 1, 1) for d in target_dates for m in meter_numbers])
+        for column in slots.MASK_COLUMNS:
+            counts[column] = 0
+        return counts, []
+
+    monkeypatch.setattr(database, 'fetch_sla_counts', fetch_sla_counts)
+    dates = ['2025-01-01', '2025-01-02']
+    counts, _ = database.get_sla_counts(dates, ['A'])
+    counts, _ = database.get_sla_counts(dates, ['A', 'B'])
+    counts, _ = database.get_sla_counts(dates, ['A', 'B'])
+    # B was only fetched once, for the days stored before it joined; A never again
+    assert fetches == [(dates, ['A']), (dates, ['B'])]
+    assert sorted(zip(counts['date'], counts['meter_number'], counts['load_with_recon'])) == [
+        ('2025-01-01', 'A', 96), ('2025-01-01', 'B', 96), ('2025-01-02', 'A', 96), ('2025-01-02', 'B', 96)
+    ]
+    monkeypatch.setattr(database, 'get_meters', lambda: [
+        {'meter_number': m, 'type': 'BLE', 'expected_load': 96, 'group': None} for m in 'AB'
+    ])
+    assert database.rollup_closed_days(dates) == []
+    assert len(fetches) == 2
+
+def test_store_written_before_meter_sets_covers_no_meters(tmp_path):
+    path = str(tmp_path / 'aggregates.sqlite3')
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE stored_days (kind TEXT NOT NULL, date TEXT NOT NULL, stored_at TEXT NOT NULL, PRIMARY KEY (kind, date))")
+        conn.execute("INSERT INTO stored_days VALUES ('sla', '2025-01-01', '2025-01-02T00:00:00')")
+    store = aggregate_store.AggregateStore(path)
+    assert store.stored_meters('sla', ['2025-01-01']) == {'2025-01-01': frozenset()}
+    assert database.missing_fetches(['2025-01-01'], ['A'], store.stored_meters('sla', ['2025-01-01'])) == [(['2025-01-01'], ['A'])]
+
+def test_stored_slot_masks_cover_meters_stored_on_every_day(config, monkeypatch, tmp_path):
+    config['aggregate_store'] = {'enabled': True, 'path': str(tmp_path / 'aggregates.sqlite3')}
+    monkeypatch.setattr(database, '_store', None)
+    monkeypatch.setattr(database, 'get_meters', lambda: [
+        {'meter_number': m, 'type': 'BLE', 'expected_load': 96, 'group': None} for m in 'AB'
+    ])
+    counts = database.counts_frame([(m, d, 90, 96, 1, 1) for d in ('2025-01-01', '2025-01-02') for m in 'AB'])
+    for column in slots.MASK_COLUMNS:
+        counts[column] = 1 if column.endswith('_low') else 0
+    store = database.get_aggregate_store()
+    store.put_sla_counts(['2025-01-01'], counts, ['A', 'B'])
+    store.put_sla_counts(['2025-01-02'], counts, ['A'])
+
+    masks = database.get_stored_slot_masks('2024-12-31', '2025-01-03')
+    assert masks.dates == ['2025-01-01', '2025-01-02']
+    assert masks.meter_numbers == ['A']
+    assert masks.received()[:, 0, 0].all() and masks.received()[:, 0, 1:].sum() == 0
+    assert database.get_stored_slot_masks('2025-02-01', '2025-02-02') is None
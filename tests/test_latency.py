@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import latency
+
+def counts(**buckets):
+    """One histogram row with the given {bucket index: rows}"""
+    row = np.zeros(latency.BUCKET_COUNT)
+    for index, value in buckets.items():
+        row[int(index[1:])] = value
+    return row
+
+def test_bucket_quantiles_interpolate_within_bucket():
+    matrix = np.vstack([counts(b0=10), counts(b1=10)])
+    result = latency.bucket_quantiles(matrix, quantiles=(0.5,))
+    # Half way through [0, 15) and [15, 30)
+    assert result[:, 0].tolist() == pytest.approx([7.5, 22.5])
+
+def test_bucket_quantiles_cross_buckets():
+    # 50 rows under 15 minutes, 50 between 15 and 30: p95 lands 90% into the second bucket
+    result = latency.bucket_quantiles(np.vstack([counts(b0=50, b1=50)]), quantiles=(0.5, 0.95))
+    assert result[0].tolist() == pytest.approx([15.0, 28.5])
+
+def test_bucket_quantiles_open_last_bucket_and_empty_rows():
+    matrix = np.vstack([counts(**{f'b{latency.BUCKET_COUNT - 1}': 3}), counts()])
+    result = latency.bucket_quantiles(matrix, quantiles=(0.99,))
+    assert result[0, 0] == latency.BUCKET_BOUNDS[-1]
+    assert np.isnan(result[1, 0])
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import database
+
+CUTOFF_MINUTES = 24 * 60 + 4 * 60 + 10
+
+def test_coalesce_date_ranges_merges_consecutive_days():
+    ranges = database.coalesce_date_ranges(['2025-01-03', '2025-01-01', '2025-01-02', '2025-01-02'])
+    assert ranges == [(datetime(2025, 1, 1), datetime(2025, 1, 4))]
+
+def test_coalesce_date_ranges_splits_gaps_and_crosses_months():
+    ranges = database.coalesce_date_ranges(['2025-02-01', '2025-01-31', '2025-02-03'])
+    assert ranges == [
+        (datetime(2025, 1, 31), datetime(2025, 2, 2)),
+        (datetime(2025, 2, 3), datetime(2025, 2, 4)),
+    ]
+
+def test_coalesce_date_ranges_empty():
+    assert database.coalesce_date_ranges([]) == []
+
+def test_build_range_clause_binds_half_open_bounds():
+    sql, params = database.build_range_clause('DATETIME_SLOT', ['2025-01-05', '2025-01-01', '2025-01-02'])
+    assert sql == (
+        "((DATETIME_SLOT >= %s AND DATETIME_SLOT < %s) OR (DATETIME_SLOT >= %s AND DATETIME_SLOT < %s))"
+    )
+    assert params == [
+        datetime(2025, 1, 1), datetime(2025, 1, 3),
+        datetime(2025, 1, 5), datetime(2025, 1, 6),
+    ]
+    # The column is compared bare, never wrapped in DATE()
+    assert 'DATE(' not in sql
+
+def test_build_cutoff_clause():
+    sql, params = database.build_cutoff_clause('D6_SNAP_DATETIME')
+    assert sql == "server_time < TIMESTAMPADD(MINUTE, %s, DATE(D6_SNAP_DATETIME))"
+    assert params == [CUTOFF_MINUTES]
+
+def placeholder_contexts(query, params):
+    """(SQL text just before each %s, bound value) in placeholder order"""
+    pieces = query.split('%s')
+    assert len(pieces) - 1 == len(params)
+    return list(zip(pieces[:-1], params))
+
+@pytest.mark.parametrize('slot_masks', [False, True])
+def test_sla_count_query_binds_cutoff_before_where(slot_masks):
+    meters = ['AS1', 'AS2']
+    dates = ['2025-01-01', '2025-01-02']
+    query, params = database.build_sla_count_query(
+        'sense_hes_demo.amr_load_data', 'DATETIME_SLOT', meters, dates, slot_masks=slot_masks
+    )
+    contexts = placeholder_contexts(query, params)
+    cutoffs = [value for text, value in contexts if text.endswith('TIMESTAMPADD(MINUTE, ')]
+    # One cutoff for without_recon_count, plus one per without-recon mask half
+    assert cutoffs == [CUTOFF_MINUTES] * (3 if slot_masks else 1)
+    # Every cutoff sits in the SELECT list, ahead of the WHERE parameters
+    assert [value for _, value in contexts[:len(cutoffs)]] == cutoffs
+    assert params[len(cutoffs):] == meters + [datetime(2025, 1, 1), datetime(2025, 1, 3)]
+
+def sqlite_standin():
+    """In-memory amr_load_data with the (meter_number, DATETIME_SLOT) index synthetic.py creates"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute(
+        "CREATE TABLE amr_load_data (id INTEGER PRIMARY KEY, meter_number TEXT, "
+        "DATETIME_SLOT TEXT, command_code TEXT, server_time TEXT)"
+    )
+    conn.execute("CREATE INDEX meter_slot ON amr_load_data (meter_number, DATETIME_SLOT)")
+    return conn
+
+def sqlite_plan(conn, where_sql, params):
+    query = f"SELECT meter_number, COUNT(*) FROM amr_load_data WHERE {where_sql} GROUP BY meter_number"
+    rows = conn.execute('EXPLAIN QUERY PLAN ' + query.replace('%s', '?'), [str(p) for p in params]).fetchall()
+    return ' | '.join(row[-1] for row in rows)
+
+def test_range_clause_uses_index_range_in_sqlite_standin():
+    conn = sqlite_standin()
+    where_sql, params = database.build_where(
+        database.build_in_clause('meter_number', ['AS1', 'AS2']),
+        database.build_range_clause('DATETIME_SLOT', ['2025-01-01', '2025-01-02', '2025-01-03'])
+    )
+    plan = sqlite_plan(conn, where_sql, params)
+    assert 'SCAN' not in plan
+    assert 'DATETIME_SLOT>? AND DATETIME_SLOT<?' in plan
+
+    # The former DATE(column) IN (...) filter can only use the meter prefix of the index
+    legacy = sqlite_plan(
+        conn, "meter_number IN (%s, %s) AND date(DATETIME_SLOT) IN (%s, %s, %s)",
+        ['AS1', 'AS2', '2025-01-01', '2025-01-02', '2025-01-03']
+    )
+    assert 'DATETIME_SLOT>' not in legacy
+
+@pytest.mark.skipif(
+    not os.environ.get('SLA_TEST_SECRETS'),
+    reason="set SLA_TEST_SECRETS to a secrets.toml for a MySQL stand-in (see synthetic.py)"
+)
+def test_sla_count_queries_use_range_access_in_mysql():
+    import synthetic
+
+    database.configure(database.load_config_file(os.environ['SLA_TEST_SECRETS']))
+    source = database.get_hes_source()
+    conn = database.get_db_connection()
+    try:
+        synthetic.create_tables(conn, source['schema'])
+        cursor = conn.cursor(dictionary=True)
+        # Disjoint dates become an OR of ranges, which MySQL still reads as index ranges
+        dates = ['2025-01-01', '2025-01-02', '2025-01-05']
+        for table, column in (('amr_load_data', 'DATETIME_SLOT'), ('amr_midnight_data', 'D6_SNAP_DATETIME')):
+            query, params = database.build_sla_count_query(
+                database.source_table(source, table), column, ['SM0000001', 'SM0000002'], dates,
+                slot_masks=table == 'amr_load_data'
+            )
+            cursor.execute('EXPLAIN ' + query.strip(), params)
+            plan = cursor.fetchall()
+            assert [row['type'] for row in plan] == ['range'], plan
+        cursor.close()
+    finally:
+        conn.close()
+        database.configure()
@@ -0,0 +1,42 @@
+import threading
+import time
+
+import database
+import report
+
+class ListSink:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+def test_report_concurrency_stays_within_the_pool(config, monkeypatch):
+    config['db_connection']['pool_size'] = 2
+    config['query_execution'] = {'max_workers': 4, 'min_free_connections': 0}
+    registry = [{'meter_number': f'M{i}', 'type': 'BLE', 'expected_load': 96, 'group': None} for i in range(3)]
+    lock = threading.Lock()
+    active = {'now': 0, 'peak': 0}
+
+    def query(name):
+        with lock:
+            active['now'] += 1
+            active['peak'] = max(active['peak'], active['now'])
+        time.sleep(0.02)
+        with lock:
+            active['now'] -= 1
+
+    def fetch_sla_counts(target_dates, meter_numbers):
+        # Stands in for the per-source, per-batch fan-out of the real fetch
+        database.run_tasks({name: (query, (name,)) for name in 'abc'}, raise_errors=True)
+        return database.counts_frame(), []
+
+    monkeypatch.setattr(database, 'get_meters', lambda: registry)
+    monkeypatch.setattr(database, 'fetch_sla_counts', fetch_sla_counts)
+    dates = [f'2025-01-{day:02d}' for day in range(1, 13)]
+    sink = ListSink()
+    rows = report.write_report(dates, sink, chunk_days=2, workers=8)
+
+    assert rows == len(dates) * len(registry)
+    assert [frame['Date'].iloc[0] for frame in sink.frames] == dates[::2]
+    assert active['peak'] <= 2
@@ -0,0 +1,56 @@
+import numpy as np
+
+import slots
+
+def test_pack_halves_maps_bits_to_slots():
+    low = (1 << 0) | (1 << 47)
+    high = (1 << 0) | (1 << 47)
+    packed = slots.pack_halves([low], [high])
+    assert packed.shape == (1, 12)
+    received = slots.unpack(packed)[0]
+    assert np.flatnonzero(received).tolist() == [0, 47, 48, 95]
+
+def test_pack_halves_matches_naive_bit_test():
+    rng = np.random.default_rng(0)
+    low = rng.integers(0, 1 << 48, size=50, dtype=np.int64)
+    high = rng.integers(0, 1 << 48, size=50, dtype=np.int64)
+    received = slots.unpack(slots.pack_halves(low, high))
+    expected = np.array([
+        [(int(l) >> i) & 1 for i in range(48)] + [(int(h) >> i) & 1 for i in range(48)]
+        for l, h in zip(low, high)
+    ], dtype=bool)
+    np.testing.assert_array_equal(received, expected)
+
+def test_longest_run_along_last_axis():
+    missing = np.array([
+        [False, True, True, False, True],
+        [True, True, True, True, True],
+        [False, False, False, False, False],
+        [True, False, True, True, True],
+    ])
+    assert slots.longest_run(missing).tolist() == [2, 5, 0, 3]
+
+def test_longest_run_vectorizes_over_leading_axes():
+    missing = np.zeros((2, 3, slots.SLOTS_PER_DAY), dtype=bool)
+    missing[1, 2, 10:30] = True
+    missing[0, 0, -4:] = True
+    runs = slots.longest_run(missing)
+    assert runs.shape == (2, 3)
+    assert runs[1, 2] == 20 and runs[0, 0] == 4 and runs.sum() == 24
+
+def masks():
+    # Two days x two meters: slot 0 only arrives through reconciliation, for meter A on day 2
+    without_recon = slots.pack_halves([0, 0, 0, 0], [0, 0, 0, 0]).reshape(2, 2, 12)
+    with_recon = slots.pack_halves([0, 0, 1, 0], [0, 0, 0, 0]).reshape(2, 2, 12)
+    return slots.SlotMasks(['d1', 'd2'], ['A', 'B'], without_recon, with_recon)
+
+def test_select_dates_keeps_the_days_masks():
+    selected = masks().select_dates(['d2'])
+    assert selected.dates == ['d2']
+    assert selected.received()[0, 0, 0] and not selected.received(with_recon=False).any()
+
+def test_recovered_slots_in_heatmap_and_summary():
+    heatmap = masks().recovered_heatmap()
+    assert heatmap.loc['d2', '00:00'] == 0.5 and heatmap.to_numpy().sum() == 0.5
+    summary = masks().meter_summary().set_index('Meter Number')
+    assert summary['Recovered By Reconciliation'].to_dict() == {'A': 1, 'B': 0}
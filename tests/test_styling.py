@@ -0,0 +1,24 @@
+import pandas as pd
+
+import styling
+
+def frame():
+    return pd.DataFrame({
+        'Meter Number': ['A', 'B', 'C'],
+        'Expected Load': [48, 96, 96],
+        'Load Received Without Reconcillation': [48, 48, 96],
+        'Received Load Percentage': [100.0, 50.0, 100.0],
+    })
+
+def test_load_is_checked_against_each_rows_expected_load(config):
+    mask = styling.sla_warning_mask(frame())
+    # 48 of 48 expected meets the SLA; 48 of 96 does not
+    assert mask['Load Received Without Reconcillation'].tolist() == [False, True, False]
+    assert mask['Received Load Percentage'].tolist() == [False, True, False]
+    assert not mask['Expected Load'].any()
+
+def test_thresholds_come_from_config(config):
+    config['sla_thresholds'] = {'load': 0.5, 'percentage': 40}
+    mask = styling.sla_warning_mask(frame())
+    assert not mask.any().any()
+    assert styling.get_thresholds()['midnight'] == styling.SLA_THRESHOLDS['midnight']
@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import database
+import warmer
+
+def snapshot(size):
+    return {'data': np.zeros(size, dtype=np.uint8)}
+
+def test_memory_sink_evicts_least_recently_used():
+    sink = warmer.MemorySink(max_entries=2)
+    sink.put('a', snapshot(10))
+    sink.put('b', snapshot(10))
+    assert sink.get('a') is not None   # 'b' is now the least recently used
+    sink.put('c', snapshot(10))
+    assert sink.get('b') is None
+    assert sink.get('a') is not None and sink.get('c') is not None
+    assert sink.evictions == 1
+
+def test_memory_sink_byte_budget_keeps_newest():
+    sink = warmer.MemorySink(max_entries=10, max_bytes=25_000)
+    sink.put('a', snapshot(10_000))
+    sink.put('b', snapshot(10_000))
+    sink.put('c', snapshot(10_000))
+    assert sink.get('a') is None
+    assert sink.footprint()['entries'] == 2
+    assert sink.footprint()['bytes'] <= 25_000
+    # A snapshot larger than the whole budget still replaces the others
+    sink.put('huge', snapshot(100_000))
+    assert sink.footprint()['entries'] == 1 and sink.get('huge') is not None
+
+def test_external_worker_mode_only_reads_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(warmer, '_warmer', None)
+    monkeypatch.setattr(warmer, 'fetch_dashboard_data', lambda target_dates: pytest.fail("app fetched data"))
+    reader = warmer.get_warmer(snapshot_dir=str(tmp_path), external=True)
+    assert not any(thread.name == 'sla-cache-warmer' for thread in threading.enumerate())
+
+    # The worker publishes through its own sink; the app sees the new file
+    worker_sink = warmer.DirectorySink(str(tmp_path))
+    worker_sink.put(('d1',), snapshot(10))
+    assert reader.get_snapshot(['d1']) is not None
+
+    # A manual refresh is left for the worker, once, until it clears it
+    assert reader.request_refresh(['d1']) == 'started'
+    assert reader.request_refresh(['d1']) == 'pending'
+    assert reader.is_refreshing(['d1'])
+    assert worker_sink.requests() == [('d1',)]
+    worker_sink.clear_request(('d1',))
+    assert not reader.is_refreshing(['d1'])
+    assert reader.request_refresh(['d1'], min_interval=60) == 'rate_limited'
+
+def test_external_worker_mode_needs_snapshot_dir(monkeypatch):
+    monkeypatch.setattr(warmer, '_warmer', None)
+    with pytest.raises(database.ConfigurationError):
+        warmer.get_warmer(external=True)
+
+def test_failed_sections_are_published_as_errors(config, messages, monkeypatch):
+    monkeypatch.setattr(database, 'get_sla_data_and_masks', lambda target_dates: ({'d1': pd.DataFrame()}, None, []))
+    monkeypatch.setattr(database, 'get_latency_histograms', lambda target_dates: ({}, []))
+
+    def fail(target_dates):
+        raise database.QueryError("alarm table locked", 'alarm counts')
+    monkeypatch.setattr(database, 'get_alarm_counts', fail)
+
+    data = warmer.fetch_dashboard_data(['d1'])
+    assert data['errors'] == {'alarm_counts': "alarm table locked"}
+    assert data['alarm_counts'] == {}
+    assert ('error', "Error in alarm counts: alarm table locked") in messages
@@ -55,3 +55,12 @@ def get_tab_dates_with_names():
 def get_current_year():
     """Get current year as string using IST timezone"""
     return get_ist_now().strftime('%Y')
+
+def is_day_closed(date_str, now=None):
+    """
+    True once the next day's 04:10 IST server_time cutoff has passed for date_str
+    After that a day's on-time counts can no longer change
+    """
+    now = now or get_ist_now().replace(tzinfo=None)
+    day = datetime.strptime(date_str, '%Y-%m-%d')
+    return now >= day + timedelta(days=1, hours=4, minutes=10)
@@ -0,0 +1,428 @@
+"""
+Background precomputation of dashboard data
+
+Inside the app the warmer runs as a daemon thread. It can also run as its own
+worker process that publishes snapshots to a directory the app reads from
+([cache_warmer] snapshot_dir). With [cache_warmer] worker = "external" the app
+starts no warmer thread and only reads that directory, so the Streamlit
+processes only render; their manual refreshes are left there for the worker:
+
+Run with:  python warmer.py --snapshot-dir .sla_cache/snapshots
+"""
+import argparse
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+import compact
+import database
+import styling
+import utils
+
+# Queries per (source, meter batch) behind one dashboard load: load counts,
+# midnight counts, alarm counts and latency histograms
+DASHBOARD_QUERIES_PER_BATCH = 4
+
+# How often the worker process looks for refresh requests left by the app
+REQUEST_POLL_SECONDS = 2
+
+def capture(name, fetch, target_dates):
+    """fetch(target_dates) as (result, None), or (None, message) once the failure is reported"""
+    try:
+        return fetch(target_dates), None
+    except database.DataAccessError as e:
+        database.notify('error', f"Error in {name}: {str(e)}")
+        return None, str(e)
+
+def fetch_dashboard_data(target_dates):
+    """
+    Fetch everything the dashboard shows for target_dates: SLA frames, load slot
+    masks (from the same query), alarm counts, latency histograms and summary
+    Failed alarm counts or latency histograms are published empty with their
+    message under 'errors' ({'alarm_counts': ..., 'latency': ...}), so the page can
+    tell them from a day without alarms. An HES source that did not answer has its
+    meters left out and is listed under 'unavailable_sources'. Raises
+    DataAccessError if the SLA data could not be loaded.
+    """
+    # SLA, alarm-count and latency fetches run side by side and fan out again per
+    # meter batch; the nested fan-outs share this one deadline, sized for all of
+    # their queries, with a little headroom for the store and frame building
+    timeout = database.fetch_timeout(DASHBOARD_QUERIES_PER_BATCH) + 5
+    sections = {
+        'sla_data': ('SLA data', database.get_sla_data_and_masks),
+        'alarm_counts': ('alarm counts', database.get_alarm_counts),
+        'latency': ('latency', database.get_latency_histograms),
+    }
+    results = database.run_tasks({
+        name: (capture, (name, fetch, target_dates)) for name, fetch in sections.values()
+    }, timeout=timeout)
+    # A section still running at the deadline has already been reported by run_tasks
+    outcomes = {
+        key: results[name] or (None, f"{name} did not finish within {timeout:.0f}s")
+        for key, (name, _) in sections.items()
+    }
+    errors = {key: error for key, (_, error) in outcomes.items() if error is not None}
+    if 'sla_data' in errors:
+        raise database.DataAccessError(f"SLA data could not be loaded: {errors['sla_data']}")
+    sla_data, slot_masks, unavailable = outcomes['sla_data'][0]
+    alarm_counts, alarm_unavailable = outcomes['alarm_counts'][0] or ({}, [])
+    latency_histograms, latency_unavailable = outcomes['latency'][0] or ({}, [])
+    # Cached payloads use categorical string columns and small integer dtypes
+    return compact.compact_payload({
+        'sla_data': sla_data,
+        'slot_masks': slot_masks,
+        'alarm_counts': alarm_counts,
+        'latency': latency_histograms,
+        'unavailable_sources': sorted(set(unavailable) | set(alarm_unavailable) | set(latency_unavailable)),
+        'errors': errors,
+        'summary': styling.compute_fleet_summary(sla_data)
+    })
+
+class MemorySink:
+    """
+    Snapshots kept in this process, least recently used evicted first
+    Evicts beyond max_entries snapshots or max_bytes of measured footprint
+    (None for no byte budget); the newest snapshot is always kept.
+    """
+
+    def __init__(self, max_entries=4, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._snapshots = OrderedDict()  # key -> (snapshot, bytes)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def put(self, key, snapshot):
+        size = compact.footprint(snapshot)
+        with self._lock:
+            self._snapshots[key] = (snapshot, size)
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > 1 and (
+                len(self._snapshots) > self.max_entries
+                or (self.max_bytes is not None and self._total_bytes() > self.max_bytes)
+            ):
+                self._snapshots.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._snapshots.get(key)
+            if entry is None:
+                return None
+            self._snapshots.move_to_end(key)
+            return entry[0]
+
+    def _total_bytes(self):
+        return sum(size for _, size in self._snapshots.values())
+
+    def footprint(self):
+        """{'entries', 'bytes', 'max_bytes', 'evictions'} for monitoring"""
+        with self._lock:
+            return {
+                'entries': len(self._snapshots),
+                'bytes': self._total_bytes(),
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+            }
+
+class DirectorySink:
+    """
+    Snapshots pickled into a directory shared between processes
+    Files are replaced atomically, so readers never see a partial snapshot, and
+    each process unpickles a file again only when it changes.
+    """
+
+    def __init__(self, path, max_entries=4):
+        self.path = path
+        self.max_entries = max_entries
+        self._loaded = OrderedDict()  # key -> (mtime, snapshot), most recently read last
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key, suffix='.pickle'):
+        return os.path.join(self.path, hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + suffix)
+
+    def _write(self, path, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def put(self, key, snapshot):
+        self._write(self._file(key), snapshot)
+        files = sorted(
+            (os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith('.pickle')),
+            key=os.path.getmtime
+        )
+        for stale in files[:-self.max_entries]:
+            os.remove(stale)
+
+    def get(self, key):
+        path = self._file(key)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._loaded.get(key)
+            if cached and cached[0] == mtime:
+                self._loaded.move_to_end(key)
+                return cached[1]
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+        with self._lock:
+            self._loaded[key] = (mtime, snapshot)
+            self._loaded.move_to_end(key)
+            while len(self._loaded) > self.max_entries:
+                self._loaded.popitem(last=False)
+        return snapshot
+
+    def footprint(self):
+        """{'entries', 'bytes', 'disk_bytes'}: snapshots unpickled in this process and on disk"""
+        with self._lock:
+            loaded = [snapshot for _, snapshot in self._loaded.values()]
+        disk_bytes = sum(
+            os.path.getsize(os.path.join(self.path, name))
+            for name in os.listdir(self.path) if name.endswith('.pickle')
+        )
+        return {'entries': len(loaded), 'bytes': compact.footprint(loaded), 'disk_bytes': disk_bytes}
+
+    def request_refresh(self, key):
+        """Leave a refresh request for the worker process; False if one is already waiting"""
+        path = self._file(key, '.refresh')
+        if os.path.exists(path):
+            return False
+        self._write(path, key)
+        return True
+
+    def is_requested(self, key):
+        """True from request_refresh until the worker clears the request"""
+        return os.path.exists(self._file(key, '.refresh'))
+
+    def requests(self):
+        """Keys with a waiting refresh request, oldest first"""
+        paths = sorted(
+            (os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith('.refresh')),
+            key=os.path.getmtime
+        )
+        keys = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                keys.append(pickle.load(f))
+        return keys
+
+    def clear_request(self, key):
+        try:
+            os.remove(self._file(key, '.refresh'))
+        except FileNotFoundError:
+            pass
+
+class CacheWarmer:
+    """
+    Background thread that precomputes dashboard data for the current tab dates
+    It runs every interval seconds and again just after the daily 04:10 IST
+    server_time cutoff, keeping the latest snapshot per date list in memory.
+    Manual refreshes are queued with request_refresh: they are deduplicated and
+    rate-limited process-wide, and readers keep getting the previous snapshot
+    until the new one is published. Snapshots go to sink (in memory by default).
+    """
+
+    def __init__(self, fetch, interval=240, cutoff_grace=60, max_snapshots=4, sink=None, max_bytes=None):
+        self._fetch = fetch
+        self.interval = interval
+        self.cutoff_grace = cutoff_grace
+        self.sink = sink or MemorySink(max_snapshots, max_bytes)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pending = {}
+        self._running = None
+        self._last_manual_refresh = float('-inf')
+        self.last_run = None
+
+    def start(self):
+        """Start the background thread once"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sla-cache-warmer", daemon=True)
+                self._thread.start()
+
+    def request_refresh(self, target_dates, min_interval=0):
+        """
+        Queue one background refetch of target_dates
+        Returns 'started', 'pending' if that refetch is already queued or running,
+        or 'rate_limited' if any manual refresh ran less than min_interval seconds ago.
+        """
+        key = tuple(target_dates)
+        with self._lock:
+            if key in self._pending or self._running == key:
+                return 'pending'
+            now = time.monotonic()
+            if now - self._last_manual_refresh < min_interval:
+                return 'rate_limited'
+            self._last_manual_refresh = now
+            self._pending[key] = True
+        self._wake.set()
+        return 'started'
+
+    def seconds_until_refresh_allowed(self, min_interval):
+        with self._lock:
+            return max(0.0, min_interval - (time.monotonic() - self._last_manual_refresh))
+
+    def is_refreshing(self, target_dates):
+        """True while a refetch of target_dates is queued or running"""
+        key = tuple(target_dates)
+        with self._lock:
+            return key in self._pending or self._running == key
+
+    def get_snapshot(self, target_dates):
+        """Latest precomputed {'data', 'finished_at', 'duration'} for target_dates, or None"""
+        return self.sink.get(tuple(target_dates))
+
+    def seconds_until_next_run(self, now=None):
+        """Sleep time until the next interval tick or the next post-cutoff run, whichever is sooner"""
+        now = now or utils.get_ist_now().replace(tzinfo=None)
+        cutoff = now.replace(hour=4, minute=10, second=0, microsecond=0) + timedelta(seconds=self.cutoff_grace)
+        if cutoff <= now:
+            cutoff += timedelta(days=1)
+        return min(self.interval, (cutoff - now).total_seconds())
+
+    def run_once(self, target_dates=None):
+        """Fetch and publish one snapshot; failures are recorded in last_run"""
+        target_dates = list(target_dates or utils.get_tab_dates())
+        with self._lock:
+            self._running = tuple(target_dates)
+        started = time.perf_counter()
+        started_at = utils.get_ist_now()
+        error = None
+        try:
+            data = self._fetch(target_dates)
+            snapshot = {
+                'data': data,
+                'finished_at': utils.get_ist_now(),
+                'duration': time.perf_counter() - started,
+            }
+            self.sink.put(tuple(target_dates), snapshot)
+        except Exception as e:
+            error = str(e)
+        finally:
+            with self._lock:
+                self._running = None
+        self.last_run = {
+            'started_at': started_at,
+            'duration': time.perf_counter() - started,
+            'error': error,
+        }
+
+    def _take_pending(self):
+        with self._lock:
+            pending, self._pending = list(self._pending), {}
+        return pending
+
+    def _run(self):
+        self.run_once()
+        while True:
+            self._wake.wait(self.seconds_until_next_run())
+            self._wake.clear()
+            pending = self._take_pending()
+            if pending:
+                for key in pending:
+                    self.run_once(list(key))
+            else:
+                self.run_once()
+
+class SnapshotReader:
+    """
+    Read-only counterpart of CacheWarmer for apps served by a worker process
+    It starts no thread and fetches nothing: snapshots are read from the
+    DirectorySink and manual refreshes are left there as requests for the worker.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._last_manual_refresh = float('-inf')
+        self.last_run = None  # runs are logged by the worker
+
+    def request_refresh(self, target_dates, min_interval=0):
+        """Same contract as CacheWarmer.request_refresh"""
+        key = tuple(target_dates)
+        if self.sink.is_requested(key):
+            return 'pending'
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_manual_refresh < min_interval:
+                return 'rate_limited'
+            self._last_manual_refresh = now
+        return 'started' if self.sink.request_refresh(key) else 'pending'
+
+    def seconds_until_refresh_allowed(self, min_interval):
+        with self._lock:
+            return max(0.0, min_interval - (time.monotonic() - self._last_manual_refresh))
+
+    def is_refreshing(self, target_dates):
+        """True while a refresh request for target_dates waits for the worker"""
+        return self.sink.is_requested(tuple(target_dates))
+
+    def get_snapshot(self, target_dates):
+        return self.sink.get(tuple(target_dates))
+
+_warmer = None
+_warmer_lock = threading.Lock()
+
+def get_warmer(interval=240, snapshot_dir=None, max_bytes=None, external=False):
+    """
+    Return the process-wide warmer, starting it on first use
+    snapshot_dir selects a DirectorySink; otherwise snapshots stay in memory
+    within max_bytes (None for no budget). external returns a SnapshotReader
+    of snapshot_dir instead, for apps whose snapshots come from a worker process.
+    """
+    global _warmer
+    if external and not snapshot_dir:
+        raise database.ConfigurationError('[cache_warmer] worker = "external" needs a snapshot_dir')
+    with _warmer_lock:
+        if _warmer is None:
+            if external:
+                _warmer = SnapshotReader(DirectorySink(snapshot_dir))
+            else:
+                sink = DirectorySink(snapshot_dir) if snapshot_dir else None
+                _warmer = CacheWarmer(fetch_dashboard_data, interval=interval, sink=sink, max_bytes=max_bytes)
+                _warmer.start()
+    return _warmer
+
+def publish(worker, target_dates=None):
+    """One worker run, logged"""
+    worker.run_once(target_dates)
+    if worker.last_run['error']:
+        logging.error("Refresh failed: %s", worker.last_run['error'])
+    else:
+        logging.info("Published snapshot in %.1fs", worker.last_run['duration'])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--snapshot-dir', required=True, help="directory shared with the app's [cache_warmer] snapshot_dir")
+    parser.add_argument('--interval', type=float, default=240, help="seconds between refreshes")
+    parser.add_argument('--secrets', default='.streamlit/secrets.toml', help="configuration file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    database.configure(database.load_config_file(args.secrets))
+    worker = CacheWarmer(fetch_dashboard_data, interval=args.interval, sink=DirectorySink(args.snapshot_dir))
+    while True:
+        publish(worker)
+        next_run = time.monotonic() + worker.seconds_until_next_run()
+        # Between scheduled runs, serve the refreshes requested from the app
+        while time.monotonic() < next_run:
+            for key in worker.sink.requests():
+                publish(worker, list(key))
+                worker.sink.clear_request(key)
+            time.sleep(max(0.0, min(REQUEST_POLL_SECONDS, next_run - time.monotonic())))
+
+if __name__ == '__main__':
+    main()